@@ -0,0 +1,216 @@
+"""
+Benchmarks for the stages of the passphrase generation pipeline.
+
+Each stage is timed separately on the same random sample of words, and the
+results are saved as JSON so that a run can be compared against a stored
+baseline:
+
+    python benchmarks/bench_pipeline.py --save baseline.json
+    python benchmarks/bench_pipeline.py --baseline baseline.json
+
+When a baseline is given, the run fails (exit status 1) if the median time
+of any stage is more than --threshold (default 25 %) slower than in the
+baseline.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from fin_ppgen import forms  # noqa: E402
+from fin_ppgen import generator  # noqa: E402
+from fin_ppgen import kotus  # noqa: E402
+from fin_ppgen import lexicon  # noqa: E402
+from fin_ppgen import nlp  # noqa: E402
+
+
+DEFAULT_THRESHOLD = 0.25
+
+
+def time_stage(func, repeat):
+    """Call func repeat times and return the run times in seconds. Output
+       printed by the function is discarded."""
+    times = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+    return times
+
+
+def time_subprocess(args, repeat):
+    """Run a Python command repeat times and return the run times."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, cwd=ROOT, check=True,
+                       stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def stage_result(times, items):
+    median = statistics.median(times)
+    return {
+        'median_s': median,
+        'best_s': min(times),
+        'items': items,
+        'items_per_s': items / median if median else None,
+    }
+
+
+def run_benchmarks(word_count=5000, phrase_count=100000, repeat=5):
+    """Time all pipeline stages and return the results as a dict."""
+    results = {}
+
+    def record(name, func, items, stage_repeat=repeat):
+        results[name] = stage_result(time_stage(func, stage_repeat), items)
+
+    # Loading the word list
+    record('xml_load', lambda: kotus.read_entries(lexicon.KOTUS_XML), 1,
+           stage_repeat=max(1, repeat // 2))
+    full_lexicon = lexicon.load_lexicon()
+    cache_path = lexicon.default_cache_path(lexicon.KOTUS_XML)
+    record('lexicon_load', lambda: lexicon.read_lexicon(cache_path), 1)
+    record('select_inflection_paradigms',
+           lambda: generator.select_inflection_paradigms(full_lexicon, 1, 15),
+           len(full_lexicon))
+
+    # The NLP stages, each on the output of the previous stage
+    nouns = full_lexicon.select(1, 15)
+    words = generator.random_set(nouns, word_count)
+    preprocessed = nlp.prepend_lexical_info(words)
+    lexical = nlp.generate_lexical_forms(preprocessed)
+    gradated = nlp.apply_consonant_gradation(lexical)
+    inflected = nlp.apply_inflection_rules(gradated)
+    transformed = nlp.apply_other_transformations(inflected)
+    record('prepend_lexical_info',
+           lambda: nlp.prepend_lexical_info(words), word_count)
+    record('generate_lexical_forms',
+           lambda: nlp.generate_lexical_forms(preprocessed), word_count)
+    record('gradation',
+           lambda: nlp.apply_consonant_gradation(lexical), word_count)
+    record('inflection',
+           lambda: nlp.apply_inflection_rules(gradated), word_count)
+    record('other_transformations',
+           lambda: nlp.apply_other_transformations(inflected), word_count)
+    record('vowel_harmony',
+           lambda: nlp.apply_vowel_harmony(transformed), word_count)
+    record('fused_stages',
+           lambda: list(nlp.transform_words(lexical)), word_count)
+
+    # End-to-end generation
+    def pipeline_phrases():
+        chosen = generator.random_set(nouns, 4 * 250)
+        final = nlp.apply_vowel_harmony(
+            nlp.apply_other_transformations(
+                nlp.apply_inflection_rules(
+                    nlp.apply_consonant_gradation(
+                        nlp.generate_lexical_forms(
+                            nlp.prepend_lexical_info(chosen))))))
+        return [' '.join(final[i:i + 4]) for i in range(0, len(final), 4)]
+
+    def streaming_phrases():
+        final = list(nlp.stream_word_forms(generator.random_set(nouns,
+                                                                4 * 250)))
+        return [' '.join(final[i:i + 4]) for i in range(0, len(final), 4)]
+
+    record('phrases_pipeline', pipeline_phrases, 250)
+    record('phrases_streaming', streaming_phrases, 250)
+    table = generator.load_default_form_table()
+    record('form_table_load',
+           lambda: forms.MappedFormTable(table.path).close(), 1)
+    record('phrases_form_table',
+           lambda: sum(1 for _ in generator.generate_passphrases(
+               phrase_count, 4, table)), phrase_count)
+    table.close()
+
+    # Import times and the cold start of a whole process, with the lexicon
+    # and form table files already built. The startup of a bare interpreter
+    # is included for reference.
+    subprocess_repeat = max(1, repeat // 2)
+    for name, args in [
+            ('interpreter_startup', ['-c', 'pass']),
+            ('import_nlp', ['-c', 'import fin_ppgen.nlp']),
+            ('import_cli', ['-c', 'import fin_ppgen.cli']),
+            ('cold_start', ['-m', 'fin_ppgen', '--count', '1'])]:
+        results[name] = stage_result(
+            time_subprocess(args, subprocess_repeat), 1)
+    return results
+
+
+def compare_results(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Compare benchmark results against a baseline. Return a list of
+       (stage, baseline median, median, change) tuples for stages whose
+       median time grew by more than the threshold (a fraction)."""
+    regressions = []
+    for stage, result in results.items():
+        previous = baseline.get(stage)
+        if not previous or not previous['median_s']:
+            continue
+        change = result['median_s'] / previous['median_s'] - 1
+        if change > threshold:
+            regressions.append((stage, previous['median_s'],
+                                result['median_s'], change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the passphrase generation pipeline.")
+    parser.add_argument('--words', type=int, default=5000,
+                        help="number of words per NLP stage (default: 5000)")
+    parser.add_argument('--phrases', type=int, default=100000,
+                        help="number of phrases generated from the form "
+                        "table (default: 100000)")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="number of runs per stage (default: 5)")
+    parser.add_argument('--save', help="save the results into a JSON file")
+    parser.add_argument('--baseline',
+                        help="compare against results in a JSON file")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown per stage as a fraction "
+                        f"(default: {DEFAULT_THRESHOLD})")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.words, args.phrases, args.repeat)
+    print(f"{'STAGE':30}{'MEDIAN (ms)':>14}{'ITEMS/S':>16}")
+    for stage, result in results.items():
+        rate = result['items_per_s']
+        print(f"{stage:30}{result['median_s'] * 1000:14.2f}"
+              f"{rate:16,.0f}")
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as fp:
+            json.dump({
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'stages': results,
+            }, fp, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as fp:
+            baseline = json.load(fp)['stages']
+        regressions = compare_results(results, baseline, args.threshold)
+        for stage, before, after, change in regressions:
+            print(f"REGRESSION {stage}: {before * 1000:.2f} ms -> "
+                  f"{after * 1000:.2f} ms (+{change:.0%})")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
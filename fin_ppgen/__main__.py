@@ -0,0 +1,5 @@
+"""Run the passphrase generator with python -m fin_ppgen."""
+
+from fin_ppgen.cli import main
+
+raise SystemExit(main())
@@ -0,0 +1,274 @@
+"""
+This module contains a reverse morphological analyzer that maps the words
+of passphrases back to the lexical forms they were generated from, e.g.
+'kulkijoissa' -> ['<N12>kulkija+Pl+Ine'].
+
+The analyzer is built from a form table. The distinct forms are stored in
+a compact array-based trie: its nodes are numbered in breadth-first order,
+so the children of a node are consecutive and only the index of the first
+child, the character of each node, and the form of each terminal node have
+to be stored. Each form is mapped to the table rows that produce it, and
+each row to its lexeme and endings. Looking up a word takes one binary
+search among the children of a node per character.
+
+Building the trie takes about a second for the whole table, so it is saved
+into a file next to the form table and rebuilt only when the table
+changes. Trie file layout (all integers little-endian):
+
+    header      magic, format version, character size in bytes, number of
+                nodes, number of distinct forms, number of rows, SHA-256
+                of the form table the trie was built from
+    first       number of nodes + 1 uint32 indices of first children
+    labels      one character code per node (uint16 or uint32)
+    forms       one int32 per node: the distinct form ending at the node,
+                or -1
+    starts      number of distinct forms + 1 uint32 offsets into rows
+    rows        uint32 table rows, grouped by distinct form
+
+Analyze passphrases from the command line (or from standard input, one
+per line) with:
+
+    python -m fin_ppgen.analyzer "kulkijoissa pöydän"
+"""
+
+from array import array
+import argparse
+import bisect
+import os
+import struct
+import sys
+
+from fin_ppgen import forms
+from fin_ppgen import nlp
+
+
+MAGIC = b'FPTR'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHHIII32s')
+
+TRIE_CACHE = os.path.splitext(forms.FORMS_CACHE)[0] + '.trie'
+
+
+class TrieFormatError(ValueError):
+    """Raised when a trie file cannot be read."""
+
+
+class FormTrie:
+    """An array-based trie of the distinct forms of a form table, with the
+       table rows of each form."""
+
+    def __init__(self, first, labels, form_ids, starts, rows):
+        self.first = first
+        self.labels = labels
+        self.form_ids = form_ids
+        self.starts = starts
+        self.rows = rows
+
+    @classmethod
+    def build(cls, table):
+        """Build the trie of the forms of a table."""
+        tokens = [table[i] for i in range(len(table))]
+        order = sorted(range(len(tokens)), key=tokens.__getitem__)
+        keys = []
+        starts = array('I')
+        for position, row in enumerate(order):
+            if not keys or tokens[row] != keys[-1]:
+                keys.append(tokens[row])
+                starts.append(position)
+        starts.append(len(order))
+        rows = array('I', order)
+
+        max_code = max((ord(c) for key in keys for c in set(key)), default=0)
+        labels = array('H' if max_code < 1 << 16 else 'I', [0])
+        first = array('I')
+        form_ids = array('i')
+        # Nodes as (first key, end of keys, depth) ranges of the sorted keys
+        nodes = [(0, len(keys), 0)]
+        node = 0
+        while node < len(nodes):
+            lo, hi, depth = nodes[node]
+            node += 1
+            if lo < hi and len(keys[lo]) == depth:
+                form_ids.append(lo)
+                lo += 1
+            else:
+                form_ids.append(-1)
+            first.append(len(nodes))
+            while lo < hi:
+                key = keys[lo]
+                code = ord(key[depth])
+                end = bisect.bisect_left(
+                    keys, key[:depth] + chr(code + 1), lo, hi)
+                nodes.append((lo, end, depth + 1))
+                labels.append(code)
+                lo = end
+        first.append(len(nodes))
+        return cls(first, labels, form_ids, starts, rows)
+
+    def __len__(self):
+        """The number of distinct forms."""
+        return len(self.starts) - 1
+
+    def find(self, word):
+        """Return the index of a distinct form, or -1 if the word is not a
+           form in the trie."""
+        first, labels = self.first, self.labels
+        node = 0
+        for char in word:
+            lo, hi = first[node], first[node + 1]
+            child = bisect.bisect_left(labels, ord(char), lo, hi)
+            if child == hi or labels[child] != ord(char):
+                return -1
+            node = child
+        return self.form_ids[node]
+
+    def lookup(self, word):
+        """Return the table rows that produce a word."""
+        form = self.find(word)
+        if form < 0:
+            return []
+        return list(self.rows[self.starts[form]:self.starts[form + 1]])
+
+    def nbytes(self):
+        """The memory used by the arrays of the trie in bytes."""
+        return sum(len(values) * values.itemsize for values in (
+            self.first, self.labels, self.form_ids, self.starts, self.rows))
+
+
+def write_trie(trie, file_path, digest=b'\0' * 32):
+    """Write a trie into a file."""
+    tmp_path = file_path + '.tmp'
+    with open(tmp_path, 'wb') as fp:
+        fp.write(HEADER.pack(MAGIC, FORMAT_VERSION, trie.labels.itemsize,
+                             len(trie.labels), len(trie), len(trie.rows),
+                             digest))
+        for values in (trie.first, trie.labels, trie.form_ids, trie.starts,
+                       trie.rows):
+            fp.write(forms.little_endian(values))
+    os.replace(tmp_path, file_path)
+
+
+def read_trie(file_path):
+    """Read a trie from a file. Return the digest of the form table it was
+       built from and the trie."""
+    with open(file_path, 'rb') as fp:
+        data = fp.read()
+    if len(data) < HEADER.size:
+        raise TrieFormatError(f"{file_path}: truncated header")
+    magic, version, label_size, node_count, form_count, row_count, digest = \
+        HEADER.unpack_from(data)
+    if magic != MAGIC or version != FORMAT_VERSION or label_size not in (2, 4):
+        raise TrieFormatError(f"{file_path}: not a version {FORMAT_VERSION} "
+                              f"trie file")
+
+    offset = HEADER.size
+    arrays = []
+    for typecode, count in [('I', node_count + 1),
+                            ('H' if label_size == 2 else 'I', node_count),
+                            ('i', node_count), ('I', form_count + 1),
+                            ('I', row_count)]:
+        values = array(typecode)
+        size = count * values.itemsize
+        values.frombytes(data[offset:offset + size])
+        if len(values) != count:
+            raise TrieFormatError(f"{file_path}: truncated data")
+        if sys.byteorder != 'little':
+            values.byteswap()
+        arrays.append(values)
+        offset += size
+    if offset != len(data):
+        raise TrieFormatError(f"{file_path}: unexpected file size")
+    return digest, FormTrie(*arrays)
+
+
+class Analyzer:
+    """Maps words and passphrases back to their lexical forms with a
+       FormTrie of a form table built from a lexicon."""
+
+    def __init__(self, table, lexicon, trie=None):
+        self.table = table
+        self.lexicon = lexicon
+        self.trie = trie if trie is not None else FormTrie.build(table)
+
+    def __contains__(self, word):
+        return self.trie.find(word) >= 0
+
+    def lexical_form(self, row):
+        """Return the lexical form of a table row,
+           e.g. '<N12>kulkija+Pl+Ine'."""
+        lexeme = self.lexicon[self.table.lexeme_id(row)]
+        return nlp.lexical_base(lexeme) + self.table.ending(row)
+
+    def analyze(self, word):
+        """Return the lexical forms that produce a word, or an empty list if
+           the word is not in the table."""
+        return [self.lexical_form(row) for row in self.trie.lookup(word)]
+
+    def analyze_phrase(self, phrase, separator=None):
+        """Analyze the words of a passphrase, split at the separator
+           (default: any whitespace). Return a list of (word, analyses)
+           tuples."""
+        return [(word, self.analyze(word)) for word in phrase.split(separator)]
+
+    def analyze_phrases(self, phrases, separator=None):
+        """Analyze passphrases in a batch and yield the analysis of each."""
+        analyses = {}
+        for phrase in phrases:
+            result = []
+            for word in phrase.split(separator):
+                if word not in analyses:
+                    analyses[word] = self.analyze(word)
+                result.append((word, analyses[word]))
+            yield result
+
+
+def load_analyzer(table, lexicon, file_path=TRIE_CACHE):
+    """Return an Analyzer of a forms.MappedFormTable. The trie is read from
+       the file if it was built from the same table; otherwise it is
+       rebuilt and saved."""
+    try:
+        digest, trie = read_trie(file_path)
+    except (OSError, ValueError):
+        trie = None
+    else:
+        if digest != table.digest:
+            trie = None
+    if trie is None:
+        trie = FormTrie.build(table)
+        try:
+            write_trie(trie, file_path, table.digest)
+        except OSError:
+            pass
+    return Analyzer(table, lexicon, trie)
+
+
+def main(argv=None):
+    """Analyze passphrases from the command line."""
+    from fin_ppgen import generator
+    from fin_ppgen import lexicon
+
+    parser = argparse.ArgumentParser(
+        description="Show the lexical forms that the words of passphrases "
+        "were generated from.")
+    parser.add_argument('phrases', nargs='*',
+                        help="passphrases (default: read from standard "
+                        "input, one per line)")
+    parser.add_argument('-s', '--separator', default=None,
+                        help="separator between words (default: "
+                        "whitespace)")
+    args = parser.parse_args(argv)
+
+    nouns = lexicon.load_lexicon().select(1, 15)
+    analyzer = load_analyzer(generator.load_default_form_table(), nouns)
+    phrases = args.phrases or (line.rstrip('\n') for line in sys.stdin)
+    unknown = 0
+    for analysis in analyzer.analyze_phrases(phrases, args.separator):
+        for word, lexical_forms in analysis:
+            print(f"{word}\t{' '.join(lexical_forms) or '?'}")
+            unknown += not lexical_forms
+        print()
+    return 1 if unknown else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
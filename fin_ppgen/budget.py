@@ -0,0 +1,181 @@
+"""
+This module contains a generation mode for passphrases whose length in
+characters falls within a given range (a character budget).
+
+The forms of a form table are bucketed by their length in a LengthIndex.
+Different rows of a table can have the same form (see the unique module),
+so each distinct form is indexed only once; otherwise the duplicated forms
+would be drawn more often, and counting phrases of rows would overstate
+their entropy. For a phrase of k words, the number of word sequences whose
+lengths add up to each total is counted with dynamic programming over the
+bucket sizes.
+A phrase is then sampled without any rejection: first its total length,
+weighted by the number of phrases with that total, then the length of each
+word, weighted by the number of ways to complete the phrase, and finally a
+uniformly random form from each length bucket. Every phrase that fits the
+budget is drawn with the same probability, and the entropy of a phrase is
+exactly log2 of the number of such phrases.
+"""
+
+import bisect
+from array import array
+from collections import defaultdict
+import math
+import secrets
+
+
+class LengthIndex:
+    """An index of the forms of a table (or any sequence of strings)
+       bucketed by their length in characters. Each distinct form is
+       indexed by its first row, unless distinct is false, in which case
+       every row is indexed."""
+
+    def __init__(self, table, distinct=True):
+        buckets = defaultdict(lambda: array('I'))
+        seen = set()
+        for i in range(len(table)):
+            form = table[i]
+            if distinct:
+                if form in seen:
+                    continue
+                seen.add(form)
+            buckets[len(form)].append(i)
+        self.buckets = dict(sorted(buckets.items()))
+
+    def __len__(self):
+        return sum(len(bucket) for bucket in self.buckets.values())
+
+    def counts(self):
+        """Return a dict of form lengths and the number of forms of each
+           length."""
+        return {length: len(bucket) for length, bucket in self.buckets.items()}
+
+
+def letter_range(words, min_chars, max_chars, separator_length):
+    """Return the range of total word lengths that give phrases of the
+       given number of words between min_chars and max_chars characters."""
+    separators = (words - 1) * separator_length
+    return max(0, min_chars - separators), max_chars - separators
+
+
+class BudgetSampler:
+    """Samples phrases of a fixed number of words uniformly from all phrases
+       whose length, including separators, is between min_chars and
+       max_chars characters."""
+
+    def __init__(self, index, words, min_chars, max_chars,
+                 separator_length=1):
+        if words < 1:
+            raise ValueError("a phrase must have at least one word")
+        self.index = index
+        self.words = words
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        low, high = letter_range(words, min_chars, max_chars,
+                                 separator_length)
+        counts = index.counts()
+
+        # ways[j][t]: the number of sequences of j forms with t letters
+        ways = [[1] + [0] * max(high, 0)]
+        for _ in range(words):
+            previous = ways[-1]
+            ways.append([
+                sum(count * previous[total - length]
+                    for length, count in counts.items() if length <= total)
+                for total in range(max(high, 0) + 1)
+            ])
+        self.ways = ways
+        self.counts = counts
+        totals = list(range(low, high + 1))
+        self._totals = (totals, cumulative(ways[words][total]
+                                           for total in totals))
+        self.total = self._totals[1][-1] if totals else 0
+        if not self.total:
+            raise ValueError(f"no phrases of {words} words fit between "
+                             f"{min_chars} and {max_chars} characters")
+        self._choices = {}
+
+    @property
+    def bits(self):
+        """The entropy of a phrase in bits."""
+        return math.log2(self.total)
+
+    def _length_choices(self, words, total):
+        # The lengths of the last of `words` forms with `total` letters,
+        # with the cumulative numbers of sequences ending with each length
+        key = (words, total)
+        choices = self._choices.get(key)
+        if choices is None:
+            previous = self.ways[words - 1]
+            lengths = [length for length in self.counts
+                       if length <= total and previous[total - length]]
+            choices = (lengths, cumulative(
+                self.counts[length] * previous[total - length]
+                for length in lengths))
+            self._choices[key] = choices
+        return choices
+
+    def sample_lengths(self):
+        """Return the lengths of the words of a random phrase."""
+        total = weighted_choice(*self._totals)
+        lengths = []
+        for words in range(self.words, 0, -1):
+            length = weighted_choice(*self._length_choices(words, total))
+            lengths.append(length)
+            total -= length
+        return lengths
+
+    def sample(self):
+        """Return the form indices of a random phrase."""
+        buckets = self.index.buckets
+        indices = []
+        for length in self.sample_lengths():
+            bucket = buckets[length]
+            indices.append(bucket[secrets.randbelow(len(bucket))])
+        return indices
+
+    def entropy_report(self, table_size=None):
+        """Return a report of the entropy of the phrases as a dict. If the
+           number of forms drawn from without the budget is given (e.g. the
+           size of the index), the entropy without the budget is included
+           for comparison."""
+        report = {
+            'words': self.words,
+            'min_chars': self.min_chars,
+            'max_chars': self.max_chars,
+            'phrases': self.total,
+            'bits_per_phrase': self.bits,
+            'bits_per_word': self.bits / self.words,
+        }
+        if table_size:
+            report['bits_without_budget'] = self.words * math.log2(table_size)
+        return report
+
+
+def cumulative(weights):
+    """Return the running totals of an iterable of weights as a list."""
+    totals = []
+    running = 0
+    for weight in weights:
+        running += weight
+        totals.append(running)
+    return totals
+
+
+def weighted_choice(values, cumulative_weights):
+    """Choose a value with a probability proportional to its weight."""
+    position = secrets.randbelow(cumulative_weights[-1])
+    return values[bisect.bisect_right(cumulative_weights, position)]
+
+
+def generate_budget_passphrases(count, words_per_phrase, table, min_chars,
+                                max_chars, separator=' ', index=None):
+    """Generate passphrases from a form table whose length is between
+       min_chars and max_chars characters, and yield them one at a time.
+       A LengthIndex of the table can be given to avoid rebuilding it."""
+    if index is None:
+        index = LengthIndex(table)
+    sampler = BudgetSampler(index, words_per_phrase, min_chars, max_chars,
+                            len(separator))
+    for _ in range(count):
+        yield table.phrase(sampler.sample(), separator)
@@ -0,0 +1,277 @@
+"""
+This module contains an incremental build of the form table.
+
+Inflecting every lexeme in all of its forms is the slowest step of
+preparing the generator, and it gets slower as rules for more paradigms
+are added. The forms of a lexeme only depend on the rules that can match
+its paradigm tag and on the rest of the pipeline, so the build is split by
+inflection paradigm: the forms of each paradigm are saved into a separate
+file in the build directory, and a manifest records the hash of the rule
+block of each paradigm (the rules of every rule file whose tag pattern
+matches the paradigm, in file order) and the hash of its lexeme set. On
+the next build, only the paradigms whose rules or lexemes changed are
+inflected again; the forms of the other paradigms are read from their
+files. A change to the endings or to the pipeline code rebuilds
+everything.
+
+Run the build and see what was rebuilt and why with:
+
+    python -m fin_ppgen.build
+"""
+
+import argparse
+from collections import namedtuple
+import hashlib
+import json
+import os
+import re
+import time
+
+from fin_ppgen import forms
+from fin_ppgen import lexicon
+from fin_ppgen import nlp
+from fin_ppgen import rules
+
+
+BUILD_VERSION = 1
+BUILD_DIR = os.path.join(nlp.FPATH, '../lang_data/build')
+MANIFEST_NAME = 'manifest.json'
+ARTIFACT_NAME = re.compile(r'forms-N([1-9]\d*)\.txt')
+
+# Source files of the pipeline: any change to them rebuilds every paradigm
+PIPELINE_SOURCES = [nlp.__file__, rules.__file__, forms.__file__]
+
+BuildStep = namedtuple('BuildStep', ['paradigm', 'lexemes', 'action',
+                                     'reason'])
+
+
+def paradigm_tags(paradigm):
+    """Return all paradigm tags of an inflection paradigm, e.g. '<N12>',
+       '<N12A>', ..., '<N12M>'."""
+    return [nlp.lexical_tag(paradigm, gradation)
+            for gradation in [''] + list(lexicon.GRADATION_LETTERS)]
+
+
+def rule_block_digest(rule_sets, paradigm):
+    """Return a hex digest of the rules of each rule set that can match
+       words of the paradigm."""
+    tags = paradigm_tags(paradigm)
+    digest = hashlib.sha256()
+    for name, rule_set in sorted(rule_sets.items()):
+        digest.update(name.encode('utf-8') + b'\0')
+        for rule in rule_set:
+            if rule.tag_re is None or any(rule.tag_re.fullmatch(tag)
+                                          for tag in tags):
+                digest.update('\t'.join((rule.pattern, rule.search,
+                                         rule.replace)).encode('utf-8'))
+                digest.update(b'\n')
+    return digest.hexdigest()
+
+
+def lexeme_digest(lexicon, ids):
+    """Return a hex digest of the lemmas and gradation letters of the
+       lexemes with the given IDs, in order."""
+    digest = hashlib.sha256()
+    for i in ids:
+        lexeme = lexicon[i]
+        digest.update(f'{lexeme.lemma}\t{lexeme.gradation}\n'.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def pipeline_digest(endings):
+    """Return a hex digest of the endings and the pipeline source files."""
+    digest = hashlib.sha256(f'{BUILD_VERSION}\n'.encode('utf-8'))
+    digest.update('\n'.join(endings).encode('utf-8'))
+    for path in PIPELINE_SOURCES:
+        digest.update(rules.file_digest(path).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def table_digest(lexicon, endings=None):
+    """Return the digest saved in a form table file: forms.table_digest()
+       of the lexicon, endings, and rule files, combined with the pipeline
+       digest, so that a change to the pipeline code rebuilds the table."""
+    endings = list(endings or nlp.LEXICAL_ENDINGS)
+    digest = hashlib.sha256(forms.table_digest(lexicon, endings))
+    digest.update(pipeline_digest(endings).encode('utf-8'))
+    return digest.digest()
+
+
+def artifact_path(build_dir, paradigm):
+    return os.path.join(build_dir, f'forms-N{paradigm}.txt')
+
+
+def read_manifest(build_dir):
+    """Read the manifest of a previous build. Return an empty dict if
+       there is none."""
+    try:
+        with open(os.path.join(build_dir, MANIFEST_NAME),
+                  encoding='utf-8') as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_text(path, text):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as fp:
+        fp.write(text)
+    os.replace(tmp_path, path)
+
+
+def inflect_paradigm(lexicon, ids, endings):
+    """Return the passphrase tokens of all forms of the lexemes with the
+       given IDs, lexeme by lexeme."""
+    lexical_forms = [nlp.lexical_base(lexicon[i]) + ending for i in ids
+                     for ending in endings]
+    return [forms.passphrase_token(word)
+            for word in nlp.transform_words(lexical_forms)]
+
+
+def rebuild_reason(manifest, pipeline, previous, key, path):
+    """Return the reason for rebuilding a paradigm, or None if its forms
+       can be reused."""
+    if not manifest:
+        return "no previous build"
+    if manifest.get('pipeline') != pipeline:
+        return "endings or pipeline code changed"
+    if previous is None:
+        return "new paradigm"
+    changes = []
+    if previous['rules'] != key['rules']:
+        changes.append("rules changed")
+    if previous['lexemes'] != key['lexemes']:
+        changes.append("entries changed")
+    if changes:
+        return ", ".join(changes)
+    if not os.path.exists(path):
+        return "forms file missing"
+    return None
+
+
+def build_forms(lexicon, endings=None, build_dir=BUILD_DIR, force=False):
+    """Build the forms of a lexicon incrementally. Return a forms.FormTable
+       and a list of BuildSteps describing what was rebuilt or reused for
+       each paradigm and why."""
+    endings = list(endings or nlp.LEXICAL_ENDINGS)
+    rule_sets = nlp.preload()
+    os.makedirs(build_dir, exist_ok=True)
+    manifest = {} if force else read_manifest(build_dir)
+    pipeline = pipeline_digest(endings)
+    index = lexicon.index
+
+    steps = []
+    entries = {}
+    paradigm_forms = {}
+    for paradigm in sorted({paradigm for paradigm, _ in
+                            index.word_classes()}):
+        ids = index.query([paradigm])
+        key = {'rules': rule_block_digest(rule_sets, paradigm),
+               'lexemes': lexeme_digest(lexicon, ids)}
+        path = artifact_path(build_dir, paradigm)
+        reason = rebuild_reason(manifest, pipeline,
+                                manifest.get('paradigms', {}).get(
+                                    str(paradigm)), key, path)
+        if reason is None:
+            with open(path, encoding='utf-8') as fp:
+                tokens = fp.read().split('\n') if ids else []
+            steps.append(BuildStep(paradigm, len(ids), 'reused', ''))
+        else:
+            tokens = inflect_paradigm(lexicon, ids, endings)
+            write_text(path, '\n'.join(tokens))
+            steps.append(BuildStep(paradigm, len(ids), 'rebuilt', reason))
+        paradigm_forms[paradigm] = tokens
+        entries[str(paradigm)] = key
+
+    # Remove the forms of paradigms that have no entries left, also those
+    # missing from the manifest, e.g. after a forced build
+    stale = [int(match.group(1)) for match in
+             map(ARTIFACT_NAME.fullmatch, os.listdir(build_dir))
+             if match and match.group(1) not in entries]
+    for paradigm in sorted(stale):
+        try:
+            os.remove(artifact_path(build_dir, paradigm))
+        except OSError:
+            pass
+        steps.append(BuildStep(paradigm, 0, 'removed', "no entries left"))
+
+    write_text(os.path.join(build_dir, MANIFEST_NAME), json.dumps(
+        {'pipeline': pipeline, 'paradigms': entries}, indent=1))
+
+    # Assemble the table lexeme by lexeme from the forms of each paradigm
+    count = len(endings)
+    positions = dict.fromkeys(paradigm_forms, 0)
+    table_forms = []
+    for paradigm in lexicon.paradigms:
+        start = positions[paradigm]
+        table_forms.extend(paradigm_forms[paradigm][start:start + count])
+        positions[paradigm] = start + count
+    return forms.FormTable(lexicon, table_forms, endings), steps
+
+
+def load_form_table(lexicon, file_path=forms.FORMS_CACHE, endings=None,
+                    build_dir=BUILD_DIR, steps=None):
+    """Return a forms.MappedFormTable with all forms of a lexicon. The
+       table is read from a file if it exists and was built from the same
+       lexicon, endings, rules, and pipeline code (see table_digest());
+       otherwise it is rebuilt incrementally and saved. If a list is given
+       as steps, the BuildSteps of the build are appended to it."""
+    digest = table_digest(lexicon, endings)
+    try:
+        table = forms.MappedFormTable(file_path)
+    except (OSError, ValueError):
+        pass
+    else:
+        if table.digest == digest:
+            return table
+        table.close()
+
+    built, build_steps = build_forms(lexicon, endings, build_dir)
+    if steps is not None:
+        steps.extend(build_steps)
+    forms.write_form_table(built, file_path, digest)
+    return forms.MappedFormTable(file_path)
+
+
+def format_steps(steps):
+    """Format the steps of a build as a list of report lines."""
+    lines = []
+    for step in steps:
+        line = f"N{step.paradigm:<3} {step.lexemes:7} lexemes  {step.action}"
+        if step.reason:
+            line += f" ({step.reason})"
+        lines.append(line)
+    rebuilt = [step for step in steps if step.action == 'rebuilt']
+    lines.append(f"rebuilt {len(rebuilt)} of "
+                 f"{sum(step.action != 'removed' for step in steps)} "
+                 f"paradigms ({sum(step.lexemes for step in rebuilt)} "
+                 f"lexemes)")
+    return lines
+
+
+def main(argv=None):
+    """Rebuild the form table from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Rebuild the form table, inflecting only the paradigms "
+        "whose rules or entries changed.")
+    parser.add_argument('--output', default=forms.FORMS_CACHE,
+                        help="path of the form table file")
+    parser.add_argument('--build-dir', default=BUILD_DIR,
+                        help="directory of the per-paradigm forms")
+    parser.add_argument('--force', action='store_true',
+                        help="rebuild every paradigm")
+    args = parser.parse_args(argv)
+
+    nouns = lexicon.load_lexicon().select(1, 15)
+    start = time.perf_counter()
+    table, steps = build_forms(nouns, build_dir=args.build_dir,
+                               force=args.force)
+    forms.write_form_table(table, args.output, table_digest(nouns))
+    print('\n'.join(format_steps(steps)))
+    print(f"Wrote {len(table)} forms to {args.output} in "
+          f"{time.perf_counter() - start:.2f} s")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
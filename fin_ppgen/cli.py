@@ -0,0 +1,287 @@
+"""
+Command line interface for generating passphrases in bulk.
+
+Passphrases are generated from the precomputed form table and streamed to
+standard output or a file as they are generated, so the memory use stays
+constant however many phrases are requested:
+
+    python -m fin_ppgen --count 100000000 --words 4 --output phrases.txt
+    python -m fin_ppgen --count 1000 --format jsonl
+
+With --jobs, the phrases are generated in parallel by a pool of worker
+processes (see the parallel module). With --min-chars and --max-chars,
+only phrases within the character budget are generated (see the budget
+module). With --unique, the words are drawn uniformly from the distinct
+forms instead of the rows of the form table (see the unique module).
+With --expanded, the words are drawn from all forms of the nouns including
+clitics and alternative plural forms, which are inflected on demand (see
+the formspace module). With --compound, the words are compounds of a
+modifier and an inflected word (see the compound module). With --ledger,
+every phrase is recorded in a persistent ledger of issued phrases, and
+phrases that were issued before are replaced by new ones (see the ledger
+module).
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import sys
+
+from fin_ppgen import budget
+from fin_ppgen import compound
+from fin_ppgen import formspace
+from fin_ppgen import generator
+from fin_ppgen import ledger
+from fin_ppgen import parallel
+from fin_ppgen import unique
+
+
+OUTPUT_FORMATS = ['text', 'jsonl', 'csv']
+
+# Size of the output buffer in bytes
+WRITE_BUFFER_SIZE = 1 << 20
+
+
+def write_passphrases(phrases, fp, output_format='text'):
+    """Write passphrases into a text file object in the given format,
+       one batch of phrases at a time. Return the number of phrases
+       written."""
+    written = 0
+    if output_format == 'csv':
+        writer = csv.writer(fp, lineterminator='\n')
+        writer.writerow(['passphrase'])
+    while True:
+        batch = list(itertools.islice(phrases, generator.PHRASE_BATCH_SIZE))
+        if not batch:
+            break
+        if output_format == 'text':
+            fp.write('\n'.join(batch) + '\n')
+        elif output_format == 'jsonl':
+            fp.write(''.join(
+                json.dumps({'passphrase': phrase}, ensure_ascii=False) + '\n'
+                for phrase in batch))
+        elif output_format == 'csv':
+            writer.writerows([phrase] for phrase in batch)
+        else:
+            raise ValueError(f"unknown output format {output_format!r}")
+        written += len(batch)
+    return written
+
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1: {value}")
+    return number
+
+
+def non_negative_int(value):
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must be at least 0: {value}")
+    return number
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m fin_ppgen',
+        description="Generate Finnish passphrases.")
+    parser.add_argument('-n', '--count', type=positive_int, default=1,
+                        help="number of passphrases to generate (default: 1)")
+    parser.add_argument('-w', '--words', type=positive_int, default=4,
+                        help="number of words per passphrase (default: 4)")
+    parser.add_argument('-s', '--separator', default=' ',
+                        help="separator between words (default: a space)")
+    parser.add_argument('-o', '--output', default='-',
+                        help="output file (default: standard output)")
+    parser.add_argument('-f', '--format', choices=OUTPUT_FORMATS,
+                        default='text', dest='output_format',
+                        help="output format (default: text)")
+    parser.add_argument('-j', '--jobs', type=non_negative_int, default=None,
+                        help="generate in parallel with this many worker "
+                        "processes (0: one per CPU)")
+    parser.add_argument('--unordered', action='store_true',
+                        help="with --jobs, write chunks of phrases in the "
+                        "order they are finished")
+    parser.add_argument('--stats', action='store_true',
+                        help="with --jobs, report the generation rate of "
+                        "each worker, and with --ledger, the fill level of "
+                        "the ledger, on standard error")
+    parser.add_argument('--min-chars', type=positive_int, default=None,
+                        help="only generate phrases of at least this many "
+                        "characters")
+    parser.add_argument('--max-chars', type=positive_int, default=None,
+                        help="only generate phrases of at most this many "
+                        "characters")
+    parser.add_argument('--unique', action='store_true',
+                        help="draw words uniformly from the distinct word "
+                        "forms")
+    parser.add_argument('--expanded', action='store_true',
+                        help="draw words from all forms including clitics "
+                        "and alternative plural forms")
+    parser.add_argument('--compound', action='store_true',
+                        help="form compound words of a modifier and an "
+                        "inflected word")
+    parser.add_argument('--entropy', action='store_true',
+                        help="report the entropy of the phrases on standard "
+                        "error")
+    parser.add_argument('--ledger', default=None,
+                        help="never issue a phrase recorded in this ledger "
+                        "file, and record the new phrases in it (created "
+                        "if it does not exist)")
+    parser.add_argument('--ledger-capacity', type=positive_int,
+                        default=ledger.DEFAULT_CAPACITY,
+                        help="number of phrases a new ledger is sized for "
+                        f"(default: {ledger.DEFAULT_CAPACITY:,})")
+    parser.add_argument('--ledger-fp-rate', type=float,
+                        default=ledger.DEFAULT_FP_RATE,
+                        help="false-positive rate of a new ledger at its "
+                        f"capacity (default: {ledger.DEFAULT_FP_RATE:g})")
+    parser.add_argument('--interactive', action='store_true',
+                        help="start the interactive generator instead")
+    args = parser.parse_args(argv)
+    if args.min_chars is not None or args.max_chars is not None:
+        if args.jobs is not None:
+            parser.error("--min-chars and --max-chars cannot be used with "
+                         "--jobs")
+        if args.max_chars is None:
+            parser.error("--min-chars requires --max-chars")
+        if args.compound or args.expanded:
+            parser.error("--min-chars and --max-chars cannot be used with "
+                         "--compound or --expanded")
+    if args.expanded and (args.jobs is not None or args.unique):
+        parser.error("--expanded cannot be used with --jobs or --unique")
+    if not 0 < args.ledger_fp_rate < 1:
+        parser.error("--ledger-fp-rate must be between 0 and 1")
+    return args
+
+
+def format_entropy(report):
+    """Format an entropy report as a list of lines."""
+    lines = [f"{report['phrases']:,} possible phrases of {report['words']} "
+             f"words: {report['bits_per_phrase']:.1f} bits per phrase, "
+             f"{report['bits_per_word']:.1f} bits per word"]
+    if 'bits_without_budget' in report:
+        lines.append(f"without the character budget: "
+                     f"{report['bits_without_budget']:.1f} bits per phrase")
+    if 'single_bits_per_phrase' in report:
+        single = report['single_bits_per_phrase']
+        lines.append(f"{report['modifiers']:,} compound modifiers: "
+                     f"{single:.1f} bits per phrase without compounds, "
+                     f"{report['bits_per_phrase'] - single:+.1f} bits with "
+                     f"them")
+    if 'space_forms' in report:
+        lines.append(f"{report['space_forms']:,} forms with clitics and "
+                     f"alternative plural forms, {report['table_forms']:,} "
+                     f"without; some forms are the same string, so the "
+                     f"bits per phrase are an upper bound")
+    if 'unique_forms' in report:
+        lines.append(f"{report['unique_forms']:,} distinct forms in "
+                     f"{report['table_forms']:,} rows; counting the rows "
+                     f"gives an upper bound of "
+                     f"{report['nominal_bits_per_phrase']:.1f} bits per "
+                     f"phrase")
+    return lines
+
+
+def main(argv=None):
+    """Generate passphrases from the command line."""
+    args = parse_args(argv)
+    if args.interactive:
+        generator.main()
+        return 0
+
+    stats = None
+    entropy = None
+    table = None
+    heads = None
+    modifiers = compound.load_modifiers() if args.compound else None
+    issued = None
+    ledger_report = None
+    # With a ledger, phrases are drawn until enough new ones are found
+    count = args.count if args.ledger is None else None
+    if args.jobs is None:
+        if args.expanded:
+            table = formspace.load_form_space()
+        else:
+            table = generator.load_default_form_table()
+        if args.unique:
+            table = unique.UniqueForms(table)
+        heads = table
+        if modifiers is not None:
+            table = compound.CompoundTable(modifiers, heads)
+    if args.max_chars is not None:
+        index = budget.LengthIndex(table)
+        try:
+            sampler = budget.BudgetSampler(
+                index, args.words, args.min_chars or 1, args.max_chars,
+                len(args.separator))
+        except ValueError as err:
+            print(f"error: {err}", file=sys.stderr)
+            return 2
+        entropy = sampler.entropy_report(len(index))
+        phrases = (table.phrase(sampler.sample(), args.separator)
+                   for _ in (itertools.count() if count is None
+                             else range(count)))
+    elif args.jobs is None:
+        phrases = generator.generate_passphrases(count, args.words,
+                                                 table, args.separator)
+    else:
+        stats = parallel.WorkerStats() if args.stats else None
+        phrases = parallel.generate_parallel(count, args.words,
+                                             jobs=args.jobs or None,
+                                             separator=args.separator,
+                                             ordered=not args.unordered,
+                                             stats=stats,
+                                             unique_forms=args.unique,
+                                             modifiers=modifiers)
+    if args.ledger is not None:
+        try:
+            issued = ledger.BloomLedger.open(args.ledger,
+                                             args.ledger_capacity,
+                                             args.ledger_fp_rate)
+        except (OSError, ValueError) as err:
+            print(f"error: {err}", file=sys.stderr)
+            return 2
+        phrases = ledger.issue(phrases, args.count, issued)
+    try:
+        if args.output == '-':
+            write_passphrases(phrases, sys.stdout, args.output_format)
+            sys.stdout.flush()
+        else:
+            with open(args.output, 'w', encoding='utf-8', newline='',
+                      buffering=WRITE_BUFFER_SIZE) as fp:
+                write_passphrases(phrases, fp, args.output_format)
+        if issued is not None and args.stats:
+            ledger_report = issued.report()
+    except BrokenPipeError:
+        # The reader of the pipe went away (e.g. `| head`): stop quietly
+        sys.stderr.close()
+        return 1
+    except ledger.LedgerFullError as err:
+        print(f"error: {err}", file=sys.stderr)
+        return 2
+    finally:
+        if issued is not None:
+            issued.close()
+    if stats is not None:
+        print('\n'.join(stats.report()), file=sys.stderr)
+    if ledger_report is not None:
+        print('\n'.join(ledger.format_report(ledger_report)),
+              file=sys.stderr)
+    if args.entropy:
+        if entropy is None:
+            if isinstance(heads, formspace.FormSpace):
+                entropy = heads.entropy_report(args.words)
+            else:
+                if not isinstance(heads, unique.UniqueForms):
+                    heads = unique.UniqueForms(
+                        heads or generator.load_default_form_table())
+                entropy = heads.entropy_report(args.words, args.unique)
+            if modifiers is not None:
+                entropy = compound.CompoundTable(
+                    modifiers, heads).entropy_report(
+                        args.words, entropy['bits_per_word'])
+        print('\n'.join(format_entropy(entropy)), file=sys.stderr)
+    return 0
@@ -0,0 +1,209 @@
+"""
+This module contains a compound mode that forms words from a modifier and
+an inflected head, e.g. 'vesi' + 'pöydän' -> 'vesipöydän'.
+
+In a Finnish compound, only the last part (the head) is inflected, and it
+also decides the vowel harmony of the endings. The heads are therefore
+taken as they are from a form table, whose forms were inflected on their
+own. The modifiers are the first parts of the compounds in the word list:
+about half of the Kotus entries have no inflection paradigm of their own,
+and most of them are compounds that end with another entry of the word
+list. Splitting them gives modifiers in the forms that are actually used
+in compounds, e.g. 'käden' (käden|syrjä) or 'ihmis' (ihmis|kirppu). A
+compound is only split at a noun or at a compound that ends with one, not
+at an adjective or a derivation that looks like one (hyvän|tahto|inen is
+not hyväntah|toinen), and only where the modifier is itself a word or a
+compounding form of one, or a sequence of them (sotilas|avustus, not
+sotila|savustus). The modifier and the head are joined with a hyphen when
+the modifier ends with the vowel the head starts with, as in 'linja-auto'.
+
+A CompoundTable behaves like a form table whose rows are all pairs of a
+modifier and a head, so sampling a compound takes a single random index
+like sampling a word, and it can be used wherever a table is expected.
+Different pairs may rarely give the same string (e.g. 'vesi' +
+'johtomaali' and 'vesijohto' + 'maali'); the entropy reports do not
+account for this.
+"""
+
+import math
+
+from fin_ppgen import lexicon as lexicon_module
+from fin_ppgen import nlp
+from fin_ppgen import sampling
+
+
+VOWELS = 'aeiouyäö'
+
+# Shortest modifier and head accepted when splitting compounds; a modifier
+# made of several forms is split in the same way
+MIN_MODIFIER_LENGTH = 2
+MIN_HEAD_LENGTH = 3
+
+# Paradigms of the words that compounds are split at: the nominal paradigms
+# except 38 (-nen) and 40 (-(U)Us), which are mostly adjectives and
+# derivations, e.g. 'toinen' in 'hyväntahtoinen' or 'isyys' in
+# 'avomielisyys'
+HEAD_PARADIGMS = frozenset(range(1, 50)) - {38, 40}
+# Paradigms of the verbs, which are not used as modifiers
+VERB_PARADIGMS = range(52, 79)
+
+
+def compound_heads(lexicon):
+    """Return the set of lemmas of a lexicon that compounds are split at:
+       the nouns, and the compounds without an inflection paradigm that end
+       with a noun (e.g. 'jalkaväki' in 'kiväärijalkaväki')."""
+    lemmas = lexicon.lemmas
+    nouns = {lemmas[i] for i in lexicon.index.query(HEAD_PARADIGMS)}
+    compounds = {lemma for lemma in map(lemmas.__getitem__,
+                                         lexicon.index.query([0]))
+                 if any(lemma[i:] in nouns for i in range(
+                     MIN_MODIFIER_LENGTH, len(lemma) - MIN_HEAD_LENGTH + 1))}
+    return nouns | compounds
+
+
+def compounding_forms(lexicon):
+    """Return the set of attested compounding forms of a lexicon: the
+       lemmas of the words other than verbs, the singular genitives of the
+       words in paradigms 1-15, and the genitive and s-stem of the -nen
+       words (e.g. 'ihmisen' and 'ihmis')."""
+    lemmas = lexicon.lemmas
+    paradigms = lexicon.paradigms
+    forms = set()
+    for i in range(len(lexicon)):
+        lemma, paradigm = lemmas[i], paradigms[i]
+        if paradigm in VERB_PARADIGMS:
+            continue
+        forms.add(lemma)
+        if 1 <= paradigm <= 15:
+            forms.add(nlp.transform_word(
+                nlp.lexical_base(lexicon[i]) + '+Sg+Gen'))
+        elif paradigm == 38 and lemma.endswith('nen'):
+            forms.update((lemma[:-3] + 's', lemma[:-3] + 'sen'))
+    return forms
+
+
+def is_attested(modifier, attested):
+    """Check whether a modifier is in the set of attested compounding forms,
+       or can be split into a sequence of them, e.g. 'laudatur' + 'yli'."""
+    if modifier in attested:
+        return True
+    return any(modifier[:i] in attested and is_attested(modifier[i:],
+                                                        attested)
+               for i in range(MIN_MODIFIER_LENGTH,
+                              len(modifier) - MIN_HEAD_LENGTH + 1))
+
+
+def split_compound(lemma, heads, attested):
+    """Split a compound into a modifier and a head that is in the set of
+       heads, where the modifier is attested (see is_attested). The split
+       with the longest head whose modifier is an attested compounding form
+       itself is preferred, and then the one with the longest head whose
+       modifier is a sequence of them. Return the modifier and the head,
+       or None if there is no such split."""
+    if '-' in lemma:
+        modifier, _, head = lemma.rpartition('-')
+        if head in heads and is_attested(modifier, attested):
+            return modifier, head
+        return None
+    splits = [(lemma[:i], lemma[i:])
+              for i in range(MIN_MODIFIER_LENGTH,
+                             len(lemma) - MIN_HEAD_LENGTH + 1)
+              if lemma[i:] in heads]
+    for modifier, head in splits:
+        if modifier in attested:
+            return modifier, head
+    for modifier, head in splits:
+        if is_attested(modifier, attested):
+            return modifier, head
+    return None
+
+
+def compound_modifiers(lexicon):
+    """Return a sorted list of the distinct modifiers of the compounds of a
+       lexicon, i.e. the entries without an inflection paradigm that end
+       with a noun of the lexicon (see split_compound)."""
+    lemmas = lexicon.lemmas
+    heads = compound_heads(lexicon)
+    attested = compounding_forms(lexicon)
+    modifiers = set()
+    for i in lexicon.index.query([0]):
+        split = split_compound(lemmas[i], heads, attested)
+        if split is None:
+            continue
+        modifier = split[0]
+        if (len(modifier) >= MIN_MODIFIER_LENGTH and modifier.isalpha()
+                and modifier.islower()):
+            modifiers.add(modifier)
+    return sorted(modifiers)
+
+
+def join_compound(modifier, head):
+    """Join a modifier and a head into a compound, with a hyphen if the
+       same vowel would meet at the boundary."""
+    if head[:1] == modifier[-1:] and head[:1] in VOWELS:
+        return modifier + '-' + head
+    return modifier + head
+
+
+class CompoundTable:
+    """All compounds of a list of modifiers and a form table (or any
+       sequence) of heads. Row i is the compound of modifier
+       i // len(heads) and head i % len(heads)."""
+
+    def __init__(self, modifiers, heads):
+        if not modifiers:
+            raise ValueError("no compound modifiers")
+        self.modifiers = modifiers
+        self.heads = heads
+        self.head_count = len(heads)
+
+    def __len__(self):
+        return len(self.modifiers) * self.head_count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("compound table index out of range")
+        modifier, head = divmod(index, self.head_count)
+        return join_compound(self.modifiers[modifier], self.heads[head])
+
+    def phrase(self, indices, separator=' '):
+        """Assemble a passphrase from the compounds at the given indices."""
+        modifiers, heads, head_count = (self.modifiers, self.heads,
+                                        self.head_count)
+        words = []
+        for index in indices:
+            modifier, head = divmod(index, head_count)
+            words.append(join_compound(modifiers[modifier], heads[head]))
+        return separator.join(words)
+
+    def passphrase(self, length, separator=' '):
+        """Return a passphrase of random compounds."""
+        return self.phrase(sampling.randbelow_batch(len(self), length),
+                           separator)
+
+    def entropy_report(self, words_per_phrase, head_bits=None):
+        """Return the entropy of phrases of compounds as a dict, with the
+           entropy of phrases of the heads alone for comparison. head_bits
+           is the entropy of a head in bits (default: log2 of the number of
+           heads)."""
+        if head_bits is None:
+            head_bits = math.log2(self.head_count)
+        bits_per_word = math.log2(len(self.modifiers)) + head_bits
+        return {
+            'words': words_per_phrase,
+            'phrases': len(self) ** words_per_phrase,
+            'bits_per_phrase': words_per_phrase * bits_per_word,
+            'bits_per_word': bits_per_word,
+            'modifiers': len(self.modifiers),
+            'single_bits_per_phrase': words_per_phrase * head_bits,
+        }
+
+
+def load_modifiers(lexicon=None):
+    """Return the compound modifiers of a lexicon (default: the Kotus
+       lexicon)."""
+    if lexicon is None:
+        lexicon = lexicon_module.load_lexicon()
+    return compound_modifiers(lexicon)
@@ -0,0 +1,262 @@
+"""
+This module contains functions for precomputing the surface forms of
+lexemes into a flat table.
+
+The final form of a word is fully determined by its lexeme, number and
+case, so instead of running the NLP pipeline on freshly sampled words for
+every passphrase, every supported lexeme is inflected in all of its 22
+forms once. A random word is then a single CSPRNG index into the table.
+
+The table is laid out lexeme by lexeme: the form with index i belongs to
+lexeme i // 22 and has the ending nlp.LEXICAL_ENDINGS[i % 22].
+
+A form table can be saved into a file that is memory-mapped read-only by
+MappedFormTable, so that any number of worker processes can share the same
+pages without copying or deserializing anything. Form table file layout
+(all integers little-endian):
+
+    header      magic, format version, flags, number of forms, size of the
+                endings blob, size of the forms blob, SHA-256 of the
+                lexicon and rules the table was built from
+    offsets     number of forms + 1 uint32 offsets into the forms blob
+    lexeme ids  one uint32 per form: the position of its lexeme in the
+                lexicon the table was built from
+    tags        one byte per form: the index of its endings
+    endings     UTF-8 encoded endings separated by newlines
+    forms       UTF-8 encoded forms, concatenated
+"""
+
+from array import array
+import hashlib
+import mmap
+import os
+import secrets
+import struct
+import sys
+
+from fin_ppgen import nlp
+from fin_ppgen import sampling
+
+
+def inflect_all(lexical_forms):
+    """Run lexical forms through the gradation, inflection, and vowel harmony
+       stages and return the final forms as a list."""
+    return list(nlp.transform_words(lexical_forms))
+
+
+def passphrase_token(word):
+    """Turn a final word form into the token used in passphrases by
+       clearing internal spaces (see generator.form_passphrase)."""
+    return word.replace(' ', '')
+
+
+class FormTable:
+    """A flat table of the passphrase tokens of all forms of a lexicon."""
+
+    def __init__(self, lexicon, forms, endings=None):
+        self.lexicon = lexicon
+        self.forms = forms
+        self.endings = list(endings or nlp.LEXICAL_ENDINGS)
+        if len(forms) != len(lexicon) * len(self.endings):
+            raise ValueError("form table does not match the lexicon")
+
+    def __len__(self):
+        return len(self.forms)
+
+    def __getitem__(self, index):
+        return self.forms[index]
+
+    def lexeme_id(self, index):
+        """Return the position of the lexeme of a form in the lexicon."""
+        return index // len(self.endings)
+
+    def lexeme(self, index):
+        """Return the lexeme of a form."""
+        return self.lexicon[self.lexeme_id(index)]
+
+    def ending(self, index):
+        """Return the number and case endings of a form, e.g. '+Pl+Ine'."""
+        return self.endings[index % len(self.endings)]
+
+    def lexical_form(self, index):
+        """Return the lexical representation of a form,
+           e.g. '<N12>kulkija+Pl+Ine'."""
+        return nlp.lexical_base(self.lexeme(index)) + self.ending(index)
+
+    def random_form(self):
+        """Return a random form from the table."""
+        return self.forms[secrets.randbelow(len(self.forms))]
+
+    def phrase(self, indices, separator=' '):
+        """Assemble a passphrase from the forms at the given indices."""
+        return separator.join([self.forms[i] for i in indices])
+
+    def passphrase(self, length, separator=' '):
+        """Return a passphrase of random forms from the table."""
+        return self.phrase(sampling.randbelow_batch(len(self), length),
+                           separator)
+
+
+def build_form_table(lexicon, endings=None):
+    """Inflect every lexeme of a lexicon in all of its forms and return
+       the forms as a FormTable."""
+    endings = list(endings or nlp.LEXICAL_ENDINGS)
+    lexical_forms = [
+        nlp.lexical_base(lexeme) + ending for lexeme in lexicon
+        for ending in endings
+    ]
+    forms = [passphrase_token(word) for word in inflect_all(lexical_forms)]
+    return FormTable(lexicon, forms, endings)
+
+
+MAGIC = b'FPFT'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHHIII32s')
+
+FORMS_CACHE = os.path.join(nlp.FPATH, '../lang_data/kotus-sanalista_v1.forms')
+
+
+class FormTableFormatError(ValueError):
+    """Raised when a form table file cannot be read."""
+
+
+def table_digest(lexicon, endings=None):
+    """Return a SHA-256 digest identifying the lexicon, endings, and rule
+       files a form table is built from."""
+    digest = hashlib.sha256()
+    digest.update('\n'.join(lexicon.lemmas).encode('utf-8'))
+    digest.update(lexicon.paradigms.tobytes())
+    digest.update(lexicon.gradations.tobytes())
+    digest.update('\n'.join(endings or nlp.LEXICAL_ENDINGS).encode('utf-8'))
+    for path in sorted(nlp.RULE_FILES.values()):
+        with open(path, 'rb') as fp:
+            digest.update(hashlib.sha256(fp.read()).digest())
+    return digest.digest()
+
+
+def little_endian(values):
+    """Return the bytes of an array of integers in little-endian order."""
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def write_form_table(table, file_path, digest=b'\0' * 32):
+    """Write a FormTable into a file that can be memory-mapped."""
+    encoded = [form.encode('utf-8') for form in table.forms]
+    offsets = array('I', [0])
+    for form in encoded:
+        offsets.append(offsets[-1] + len(form))
+    endings_count = len(table.endings)
+    lexeme_ids = array('I', (i // endings_count for i in range(len(table))))
+    tags = bytes(i % endings_count for i in range(len(table)))
+    endings = '\n'.join(table.endings).encode('utf-8')
+
+    tmp_path = file_path + '.tmp'
+    with open(tmp_path, 'wb') as fp:
+        fp.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(encoded),
+                             len(endings), offsets[-1], digest))
+        fp.write(little_endian(offsets))
+        fp.write(little_endian(lexeme_ids))
+        fp.write(tags)
+        fp.write(endings)
+        fp.write(b''.join(encoded))
+    os.replace(tmp_path, file_path)
+
+
+class MappedFormTable:
+    """A read-only, memory-mapped form table file.
+
+       Forms are read straight from the mapped file: form_bytes() returns a
+       memoryview into the mapping, and passphrases are assembled from the
+       raw bytes and decoded only once."""
+
+    def __init__(self, file_path):
+        with open(file_path, 'rb') as fp:
+            self._mmap = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._mmap)
+        try:
+            if len(buffer) < HEADER.size:
+                raise FormTableFormatError(f"{file_path}: truncated header")
+            magic, version, _, count, endings_size, blob_size, digest = \
+                HEADER.unpack_from(buffer)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise FormTableFormatError(f"{file_path}: not a version "
+                                           f"{FORMAT_VERSION} form table")
+            offsets_end = HEADER.size + 4 * (count + 1)
+            ids_end = offsets_end + 4 * count
+            tags_end = ids_end + count
+            endings_end = tags_end + endings_size
+            if len(buffer) != endings_end + blob_size:
+                raise FormTableFormatError(f"{file_path}: unexpected file "
+                                           f"size")
+            endings = bytes(buffer[tags_end:endings_end]).decode('utf-8')
+        except ValueError:
+            buffer.release()
+            self._mmap.close()
+            raise
+
+        self.path = file_path
+        self.digest = digest
+        self.count = count
+        self.endings = endings.split('\n')
+        self.offsets = self._int_array(buffer[HEADER.size:offsets_end])
+        self.lexeme_ids = self._int_array(buffer[offsets_end:ids_end])
+        self.tags = buffer[ids_end:tags_end]
+        self.blob = buffer[endings_end:]
+
+    @staticmethod
+    def _int_array(buffer):
+        if sys.byteorder == 'little':
+            return buffer.cast('I')
+        values = array('I')
+        values.frombytes(buffer)
+        values.byteswap()
+        return values
+
+    def close(self):
+        """Release the memory mapping."""
+        for name in ('offsets', 'lexeme_ids', 'tags', 'blob'):
+            view = getattr(self, name)
+            if isinstance(view, memoryview):
+                view.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def form_bytes(self, index):
+        """Return the UTF-8 bytes of a form as a memoryview."""
+        if not 0 <= index < self.count:
+            raise IndexError("form table index out of range")
+        return self.blob[self.offsets[index]:self.offsets[index + 1]]
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        return str(self.form_bytes(index), 'utf-8')
+
+    def lexeme_id(self, index):
+        """Return the position of the lexeme of a form in the lexicon."""
+        return self.lexeme_ids[index]
+
+    def ending(self, index):
+        """Return the number and case endings of a form, e.g. '+Pl+Ine'."""
+        return self.endings[self.tags[index]]
+
+    def phrase(self, indices, separator=' '):
+        """Assemble a passphrase from the forms at the given indices."""
+        return separator.encode('utf-8').join(
+            [self.form_bytes(i) for i in indices]).decode('utf-8')
+
+    def passphrase(self, length, separator=' '):
+        """Return a passphrase of random forms from the table."""
+        return self.phrase(sampling.randbelow_batch(self.count, length),
+                           separator)
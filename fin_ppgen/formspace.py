@@ -0,0 +1,134 @@
+"""
+This module contains a form space: all forms of the words of a lexicon,
+including the alternative plural genitive and partitive forms and the
+clitics (nlp.CLITICS), numbered from 0 to N - 1 and computed on demand.
+
+With six clitics and the alternative forms, there are more than six times
+as many forms as in a form table, too many to precompute. Instead, a form
+number is decoded in mixed radix into a lexeme, an ending (number, case,
+and the variant of the plural genitive or partitive), and a clitic, and
+only that form is inflected. Since the number of variants depends on the
+paradigm, the lexemes are grouped into blocks by word class (paradigm and
+gradation), and every lexeme of a block has the same number of forms.
+Finding the block of a form number takes a binary search among the block
+starts, so drawing a uniformly random form takes constant time whatever
+the size of the space.
+
+A FormSpace behaves like a form table (it has a length, returns forms by
+number, and assembles phrases), so it can be used wherever a table is
+expected, e.g. by generator.generate_passphrases().
+"""
+
+import bisect
+import math
+
+from fin_ppgen import forms
+from fin_ppgen import lexicon as lexicon_module
+from fin_ppgen import nlp
+from fin_ppgen import sampling
+
+
+class FormBlock:
+    """The forms of the lexemes of one word class: form
+       start + (i * len(endings) + e) * len(clitics) + c is lexeme ids[i]
+       with endings[e] and clitics[c]."""
+
+    __slots__ = ('start', 'ids', 'endings', 'clitic_count',
+                 'forms_per_lexeme')
+
+    def __init__(self, start, ids, endings, clitic_count):
+        self.start = start
+        self.ids = ids
+        self.endings = endings
+        self.clitic_count = clitic_count
+        self.forms_per_lexeme = len(endings) * clitic_count
+
+    def __len__(self):
+        return len(self.ids) * self.forms_per_lexeme
+
+
+class FormSpace:
+    """All forms of the lexemes of a lexicon with the given clitics, and
+       with the alternative plural forms if alternatives is true."""
+
+    def __init__(self, lexicon, clitics=None, alternatives=True):
+        self.lexicon = lexicon
+        self.clitics = list(nlp.CLITICS if clitics is None else clitics)
+        if not self.clitics:
+            raise ValueError("at least one clitic ('' for none) is needed")
+        index = lexicon.index
+        self.blocks = []
+        size = 0
+        for paradigm, gradation in sorted(index.word_classes()):
+            ids = index.query([paradigm], [gradation])
+            if alternatives:
+                endings = nlp.word_class_endings(paradigm, gradation)
+            else:
+                endings = nlp.LEXICAL_ENDINGS
+            block = FormBlock(size, ids, endings, len(self.clitics))
+            self.blocks.append(block)
+            size += len(block)
+        self.starts = [block.start for block in self.blocks]
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    def decode(self, index):
+        """Return the lexeme ID, ending, and clitic of a form number."""
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("form space index out of range")
+        block = self.blocks[bisect.bisect_right(self.starts, index) - 1]
+        lexeme, offset = divmod(index - block.start, block.forms_per_lexeme)
+        ending, clitic = divmod(offset, block.clitic_count)
+        return block.ids[lexeme], block.endings[ending], self.clitics[clitic]
+
+    def lexical_form(self, index):
+        """Return the lexical form and the clitic of a form number, e.g.
+           ('<N10>koira+Pl+Ine', 'kO')."""
+        lexeme_id, ending, clitic = self.decode(index)
+        return nlp.lexical_base(self.lexicon[lexeme_id]) + ending, clitic
+
+    def __getitem__(self, index):
+        lexical_form, clitic = self.lexical_form(index)
+        return forms.passphrase_token(
+            nlp.attach_clitic(nlp.transform_word(lexical_form), clitic))
+
+    def phrase(self, indices, separator=' '):
+        """Assemble a passphrase from the forms with the given numbers."""
+        return separator.join([self[i] for i in indices])
+
+    def passphrase(self, length, separator=' '):
+        """Return a passphrase of random forms."""
+        return self.phrase(sampling.randbelow_batch(self.size, length),
+                           separator)
+
+    def base_forms(self):
+        """The number of forms without clitics and alternative forms, i.e.
+           the size of the form table of the lexicon."""
+        return len(self.lexicon) * len(nlp.LEXICAL_ENDINGS)
+
+    def entropy_report(self, words_per_phrase):
+        """Return the entropy of phrases of forms drawn uniformly from the
+           space as a dict, with the size of the form table of the lexicon
+           for comparison. Some forms of a lexeme are the same string
+           (e.g. alternative plurals that coincide), so the entropy counted
+           over the form numbers is an upper bound."""
+        bits_per_word = math.log2(self.size)
+        return {
+            'words': words_per_phrase,
+            'phrases': self.size ** words_per_phrase,
+            'bits_per_phrase': words_per_phrase * bits_per_word,
+            'bits_per_word': bits_per_word,
+            'space_forms': self.size,
+            'table_forms': self.base_forms(),
+        }
+
+
+def load_form_space(clitics=None, alternatives=True):
+    """Return the FormSpace of the nouns in inflection paradigms 1-15, the
+       words of the default form table."""
+    return FormSpace(lexicon_module.load_lexicon().select(1, 15), clitics,
+                     alternatives)
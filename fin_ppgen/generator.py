@@ -1,16 +1,15 @@
 """A simple passphrase generator for Finnish"""
 
-import os
-import secrets
-from bs4 import BeautifulSoup
-import nlp
+from collections import defaultdict
+
+from fin_ppgen import build
+from fin_ppgen import lexicon
+from fin_ppgen import nlp
+from fin_ppgen import sampling
 
 
 # TODO:
-# - add support for alternative forms in e.g. plural genitive and partitive
-# - add support for forming compounds
 # - add option for only using base forms of words
-# - reduce startup time by saving the parsed XML into a file? is that possible?
 # - refactor code
 # - write actual tests
 # - move all print statements to main function
@@ -20,6 +19,8 @@ def read_kotus_xml(file_path):
     """Parse an XML file containing a word list with BeautifulSoup and return
        a bs4.element.ResultSet object with all word entries from the file."""
 
+    from bs4 import BeautifulSoup
+
     print("Parsing XML file...\n")
     with open(file_path, 'r') as fp:
         soup = BeautifulSoup(fp, 'lxml')
@@ -30,26 +31,38 @@ def read_kotus_xml(file_path):
     return word_entries
 
 
-# TODO: use *args to pass an arbitrary set of inflection numbers
-#       to the function?
 # Note that some entries do not have a <t> field in the word list:
-# these appear to be compound nouns. Currently these entries are excluded.
+# these appear to be compound nouns. Their paradigm number is 0, so they
+# are currently excluded.
 def select_inflection_paradigms(word_entries, lower_limit, upper_limit):
     """Select word entries that have specified inflection paradigms
-       in the Kotus word list. Return the word entries as a list."""
+       in the Kotus word list. The word entries are given and returned
+       as a lexicon.Lexicon."""
 
     print("Picking words with desired inflection paradigms...")
-    word_entries_with_selected_infls = []
-    for entry in word_entries:
-        if entry.t is not None and int(entry.t.tn.string) >= lower_limit \
-           and int(entry.t.tn.string) <= upper_limit:
-            word_entries_with_selected_infls.append(entry)
-    return word_entries_with_selected_infls
+    return word_entries.select(lower_limit, upper_limit)
+
+
+def select_word_classes(word_entries, paradigms=None, gradations=None):
+    """Select word entries by any set of inflection paradigms and gradation
+       letters ('' for no gradation) through the index of the lexicon, e.g.
+       paradigms={1, 5, 38} and gradations={''}. None allows any paradigm
+       or gradation."""
+    return word_entries.where(paradigms, gradations)
+
+
+def select_supported_words(word_entries):
+    """Select the word entries whose inflection paradigm and gradation are
+       covered by the loaded inflection rules."""
+    index = word_entries.index
+    return word_entries.take(index.class_ids(
+        nlp.supported_word_classes(index.word_classes())))
 
 
 def random_set(word_list, size_of_set):
     """Randomly select a subset of the input word list."""
-    random_entries = [secrets.choice(word_list) for i in range(size_of_set)]
+    indices = sampling.randbelow_batch(len(word_list), size_of_set)
+    random_entries = [word_list[i] for i in indices]
     return random_entries
 
 
@@ -61,14 +74,56 @@ def form_passphrase(wordlist, length):
     return ' '.join([word.replace(' ', '') for word in words])
 
 
+def precompute_forms(word_list):
+    """Inflect every word in the list in all of its forms and return the
+       forms as a forms.MappedFormTable that passphrases can be sampled from.
+       The forms are saved into a file that is reused on later runs, and
+       only the paradigms whose rules or words changed are inflected again
+       (see the build module)."""
+    print("Precomputing all forms of the words...")
+    return build.load_form_table(word_list)
+
+
+def load_default_form_table():
+    """Load the precomputed forms of the nouns in inflection paradigms
+       1-15, which are the paradigms currently supported by the rules."""
+    nouns = lexicon.load_lexicon().select(1, 15)
+    return build.load_form_table(nouns)
+
+
+# Number of phrases whose indices are drawn from the CSPRNG at a time
+PHRASE_BATCH_SIZE = 4096
+
+
+def generate_passphrases(count, words_per_phrase, table=None,
+                         separator=' '):
+    """Generate passphrases in bulk from a precomputed form table (by default
+       the table returned by load_default_form_table()).
+
+       Random indices are drawn in large blocks with a
+       sampling.IndexSampler, and the phrases are yielded one at a time, so
+       any number of phrases can be generated in constant memory. If count
+       is None, phrases are generated until the caller stops."""
+    if table is None:
+        table = load_default_form_table()
+    sampler = sampling.IndexSampler(len(table))
+    remaining = count
+    while remaining is None or remaining > 0:
+        batch = PHRASE_BATCH_SIZE if remaining is None else min(
+            remaining, PHRASE_BATCH_SIZE)
+        indices = sampler.sample(batch * words_per_phrase)
+        for start in range(0, len(indices), words_per_phrase):
+            yield table.phrase(indices[start:start + words_per_phrase],
+                               separator)
+        if remaining is not None:
+            remaining -= batch
+
+
 def kaikkikotona(nouns):
     nouns = nlp.prepend_lexical_info(nouns)
     nouns[0] = nouns[0] + '+Pl' + '+Nom'
     nouns[1] = nouns[1] + '+Sg' + '+Ine'
-    nouns = nlp.apply_consonant_gradation(nouns)
-    nouns = nlp.apply_inflection_rules(nouns)
-    nouns = nlp.apply_other_transformations(nouns)
-    nouns = nlp.apply_vowel_harmony(nouns)
+    nouns = list(nlp.transform_words(nouns))
 
     return f'Ei ole kaikki {nouns[0]} {nouns[1]}'
 
@@ -78,13 +133,16 @@ def main():
 
     print("Welcome to the Finnish passphrase generator!\n")
 
-    data_path = os.path.abspath('../lang_data/kotus-sanalista_v1.xml')
-    # Parse the XML file for the full word list
-    full_word_list = read_kotus_xml(data_path)
+    # Read the full word list from the binary lexicon, which is rebuilt
+    # from the XML file if needed
+    print("Loading word list...\n")
+    full_word_list = lexicon.load_lexicon()
 
     # Pick nouns from inflection paradigms 1-15
     nouns = select_inflection_paradigms(full_word_list, 1, 15)
     print(f"\nPicked a set of {len(nouns)} words")
+    form_table = precompute_forms(nouns)
+    print(f"Precomputed {len(form_table)} word forms\n")
 
     while True:
         # Simple control loop that only enforces exit condition
@@ -94,21 +152,18 @@ def main():
             break
 
         # For each run of the loop, pick a new random set from the list of
-        # nouns created earlier. Then determine their inflection and gradation
-        # paradigms using the compose_nouns() function and apply gradation,
-        # inflection, and vowel harmony rules in sequence.
+        # nouns created earlier. Then take each noun through the pipeline,
+        # which determines its inflection and gradation paradigms and applies
+        # gradation, inflection, and vowel harmony rules in sequence. The
+        # trace hook records the result of every stage for the table below.
+        stages = defaultdict(list)
         random_nouns = random_set(nouns, 50)
-        preprocessed_nouns = nlp.prepend_lexical_info(random_nouns)
-        lexical_nouns = nlp.generate_lexical_forms(preprocessed_nouns)
-        gradated_nouns = nlp.apply_consonant_gradation(lexical_nouns)
-        inflected_nouns = nlp.apply_inflection_rules(gradated_nouns)
-        almost_done = nlp.apply_other_transformations(inflected_nouns)
-        final_nouns = nlp.apply_vowel_harmony(almost_done)
-
-        processing_chain = [[
-            lexical_nouns[i], gradated_nouns[i], inflected_nouns[i],
-            final_nouns[i]
-        ] for i in range(50)]
+        final_nouns = list(nlp.stream_word_forms(
+            random_nouns,
+            trace=lambda stage, word: stages[stage].append(word)))
+
+        processing_chain = zip(stages['lexical'], stages['gradated'],
+                               stages['inflected'], final_nouns)
 
         print("\nHere are the transformations applied to the words:")
         print("\n{:30}\t{:30}\t{:20}\t{:20}\t".format("LEXICAL", "GRADATED",
@@ -116,9 +171,10 @@ def main():
         for word in processing_chain:
             print("{:30}\t{:30}\t{:20}\t{:20}\t".format(*word))
 
+        # The phrases are sampled from all forms of all nouns
         print("\nHere are some possible phrases:\n")
         for i in range(0, 4):
-            phrase = form_passphrase(final_nouns, 4)
+            phrase = form_table.passphrase(4)
             print("{0} characters: {1}\n".format(len(phrase), phrase))
 
         # print()
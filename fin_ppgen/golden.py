@@ -0,0 +1,281 @@
+"""
+This module contains a regression check of the whole inflection pipeline
+against a golden corpus: every form of every supported lexeme, with the
+gradation and inflection rules that produced it.
+
+A rule edit meant for one paradigm can silently change forms of another,
+and the unit tests only cover a few words per paradigm. The corpus is
+therefore built by expanding all lexemes into all of their forms (the
+LEXICAL_ENDINGS and the alternative plural forms of their word classes,
+see nlp.word_class_endings) in a pool of worker processes, and saved as a
+sorted, gzip-compressed file with one form per line:
+
+    lexical form <TAB> word form <TAB> gradated form <TAB> gradation rule
+    <TAB> inflection rule
+
+where the word form is the output of nlp.transform_word(), the gradated
+form is the lexical form after consonant gradation, and a rule is
+identified by its file and line, e.g. 'inflection-patterns.txt:240', or
+'-' if no rule matched. On the next run, the forms are expanded again and
+compared with the corpus. A form whose word form changed is attributed to
+the gradation rule if its gradated form changed too, and otherwise to the
+inflection rule, and the changes are reported grouped by paradigm and by
+that rule, so the rule responsible for a regression is seen at once.
+Forms that were added or removed (i.e. the word list changed) are reported
+in the same way. Rule locations alone are not compared, so inserting lines
+into a rule file does not count as a change.
+
+Save the current forms as the golden corpus, and check the forms against
+it after editing the rules, with:
+
+    python -m fin_ppgen.golden --update
+    python -m fin_ppgen.golden
+"""
+
+import argparse
+from collections import defaultdict
+from collections import namedtuple
+import concurrent.futures
+import gzip
+import os
+import re
+import sys
+import time
+
+from fin_ppgen import lexicon as lexicon_module
+from fin_ppgen import nlp
+
+
+GOLDEN_CORPUS = os.path.join(nlp.FPATH, '../lang_data/golden-corpus.tsv.gz')
+CORPUS_HEADER = '# fin_ppgen golden corpus, version 1'
+
+# Number of lexemes expanded by a worker per task
+CHUNK_SIZE = 1000
+
+# Number of changed forms shown per paradigm and rule by default
+EXAMPLES = 5
+
+PARADIGM = re.compile(r'<N(\d+)[A-M]?>')
+
+GoldenForm = namedtuple('GoldenForm', ['word', 'gradated', 'gradation',
+                                       'inflection'])
+FormChange = namedtuple('FormChange', ['lexical_form', 'old', 'new'])
+
+
+class CorpusFormatError(ValueError):
+    """Raised when a golden corpus file cannot be read."""
+
+
+def rule_id(rule):
+    """Return the file and line of a rule, e.g. 'gradation-patterns.txt:12',
+       or '-' for None."""
+    if rule is None:
+        return '-'
+    return os.path.basename(rule.location)
+
+
+def expand_form(word):
+    """Return the GoldenForm of a lexical form with endings. The form is
+       run through the stages of the pipeline (nlp.STAGES), and the rules
+       that matched its gradation and inflection stages are looked up."""
+    stages = {}
+    final = next(nlp.transform_words(
+        [word], lambda stage, form: stages.__setitem__(stage, form)))
+    rule_sets = nlp.preload()
+    gradation = rule_sets['gradation'].find(nlp.lexical_plural(word))
+    inflection = rule_sets['inflection'].find(stages['gradated'])
+    return GoldenForm(final, stages['gradated'], rule_id(gradation),
+                      rule_id(inflection))
+
+
+def expand_lexemes(lexemes):
+    """Expand lexical bases (see nlp.lexical_base) into all of their forms.
+       lexemes is a list of (base, endings) tuples. Return a list of
+       (lexical form, GoldenForm) tuples."""
+    return [(base + ending, expand_form(base + ending))
+            for base, endings in lexemes for ending in endings]
+
+
+def expand_corpus(lexicon, endings=None, jobs=None, chunk_size=CHUNK_SIZE):
+    """Expand all lexemes of a lexicon into all of their forms: the given
+       endings, or by default the endings of the word class of each lexeme
+       (nlp.word_class_endings). Return a dict from lexical forms to
+       GoldenForms. jobs is the number of worker processes (default: the
+       number of CPUs); with one, the forms are expanded in this
+       process."""
+    class_endings = {}
+    lexemes = []
+    for lexeme in lexicon:
+        word_class = (lexeme.paradigm, lexeme.gradation)
+        if word_class not in class_endings:
+            class_endings[word_class] = tuple(
+                endings or nlp.word_class_endings(*word_class))
+        lexemes.append((nlp.lexical_base(lexeme), class_endings[word_class]))
+    chunks = [lexemes[i:i + chunk_size]
+              for i in range(0, len(lexemes), chunk_size)]
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(chunks) < 2:
+        return dict(item for chunk in chunks
+                    for item in expand_lexemes(chunk))
+    corpus = {}
+    with concurrent.futures.ProcessPoolExecutor(
+            jobs, initializer=nlp.preload) as pool:
+        for expanded in pool.map(expand_lexemes, chunks):
+            corpus.update(expanded)
+    return corpus
+
+
+def write_corpus(corpus, file_path=GOLDEN_CORPUS):
+    """Write a corpus into a file, sorted by lexical form. The file does
+       not depend on when it was written, so unchanged corpora are
+       byte-identical."""
+    lines = [CORPUS_HEADER]
+    lines.extend('\t'.join((lexical_form,) + corpus[lexical_form])
+                 for lexical_form in sorted(corpus))
+    tmp_path = file_path + '.tmp'
+    with open(tmp_path, 'wb') as fp:
+        with gzip.GzipFile(filename='', mode='wb', fileobj=fp,
+                           mtime=0) as gz:
+            gz.write(('\n'.join(lines) + '\n').encode('utf-8'))
+    os.replace(tmp_path, file_path)
+
+
+def read_corpus(file_path=GOLDEN_CORPUS):
+    """Read a corpus from a file into a dict from lexical forms to
+       GoldenForms."""
+    try:
+        with gzip.open(file_path, 'rb') as fp:
+            text = fp.read().decode('utf-8')
+    except (gzip.BadGzipFile, EOFError, UnicodeDecodeError) as err:
+        raise CorpusFormatError(f"{file_path}: {err}") from None
+    lines = text.split('\n')
+    if lines[0] != CORPUS_HEADER or lines[-1]:
+        raise CorpusFormatError(f"{file_path}: not a version 1 golden "
+                                f"corpus")
+    corpus = {}
+    for line_number, line in enumerate(lines[1:-1], 2):
+        fields = line.split('\t')
+        if len(fields) != 5:
+            raise CorpusFormatError(f"{file_path}:{line_number}: expected 5 "
+                                    f"fields, got {len(fields)}")
+        corpus[fields[0]] = GoldenForm(*fields[1:])
+    return corpus
+
+
+def diff_corpora(old, new):
+    """Return the FormChanges from one corpus to another, sorted by lexical
+       form. A form that was added has old None, and a form that was
+       removed has new None. Changes of the rule locations alone are not
+       reported."""
+    changed = [lexical_form for lexical_form, form in new.items()
+               if lexical_form not in old
+               or old[lexical_form].word != form.word]
+    changed.extend(old.keys() - new.keys())
+    return [FormChange(lexical_form, old.get(lexical_form),
+                       new.get(lexical_form))
+            for lexical_form in sorted(changed)]
+
+
+def paradigm(lexical_form):
+    """Return the inflection paradigm of a lexical form, e.g. 12 for
+       '<N12A>kulkija+Pl+Ine'."""
+    return int(PARADIGM.match(lexical_form).group(1))
+
+
+def change_rule(change):
+    """Return the rule a change is attributed to as a string: the gradation
+       rule if the gradated form changed, and the inflection rule
+       otherwise, with the rule that matched before if it was another one.
+       Added and removed forms are attributed to their inflection rule."""
+    old, new = change.old, change.new
+    if old is None or new is None:
+        return (new or old).inflection
+    field = 'gradation' if old.gradated != new.gradated else 'inflection'
+    rule, old_rule = getattr(new, field), getattr(old, field)
+    if rule != old_rule:
+        return f"{rule} (was {old_rule})"
+    return rule
+
+
+def group_changes(changes):
+    """Group changes by paradigm and by rule. Return a dict from paradigms
+       to dicts from change_rule() strings to lists of changes."""
+    groups = defaultdict(lambda: defaultdict(list))
+    for change in changes:
+        groups[paradigm(change.lexical_form)][change_rule(change)].append(
+            change)
+    return groups
+
+
+def format_change(change):
+    """Format a change as a line, e.g.
+       "<N10>koira+Pl+Ine: 'koirissa' -> 'koiroissa'"."""
+    old = repr(change.old.word) if change.old else '(new)'
+    new = repr(change.new.word) if change.new else '(removed)'
+    return f"{change.lexical_form}: {old} -> {new}"
+
+
+def format_changes(changes, total, examples=EXAMPLES):
+    """Format changes as a report grouped by paradigm and rule, with up to
+       examples changes shown per group (None for all). total is the number
+       of forms checked."""
+    lines = []
+    for paradigm_number, rule_groups in sorted(group_changes(changes).items()):
+        count = sum(len(group) for group in rule_groups.values())
+        lines.append(f"N{paradigm_number}: {count} forms")
+        for rule, group in sorted(rule_groups.items(),
+                                  key=lambda item: -len(item[1])):
+            lines.append(f"  {rule}: {len(group)} forms")
+            shown = group if examples is None else group[:examples]
+            lines.extend(f"    {format_change(change)}" for change in shown)
+            if len(shown) < len(group):
+                lines.append(f"    ... and {len(group) - len(shown)} more")
+    added = sum(change.old is None for change in changes)
+    removed = sum(change.new is None for change in changes)
+    lines.append(f"{len(changes) - added - removed} changed, {added} added, "
+                 f"{removed} removed of {total} forms")
+    return lines
+
+
+def main(argv=None):
+    """Check the forms against the golden corpus, or update it, from the
+       command line."""
+    parser = argparse.ArgumentParser(
+        description="Inflect every supported word in all of its forms and "
+        "compare the forms with a golden corpus.")
+    parser.add_argument('--update', action='store_true',
+                        help="save the current forms as the golden corpus")
+    parser.add_argument('--corpus', default=GOLDEN_CORPUS,
+                        help="path of the golden corpus file")
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help="number of worker processes (default: one per "
+                        "CPU)")
+    parser.add_argument('--examples', type=int, default=EXAMPLES,
+                        help="changed forms shown per paradigm and rule "
+                        "(0 for all)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    nouns = lexicon_module.load_lexicon().select(1, 15)
+    corpus = expand_corpus(nouns, jobs=args.jobs)
+    if args.update:
+        write_corpus(corpus, args.corpus)
+        print(f"Wrote {len(corpus)} forms to {args.corpus} in "
+              f"{time.perf_counter() - start:.2f} s")
+        return 0
+
+    try:
+        golden = read_corpus(args.corpus)
+    except (OSError, ValueError) as err:
+        print(f"error: {err} (create the corpus with --update)",
+              file=sys.stderr)
+        return 2
+    changes = diff_corpora(golden, corpus)
+    print('\n'.join(format_changes(changes, len(corpus),
+                                   args.examples or None)))
+    print(f"Checked in {time.perf_counter() - start:.2f} s")
+    return 1 if changes else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
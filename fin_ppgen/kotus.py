@@ -0,0 +1,61 @@
+"""
+This module contains functions for reading word entries from the Kotus
+word list XML file into lightweight records.
+
+The XML file is read as a stream, one <st> element at a time, and each
+element is discarded as soon as its record has been built. Memory use
+therefore stays flat regardless of the size of the word list.
+"""
+
+from collections import namedtuple
+import xml.etree.ElementTree as ET
+
+
+# A single <st> entry of the word list. Entries without a <t> element
+# (mostly compound nouns) get the paradigm number 0, and entries without
+# an <av> element get an empty gradation letter.
+KotusEntry = namedtuple('KotusEntry', ['lemma', 'paradigm', 'gradation'])
+
+
+def entry_from_element(element):
+    """Convert an <st> element into a KotusEntry. Only the first inflection
+       paradigm and gradation letter of the entry are used."""
+    paradigm = 0
+    gradation = ''
+    tn = element.find('t/tn')
+    if tn is not None:
+        paradigm = int(tn.text)
+    av = element.find('.//av')
+    if av is not None:
+        gradation = av.text
+    return KotusEntry(element.findtext('s'), paradigm, gradation)
+
+
+def iter_entries(source, paradigms=None):
+    """Stream word entries from a Kotus XML file and yield them as
+       KotusEntry records.
+
+       The source can be a file path or a binary file object. If paradigms
+       is given, only entries whose paradigm number is in it are yielded;
+       use 0 to include entries without an inflection paradigm."""
+    context = ET.iterparse(source, events=('start', 'end'))
+    root = None
+    for event, element in context:
+        if root is None:
+            root = element
+        if event != 'end' or element.tag != 'st':
+            continue
+
+        entry = entry_from_element(element)
+        # Free the element and detach it from the root so that the tree
+        # never grows beyond a single entry
+        element.clear()
+        root.clear()
+        if paradigms is None or entry.paradigm in paradigms:
+            yield entry
+
+
+def read_entries(file_path, paradigms=None):
+    """Read the Kotus XML file and return its word entries as a list of
+       KotusEntry records."""
+    return list(iter_entries(file_path, paradigms))
@@ -0,0 +1,308 @@
+"""
+This module contains a persistent ledger of issued passphrases, used to
+make sure that no passphrase is issued twice across runs.
+
+Keeping every issued phrase in a set does not scale to hundreds of
+millions of phrases, so the ledger is a Bloom filter in a memory-mapped
+file. The size of the filter and the number of hash functions are chosen
+from the number of phrases it should hold (its capacity) and the wanted
+false-positive rate. A phrase that is in the ledger is always reported as
+issued; a phrase that is not is reported as issued with a probability
+that grows as the filter fills up, so the generator simply draws another
+phrase on a hit (see issue()). The fill level and the current
+false-positive estimate are reported by BloomLedger.report().
+
+A ledger file is locked while it is open, because adding phrases from two
+processes at once could lose phrases of one of them. Ledgers with the
+same parameters, e.g. ones written by separate generator processes or
+hosts, can be merged into one. File layout (all
+integers little-endian):
+
+    header      magic, format version, number of hash functions, number
+                of bits, capacity, number of phrases added, wanted
+                false-positive rate (double)
+    bits        the bit array of the filter
+
+Show the state of a ledger, or merge ledgers, with:
+
+    python -m fin_ppgen.ledger info issued.ledger
+    python -m fin_ppgen.ledger merge issued.ledger worker-*.ledger
+"""
+
+import argparse
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import struct
+import sys
+
+
+MAGIC = b'FPBL'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHHQQQd')
+
+DEFAULT_CAPACITY = 100_000_000
+DEFAULT_FP_RATE = 1e-9
+
+# Number of consecutive hits after which issue() gives up
+MAX_RETRIES = 1000
+
+# Size of the blocks of the bit array processed at a time in bytes
+BLOCK_SIZE = 1 << 20
+
+
+class LedgerFormatError(ValueError):
+    """Raised when a ledger file cannot be read."""
+
+
+class LedgerLockedError(OSError):
+    """Raised when a ledger file is open in another process."""
+
+
+class LedgerFullError(RuntimeError):
+    """Raised when no phrase that is not in the ledger can be found."""
+
+
+def filter_parameters(capacity, fp_rate):
+    """Return the number of bits (a multiple of 8) and the number of hash
+       functions of a Bloom filter that holds capacity items with the given
+       false-positive rate."""
+    if capacity < 1:
+        raise ValueError("capacity must be positive")
+    if not 0 < fp_rate < 1:
+        raise ValueError("false-positive rate must be between 0 and 1")
+    bits = math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2)
+    bits = (bits + 7) // 8 * 8
+    hashes = max(1, round(bits / capacity * math.log(2)))
+    return bits, hashes
+
+
+def phrase_hash(phrase):
+    """Return the two 64-bit hashes of a phrase that the bit positions are
+       derived from."""
+    digest = hashlib.blake2b(phrase.encode('utf-8'), digest_size=16,
+                             person=b'fin_ppgen').digest()
+    return (int.from_bytes(digest[:8], 'little'),
+            int.from_bytes(digest[8:], 'little') | 1)
+
+
+class BloomLedger:
+    """A Bloom filter of issued passphrases in a memory-mapped file."""
+
+    def __init__(self, file_path):
+        self.path = file_path
+        # The lock is held until the file is closed
+        self._file = open(file_path, 'r+b')
+        try:
+            try:
+                fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise LedgerLockedError(f"{file_path}: the ledger is in use "
+                                        f"by another process") from None
+            self._mmap = mmap.mmap(self._file.fileno(), 0)
+        except BaseException:
+            self._file.close()
+            raise
+        if len(self._mmap) < HEADER.size:
+            self._unmap()
+            raise LedgerFormatError(f"{file_path}: truncated header")
+        (magic, version, self.hashes, self.size, self.capacity, self.added,
+         self.fp_rate) = HEADER.unpack_from(self._mmap)
+        if (magic != MAGIC or version != FORMAT_VERSION or not self.hashes
+                or not self.size or self.size % 8):
+            self._unmap()
+            raise LedgerFormatError(f"{file_path}: not a version "
+                                    f"{FORMAT_VERSION} ledger")
+        if len(self._mmap) != HEADER.size + self.size // 8:
+            self._unmap()
+            raise LedgerFormatError(f"{file_path}: unexpected file size")
+        self.bits = memoryview(self._mmap)[HEADER.size:]
+
+    @classmethod
+    def create(cls, file_path, capacity=DEFAULT_CAPACITY,
+               fp_rate=DEFAULT_FP_RATE):
+        """Create an empty ledger file and open it. The bit array is
+           allocated as a sparse file where possible."""
+        size, hashes = filter_parameters(capacity, fp_rate)
+        tmp_path = file_path + '.tmp'
+        with open(tmp_path, 'wb') as fp:
+            fp.write(HEADER.pack(MAGIC, FORMAT_VERSION, hashes, size,
+                                 capacity, 0, fp_rate))
+            fp.truncate(HEADER.size + size // 8)
+        os.replace(tmp_path, file_path)
+        return cls(file_path)
+
+    @classmethod
+    def open(cls, file_path, capacity=DEFAULT_CAPACITY,
+             fp_rate=DEFAULT_FP_RATE):
+        """Open a ledger file, or create it with the given capacity and
+           false-positive rate if it does not exist."""
+        if os.path.exists(file_path):
+            return cls(file_path)
+        return cls.create(file_path, capacity, fp_rate)
+
+    def flush(self):
+        """Write the header and the changed pages to the file."""
+        HEADER.pack_into(self._mmap, 0, MAGIC, FORMAT_VERSION, self.hashes,
+                         self.size, self.capacity, self.added, self.fp_rate)
+        self._mmap.flush()
+
+    def _unmap(self):
+        self._mmap.close()
+        self._file.close()
+
+    def close(self):
+        """Flush, release the memory mapping, and unlock the file."""
+        if self._mmap.closed:
+            return
+        self.flush()
+        self.bits.release()
+        self._unmap()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def positions(self, phrase):
+        """Return the bit positions of a phrase."""
+        first, step = phrase_hash(phrase)
+        size = self.size
+        return [(first + i * step) % size for i in range(self.hashes)]
+
+    def __contains__(self, phrase):
+        bits = self.bits
+        return all(bits[i >> 3] >> (i & 7) & 1
+                   for i in self.positions(phrase))
+
+    def add(self, phrase):
+        """Add a phrase to the ledger. Return False if it was probably in
+           the ledger already, and True otherwise."""
+        bits = self.bits
+        new = False
+        for i in self.positions(phrase):
+            byte = bits[i >> 3]
+            mask = 1 << (i & 7)
+            if not byte & mask:
+                bits[i >> 3] = byte | mask
+                new = True
+        if new:
+            self.added += 1
+        return new
+
+    def merge(self, other):
+        """Add all phrases of another ledger with the same parameters to
+           this one."""
+        if (other.size, other.hashes) != (self.size, self.hashes):
+            raise ValueError(f"cannot merge {other.path} into {self.path}: "
+                             f"the ledgers have different parameters")
+        for start in range(0, len(self.bits), BLOCK_SIZE):
+            end = start + BLOCK_SIZE
+            merged = (int.from_bytes(self.bits[start:end], 'little')
+                      | int.from_bytes(other.bits[start:end], 'little'))
+            self.bits[start:end] = merged.to_bytes(
+                len(self.bits[start:end]), 'little')
+        # Phrases added to both ledgers are counted twice
+        self.added += other.added
+
+    def bits_set(self):
+        """The number of bits set in the filter."""
+        return sum(int.from_bytes(self.bits[start:start + BLOCK_SIZE],
+                                  'little').bit_count()
+                   for start in range(0, len(self.bits), BLOCK_SIZE))
+
+    def report(self):
+        """Return the fill level and false-positive estimates of the ledger
+           as a dict."""
+        bits_set = self.bits_set()
+        fill = bits_set / self.size
+        estimated = (-self.size / self.hashes * math.log1p(-fill)
+                     if fill < 1 else math.inf)
+        return {
+            'path': self.path,
+            'bits': self.size,
+            'hashes': self.hashes,
+            'capacity': self.capacity,
+            'target_fp_rate': self.fp_rate,
+            'added': self.added,
+            'estimated_phrases': estimated,
+            'bits_set': bits_set,
+            'fill': fill,
+            'fp_rate': fill ** self.hashes,
+        }
+
+
+def format_report(report):
+    """Format a ledger report as a list of lines."""
+    return [
+        f"{report['path']}: {report['added']:,} phrases added "
+        f"(about {report['estimated_phrases']:,.0f} distinct), capacity "
+        f"{report['capacity']:,}",
+        f"{report['bits']:,} bits, {report['hashes']} hashes, "
+        f"{report['fill']:.2%} full",
+        f"false-positive rate: {report['fp_rate']:.3g} "
+        f"(target {report['target_fp_rate']:.3g} at capacity)",
+    ]
+
+
+def issue(phrases, count, ledger, max_retries=MAX_RETRIES):
+    """Yield count phrases from an iterable of random phrases that are not
+       in the ledger, and add them to it. Phrases that are probably in the
+       ledger already are skipped, i.e. a new phrase is drawn instead. Raise
+       LedgerFullError if max_retries phrases in a row are hits."""
+    retries = 0
+    issued = 0
+    for phrase in phrases:
+        if issued >= count:
+            return
+        if ledger.add(phrase):
+            retries = 0
+            issued += 1
+            yield phrase
+        else:
+            retries += 1
+            if retries >= max_retries:
+                raise LedgerFullError(f"{ledger.path}: {retries} phrases in "
+                                      f"a row were already issued")
+    if issued < count:
+        raise LedgerFullError(f"ran out of phrases after {issued} of "
+                              f"{count}")
+
+
+def main(argv=None):
+    """Show or merge ledgers from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Show the state of ledgers of issued passphrases, or "
+        "merge them.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    info = subparsers.add_parser('info', help="show the fill level and "
+                                 "false-positive estimate of ledgers")
+    info.add_argument('ledgers', nargs='+')
+    merge = subparsers.add_parser('merge', help="merge ledgers into the "
+                                  "first one")
+    merge.add_argument('target')
+    merge.add_argument('sources', nargs='+')
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == 'info':
+            for path in args.ledgers:
+                with BloomLedger(path) as ledger:
+                    print('\n'.join(format_report(ledger.report())))
+        else:
+            with BloomLedger(args.target) as target:
+                for path in args.sources:
+                    with BloomLedger(path) as source:
+                        target.merge(source)
+                print('\n'.join(format_report(target.report())))
+    except (OSError, ValueError) as err:
+        print(f"error: {err}", file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,333 @@
+"""
+This module contains functions for building and loading a compact binary
+lexicon from the Kotus word list.
+
+Parsing the Kotus XML file takes several seconds, so the word entries are
+parsed once and saved into a binary file. The binary lexicon stores the
+SHA-256 hash of the XML file it was built from, and it is rebuilt
+automatically whenever the XML file changes.
+
+In memory, the lexicon is kept as a Lexicon object: a struct of parallel
+arrays (lemmas, paradigm numbers, gradation letters) that only builds
+Lexeme objects for the entries that are actually accessed. A
+LexiconIndex maps each paradigm number and gradation letter to the IDs
+(positions) of its lexemes, so word classes can be selected without
+scanning the whole lexicon.
+
+Binary lexicon layout (all integers little-endian):
+
+    header      magic, format version, SHA-256 of the source XML,
+                number of entries, size of the lemma blob
+    paradigms   one unsigned byte per entry (0 = no inflection paradigm)
+    gradations  one ASCII byte per entry (0 = no consonant gradation)
+    lemmas      UTF-8 encoded lemmas separated by newlines
+"""
+
+from array import array
+import argparse
+from collections import defaultdict
+import hashlib
+import os.path
+import struct
+
+from fin_ppgen import kotus
+
+
+MAGIC = b'FPLX'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sH32sII')
+
+FPATH = os.path.dirname(__file__)
+KOTUS_XML = os.path.join(FPATH, '../lang_data/kotus-sanalista_v1.xml')
+
+GRADATION_LETTERS = 'ABCDEFGHIJKLM'
+
+
+class LexiconFormatError(ValueError):
+    """Raised when a binary lexicon file cannot be read."""
+
+
+class Lexeme:
+    """A single word of the lexicon with its inflection paradigm number
+       (0 if the word has none) and consonant gradation letter ('' if the
+       word has none)."""
+
+    __slots__ = ('lemma', 'paradigm', 'gradation')
+
+    def __init__(self, lemma, paradigm=0, gradation=''):
+        self.lemma = lemma
+        self.paradigm = paradigm
+        self.gradation = gradation
+
+    def __repr__(self):
+        return (f'Lexeme({self.lemma!r}, {self.paradigm}, '
+                f'{self.gradation!r})')
+
+    def __eq__(self, other):
+        if not isinstance(other, Lexeme):
+            return NotImplemented
+        return (self.lemma, self.paradigm, self.gradation) == \
+            (other.lemma, other.paradigm, other.gradation)
+
+    def __hash__(self):
+        return hash((self.lemma, self.paradigm, self.gradation))
+
+
+class Lexicon:
+    """An array-backed sequence of lexemes.
+
+       The lemmas are kept in a list and the paradigm numbers and gradation
+       letters in byte arrays, so an entry takes little more memory than its
+       lemma string. Indexing with an integer returns a Lexeme and indexing
+       with a slice returns a new Lexicon."""
+
+    __slots__ = ('lemmas', 'paradigms', 'gradations', '_index')
+
+    def __init__(self, lemmas=(), paradigms=(), gradations=()):
+        self._index = None
+        self.lemmas = list(lemmas)
+        # Gradation letters are stored as their character codes, 0 = none
+        self.paradigms = array('B', paradigms)
+        self.gradations = array('B', gradations)
+        if not len(self.lemmas) == len(self.paradigms) == \
+           len(self.gradations):
+            raise ValueError("lexicon arrays must have the same length")
+
+    @classmethod
+    def from_entries(cls, entries):
+        """Build a lexicon from records with lemma, paradigm and gradation
+           attributes, such as kotus.KotusEntry or Lexeme."""
+        lexicon = cls()
+        for entry in entries:
+            lexicon.lemmas.append(entry.lemma)
+            lexicon.paradigms.append(entry.paradigm)
+            lexicon.gradations.append(
+                ord(entry.gradation) if entry.gradation else 0)
+        return lexicon
+
+    def __len__(self):
+        return len(self.lemmas)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return Lexicon(self.lemmas[index], self.paradigms[index],
+                           self.gradations[index])
+        gradation = self.gradations[index]
+        return Lexeme(self.lemmas[index], self.paradigms[index],
+                      chr(gradation) if gradation else '')
+
+    def __iter__(self):
+        for lemma, paradigm, gradation in zip(self.lemmas, self.paradigms,
+                                              self.gradations):
+            yield Lexeme(lemma, paradigm, chr(gradation) if gradation else '')
+
+    def __eq__(self, other):
+        if not isinstance(other, Lexicon):
+            return NotImplemented
+        return (self.lemmas == other.lemmas
+                and self.paradigms == other.paradigms
+                and self.gradations == other.gradations)
+
+    def __repr__(self):
+        return f'<Lexicon with {len(self)} lexemes>'
+
+    def take(self, ids):
+        """Return a new lexicon with the lexemes at the given positions."""
+        lemmas, paradigms, gradations = (self.lemmas, self.paradigms,
+                                         self.gradations)
+        return Lexicon([lemmas[i] for i in ids], [paradigms[i] for i in ids],
+                       [gradations[i] for i in ids])
+
+    @property
+    def index(self):
+        """The LexiconIndex of the lexicon, built on first use. The index is
+           not updated if the lexicon is modified afterwards."""
+        if self._index is None:
+            self._index = LexiconIndex(self)
+        return self._index
+
+    def where(self, paradigms=None, gradations=None):
+        """Return a new lexicon with the lexemes whose paradigm is in the
+           given paradigms and whose gradation letter ('' for none) is in the
+           given gradations. None allows any paradigm or gradation."""
+        return self.take(self.index.query(paradigms, gradations))
+
+    def select(self, lower_limit, upper_limit):
+        """Return a new lexicon with the lexemes whose inflection paradigm
+           is between the given limits (inclusive)."""
+        return self.where(range(max(lower_limit, 1), upper_limit + 1))
+
+
+class LexiconIndex:
+    """An index from the word classes of a lexicon, i.e. the pairs of
+       paradigm number and gradation letter ('' for none), to the IDs of
+       their lexemes in file order.
+
+       Queries only touch the classes they select, so selecting a word
+       class takes time in proportion to the size of the result rather
+       than the size of the lexicon. The paradigm() and gradation()
+       methods return sets of IDs that can be combined with any set
+       operations and passed to Lexicon.take() in sorted order."""
+
+    def __init__(self, lexicon):
+        classes = defaultdict(lambda: array('I'))
+        for i, (paradigm, gradation) in enumerate(zip(lexicon.paradigms,
+                                                      lexicon.gradations)):
+            classes[paradigm, chr(gradation) if gradation else ''].append(i)
+        self.classes = dict(classes)
+
+    def __len__(self):
+        return sum(len(ids) for ids in self.classes.values())
+
+    def word_classes(self):
+        """Return the (paradigm, gradation) pairs present in the lexicon."""
+        return sorted(self.classes)
+
+    def class_ids(self, classes):
+        """Return the sorted IDs of the lexemes in the given word classes."""
+        runs = [self.classes[word_class] for word_class in set(classes)
+                if word_class in self.classes]
+        if len(runs) == 1:
+            return list(runs[0])
+        # Each run is sorted, so sorting their concatenation is fast
+        return sorted(i for run in runs for i in run)
+
+    def query(self, paradigms=None, gradations=None):
+        """Return the sorted IDs of the lexemes in any of the paradigms and
+           any of the gradations. None allows any paradigm or gradation."""
+        if paradigms is not None:
+            paradigms = set(paradigms)
+        if gradations is not None:
+            gradations = set(gradations)
+            unknown = gradations - set(GRADATION_LETTERS) - {''}
+            if unknown:
+                raise ValueError(f"unknown gradation letters: {unknown}")
+        return self.class_ids(
+            (paradigm, gradation) for paradigm, gradation in self.classes
+            if (paradigms is None or paradigm in paradigms)
+            and (gradations is None or gradation in gradations))
+
+    def paradigm(self, *paradigms):
+        """Return the set of IDs of the lexemes in any of the paradigms."""
+        return set(self.query(paradigms=paradigms))
+
+    def gradation(self, *gradations):
+        """Return the set of IDs of the lexemes with any of the gradation
+           letters ('' for none)."""
+        return set(self.query(gradations=gradations))
+
+
+def default_cache_path(xml_path):
+    """Return the path of the binary lexicon for an XML file."""
+    return os.path.splitext(xml_path)[0] + '.lex'
+
+
+def source_digest(file_path):
+    """Return the SHA-256 digest of a file as bytes."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def write_lexicon(entries, cache_path, digest):
+    """Write word entries (a Lexicon or an iterable of records with lemma,
+       paradigm and gradation attributes) into a binary lexicon file."""
+    if not isinstance(entries, Lexicon):
+        entries = Lexicon.from_entries(entries)
+    paradigms = entries.paradigms.tobytes()
+    gradations = entries.gradations.tobytes()
+    blob = '\n'.join(entries.lemmas).encode('utf-8')
+
+    # Write into a temporary file first so that concurrent readers never
+    # see a half-written lexicon
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'wb') as fp:
+        fp.write(HEADER.pack(MAGIC, FORMAT_VERSION, digest, len(entries),
+                             len(blob)))
+        fp.write(paradigms)
+        fp.write(gradations)
+        fp.write(blob)
+    os.replace(tmp_path, cache_path)
+
+
+def read_lexicon(cache_path):
+    """Read a binary lexicon file. Return the digest of the source XML file
+       and the word entries as a Lexicon."""
+    with open(cache_path, 'rb') as fp:
+        data = fp.read()
+    if len(data) < HEADER.size:
+        raise LexiconFormatError(f"{cache_path}: truncated header")
+    magic, version, digest, count, blob_size = HEADER.unpack_from(data)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise LexiconFormatError(f"{cache_path}: not a version "
+                                 f"{FORMAT_VERSION} lexicon file")
+    if len(data) != HEADER.size + 2 * count + blob_size:
+        raise LexiconFormatError(f"{cache_path}: unexpected file size")
+
+    start = HEADER.size
+    paradigms = data[start:start + count]
+    gradations = data[start + count:start + 2 * count]
+    blob = data[start + 2 * count:]
+    lemmas = blob.decode('utf-8').split('\n') if count else []
+
+    return digest, Lexicon(lemmas, paradigms, gradations)
+
+
+def build_lexicon(xml_path=KOTUS_XML, cache_path=None):
+    """Parse the Kotus XML file and save its word entries into a binary
+       lexicon. Return the word entries."""
+    if cache_path is None:
+        cache_path = default_cache_path(xml_path)
+    digest = source_digest(xml_path)
+    entries = Lexicon.from_entries(kotus.iter_entries(xml_path))
+    write_lexicon(entries, cache_path, digest)
+    return entries
+
+
+def load_lexicon(xml_path=KOTUS_XML, cache_path=None):
+    """Return the word entries of the Kotus word list as a Lexicon.
+
+       The entries are read from the binary lexicon if it is up to date with
+       the XML file. Otherwise the XML file is parsed and the binary lexicon
+       is rebuilt; if the lexicon cannot be written (e.g. on a read-only
+       file system), the parsed entries are returned anyway."""
+    if cache_path is None:
+        cache_path = default_cache_path(xml_path)
+    digest = source_digest(xml_path)
+
+    try:
+        cached_digest, entries = read_lexicon(cache_path)
+    except (OSError, LexiconFormatError):
+        pass
+    else:
+        if cached_digest == digest:
+            return entries
+
+    entries = Lexicon.from_entries(kotus.iter_entries(xml_path))
+    try:
+        write_lexicon(entries, cache_path, digest)
+    except OSError:
+        pass
+    return entries
+
+
+def main():
+    """Build the binary lexicon from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Build a binary lexicon from the Kotus word list.")
+    parser.add_argument('--xml', default=KOTUS_XML,
+                        help="path to the Kotus XML file")
+    parser.add_argument('--output', default=None,
+                        help="path of the binary lexicon "
+                        "(default: next to the XML file)")
+    args = parser.parse_args()
+
+    cache_path = args.output or default_cache_path(args.xml)
+    entries = build_lexicon(args.xml, cache_path)
+    print(f"Wrote {len(entries)} word entries to {cache_path}")
+
+
+if __name__ == '__main__':
+    main()
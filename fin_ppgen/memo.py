@@ -0,0 +1,94 @@
+"""
+This module contains a bounded cache for memoizing the word transformation
+functions of the nlp module (see nlp.enable_caches).
+
+Unlike functools.lru_cache, the cache can evict entries either in least
+recently used (LRU) or in first in, first out (FIFO) order, and it keeps
+statistics of its hits, misses, and evictions. With FIFO eviction, hits do
+not reorder the entries, so they are slightly cheaper.
+"""
+
+from collections import OrderedDict
+import functools
+
+
+POLICIES = ['lru', 'fifo']
+DEFAULT_MAXSIZE = 1 << 19
+
+
+class BoundedCache:
+    """A cache holding at most maxsize entries, evicted with the given
+       policy ('lru' or 'fifo')."""
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, policy='lru'):
+        if maxsize < 1:
+            raise ValueError("maxsize must be positive")
+        if policy not in POLICIES:
+            raise ValueError(f"unknown eviction policy {policy!r}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.data = OrderedDict() if policy == 'lru' else {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, key):
+        return key in self.data
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def clear(self):
+        self.data.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def put(self, key, value):
+        data = self.data
+        if key not in data and len(data) >= self.maxsize:
+            if self.policy == 'lru':
+                data.popitem(last=False)
+            else:
+                del data[next(iter(data))]
+            self.evictions += 1
+        data[key] = value
+
+    def wrap(self, func):
+        """Return a version of a one-argument function that looks its
+           results up in the cache. The original function is available as
+           the __wrapped__ attribute and the cache as the cache attribute."""
+        data = self.data
+        lru = self.policy == 'lru'
+        put = self.put
+
+        @functools.wraps(func)
+        def cached(key):
+            try:
+                value = data[key]
+            except KeyError:
+                self.misses += 1
+                value = func(key)
+                put(key, value)
+                return value
+            self.hits += 1
+            if lru:
+                data.move_to_end(key)
+            return value
+
+        cached.cache = self
+        return cached
+
+    def info(self):
+        return {
+            'size': len(self.data),
+            'maxsize': self.maxsize,
+            'policy': self.policy,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hit_rate,
+        }
@@ -1,6 +1,10 @@
 """
 This module contains NLP functions for processing strings read from the
 Kotus word list into lexical representations and into final word forms.
+
+The gradation and inflection rules are loaded on first use, so importing
+the module is cheap. Long-running processes can load them up front with
+preload().
 """
 
 import os.path
@@ -8,35 +12,11 @@ import os.path
 import re
 import secrets
 
-
-# This approach of handling the necessary regex functions by using closures
-# to dynamically build the functions is taken from Dive into Python 3
-# by Mark Pilgrim (see http://www.diveintopython3.net/generators.html)
-def build_inflect_functions(pattern, search, replace):
-    """Dynamically build regex search and replace functions."""
-
-    def match_rule(word):
-        return re.search(pattern, word)
-
-    def inflect_rule(word):
-        return re.sub(search, replace, word)
-
-    return (match_rule, inflect_rule)
-
-
-def initialize_rules(pattern_file):
-    """A helper function for extracting regex search and replace rules
-       from an external file."""
-
-    rules = []
-    with open(pattern_file, encoding='utf-8') as fp:
-        for line in fp:
-            if line[0] in ['#', '\n', '\r']:  # skip comments and empty lines
-                continue
-            pattern, search, replace = line.split(None, 3)
-            rules.append(build_inflect_functions(pattern, search, replace))
-
-    return rules
+from fin_ppgen import memo
+from fin_ppgen import rules
+from fin_ppgen import sampling
+# Kept for code that builds its own rules with the old helper functions
+from fin_ppgen.rules import build_inflect_functions, initialize_rules
 
 
 # Sets for noun endings
@@ -46,50 +26,115 @@ INFLECTIONS = [
     '+Ess', '+Tra'
 ]
 CLITICS = ['', 'hAn', 'kin', 'kO', 'pA', 'pAs']
+LEXICAL_ENDINGS = [
+    number + inflection for number in GRAM_NUMBER for inflection in INFLECTIONS
+]
+# Endings of the alternative plural genitive and partitive forms. Each
+# paradigm has the ones that the inflection rules cover (see
+# word_class_endings).
+ALTERNATIVE_ENDINGS = {
+    '+Pl+Gen': ['+Pl+Gen2', '+Pl+Gen3', '+Pl+Gen4'],
+    '+Pl+Par': ['+Pl+Par2', '+Pl+Par3'],
+}
+# All endings the rules are written for
+RULE_ENDINGS = LEXICAL_ENDINGS + [
+    ending for endings in ALTERNATIVE_ENDINGS.values() for ending in endings
+]
 # Regex match and replace rules
 FPATH = os.path.dirname(__file__)
-GRADATION_RULES = initialize_rules(
-    os.path.join(FPATH, '../lang_data/gradation-patterns.txt'))
-INFLECTION_RULES = initialize_rules(
-    os.path.join(FPATH, '../lang_data/inflection-patterns.txt'))
+RULE_FILES = {
+    'gradation': os.path.join(FPATH, '../lang_data/gradation-patterns.txt'),
+    'inflection': os.path.join(FPATH, '../lang_data/inflection-patterns.txt'),
+}
+# The rule sets loaded by preload(). Until then, the module attributes
+# RULE_SETS, GRADATION_RULES, and INFLECTION_RULES are provided by
+# __getattr__(), which loads them.
+_rule_sets = None
+LAZY_RULE_SETS = {
+    'RULE_SETS': None,
+    'GRADATION_RULES': 'gradation',
+    'INFLECTION_RULES': 'inflection',
+}
+
+
+def preload():
+    """Load the rule sets now instead of on first use, e.g. before a server
+       starts taking requests. Return a dict of names and RuleSets."""
+    global _rule_sets
+    if _rule_sets is None:
+        _rule_sets = rules.load_rule_sets(RULE_FILES, RULE_ENDINGS)
+        for attribute, name in LAZY_RULE_SETS.items():
+            globals()[attribute] = _rule_sets[name] if name else _rule_sets
+    return _rule_sets
+
+
+def __getattr__(name):
+    if name in LAZY_RULE_SETS:
+        preload()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def prepend_lexical_info(wordlist):
     """
-    Prepend all noun entries in the list with their inflection
-    and gradation paradigms. Return the entries as a list.
+    Prepend all noun entries (lexicon.Lexeme objects) in the list with their
+    inflection and gradation paradigms. Return the entries as a list.
 
     If a word in the list contains spaces, the spaces are replaced with
     underscores (_).
     """
+    return [lexical_base(word_entry) for word_entry in wordlist]
+
+
+def lexical_tag(paradigm, gradation):
+    """Return the paradigm tag of a word class, e.g. '<N12A>'."""
+    return '<N' + (str(paradigm) if paradigm else '') + gradation + '>'
 
-    print("Composing noun entries...")
-    words_with_lex = []
-    for word_entry in wordlist:
-        # replace spaces with underscores to simplify later regexes
-        word = word_entry.s.string.replace(' ', '_')
-        infl_paradigm = 'N'
-        grad_paradigm = ''
-        if word_entry.t is not None:
-            infl_paradigm += word_entry.t.tn.string
-        if word_entry.av is not None:
-            grad_paradigm = word_entry.av.string
-        word = '<' + infl_paradigm + grad_paradigm + '>' + word
-        words_with_lex.append(word)
 
-    return words_with_lex
+def supported_word_classes(word_classes):
+    """Return the word classes, given as (paradigm, gradation) pairs, that
+       the inflection rules can inflect in every number and case."""
+    inflection_rules = (_rule_sets or preload())['inflection']
+    return [(paradigm, gradation) for paradigm, gradation in word_classes
+            if inflection_rules.covers(lexical_tag(paradigm, gradation),
+                                       LEXICAL_ENDINGS)]
+
+
+def word_class_endings(paradigm, gradation):
+    """Return the endings of a word class: each of the LEXICAL_ENDINGS,
+       followed by the alternative forms of the ending that the inflection
+       rules cover for the word class."""
+    inflection_rules = (_rule_sets or preload())['inflection']
+    tag = lexical_tag(paradigm, gradation)
+    return [variant for ending in LEXICAL_ENDINGS
+            for variant in [ending] + [
+                alternative for alternative in
+                ALTERNATIVE_ENDINGS.get(ending, [])
+                if inflection_rules.covers(tag, [alternative])]]
+
+
+def lexical_base(word_entry):
+    """Return the lexical representation of a single noun entry without
+       number and case endings, e.g. '<N12A>lemma'."""
+    # replace spaces with underscores to simplify later regexes
+    word = word_entry.lemma.replace(' ', '_')
+    return lexical_tag(word_entry.paradigm, word_entry.gradation) + word
 
 
 def generate_lexical_forms(wordlist):
-    return [attach_noun_endings(word) for word in wordlist]
+    """Attach random number and inflection endings to all nouns in a list.
+       Drawing one of the LEXICAL_ENDINGS uniformly is equivalent to drawing
+       the number and the inflection separately, as in attach_noun_endings,
+       but all random choices are drawn in a single batch."""
+    endings = sampling.randbelow_batch(len(LEXICAL_ENDINGS), len(wordlist))
+    return [word + LEXICAL_ENDINGS[i] for word, i in zip(wordlist, endings)]
 
 
 def attach_noun_endings(noun):
-    """Attach random number, inflection, and clitic endings to a noun."""
+    """Attach random number and inflection endings to a noun. Clitics are
+       attached to inflected words (see attach_clitic)."""
     number = secrets.choice(GRAM_NUMBER)
     inflection = secrets.choice(INFLECTIONS)
-    # Note: clitic particles are turned off.
-    # clitic = secrets.choice(CLITICS)
     noun = noun + number + inflection
 
     return noun
@@ -99,70 +144,84 @@ def gradate(word):
     """Check if a word matches any gradation patterns: if yes, return the word
        with gradation replace rules applied. If not, return the original word
        in order to avoid returning None values."""
-    for match_rule, grad_rule in GRADATION_RULES:
-        if match_rule(word):
-            return grad_rule(word)
-
-    return word
+    return (_rule_sets or preload())['gradation'].apply(word)
 
 
 def inflect(word):
     """Check if a word matches any inflection patterns: if yes, return the word
        with inflection replace rules applied. If not, return the original word
        in order to avoid returning None values."""
-    for match_rule, inflect_rule in INFLECTION_RULES:
-        if match_rule(word):
-            return inflect_rule(word)
+    return (_rule_sets or preload())['inflection'].apply(word)
 
-    return word
+
+# Precompiled helpers for the stages of the pipeline
+LEXICAL_PLURAL = re.compile(r't\+Sg')
+LEXICAL_TAG = re.compile(r'\<N\d+[A-M]?\>')
+I_BETWEEN_AS = re.compile(r'[^t]aia')
+I_TO_J = re.compile(r'(\w)aia')
+BACK_VOWEL_HARMONY = str.maketrans("AO", "ao")
+FRONT_VOWEL_HARMONY = str.maketrans("AO", "äö")
 
 
 def convert_to_lexical_plural(word):
     """Helper function for ensuring that words only appearing in the
        plural form (such as 'aivot' or 'häät') are lexically represented
        as plural."""
-    return re.sub(r't\+Sg', r'+Pl', word)
+    return LEXICAL_PLURAL.sub(r'+Pl', word)
+
+
+def lexical_plural(word):
+    """Return a lexical form with endings as it is gradated: the forms of
+       words only appearing in the plural are converted to plural."""
+    if '_' not in word and LEXICAL_PLURAL.search(word):
+        return convert_to_lexical_plural(word)
+    return word
+
+
+def gradate_word(word):
+    """Apply consonant gradation to a lexical form with endings."""
+    # TODO: move checking for plurals to a separate stage
+    return gradate(lexical_plural(word))
+
+
+def inflect_word(word):
+    """Apply inflection rules to a gradated lexical form and remove its
+       paradigm tag."""
+    return LEXICAL_TAG.sub('', inflect(word)).replace('_', ' ')
+
+
+def transform_other(word):
+    """Apply the remaining transformations (aia -> aja) to an inflected
+       word."""
+    if I_BETWEEN_AS.search(word):
+        word = replace_i_with_j(word)
+    return word
+
+
+def harmonize(word):
+    """Replace the archiphonemes A and O with vowels in harmony with the
+       rest of the word."""
+    if back_vowel_determines_harmony(word):
+        return word.translate(BACK_VOWEL_HARMONY)
+    return word.translate(FRONT_VOWEL_HARMONY)
 
 
 def apply_consonant_gradation(wordlist):
     """Apply consonant gradation rules to a list of words and return
        the results in a list."""
-    # TODO: after removing checking for plurals, rewrite as list comprehension
-    gradated_words = []
-    for word in wordlist:
-        # TODO: move checking for plurals to a separate function
-        if re.search(r't\+Sg', word) and '_' not in word:
-            word = convert_to_lexical_plural(word)
-        word = gradate(word)
-        gradated_words.append(word)
-    return gradated_words
+    return [gradate_word(word) for word in wordlist]
 
 
 def apply_inflection_rules(wordlist):
     """Apply inflection rules to a list of words and return
        the results in a list."""
-    inflected_words = []
-    for word in wordlist:
-        inflected = inflect(word)
-        # TODO: move cleanup to a separate function
-        cleaned = re.sub(r'\<N\d+[A-M]?\>', '', inflected)
-        cleaned = re.sub('_', ' ', cleaned)
-        inflected_words.append(cleaned)
-    return inflected_words
+    return [inflect_word(word) for word in wordlist]
 
 
 def apply_vowel_harmony(wordlist):
     """Apply vowel harmony transformations to a list of words
        and return the results in a list."""
-    words_with_vowel_harmony = []
-    for word in wordlist:
-        if back_vowel_determines_harmony(word):
-            words_with_vowel_harmony.append(
-                word.translate(str.maketrans("AO", "ao")))
-        else:
-            words_with_vowel_harmony.append(
-                word.translate(str.maketrans("AO", "äö")))
-    return words_with_vowel_harmony
+    return [harmonize(word) for word in wordlist]
 
 
 # The vowel harmony of loan words containing both back and front vowels
@@ -183,14 +242,116 @@ def back_vowel_determines_harmony(word):
 
 
 def replace_i_with_j(word):
-    return re.sub(r'(\w)aia', r'\1aja', word)
+    return I_TO_J.sub(r'\1aja', word)
 
 
 def apply_other_transformations(wordlist):
-    words = []
-    for word in wordlist:
-        if re.search(r'[^t]aia', word):
-            word = replace_i_with_j(word)
-        words.append(word)
+    return [transform_other(word) for word in wordlist]
+
+
+def transform_word(word):
+    """Transform a lexical form with endings (e.g. '<N10>koira+Pl+Ine') into
+       its final word form (e.g. 'koirissa') by applying all the stages of
+       the pipeline to it."""
+    return harmonize(transform_other(inflect_word(gradate_word(word))))
 
-    return words
+
+def attach_clitic(word, clitic):
+    """Attach a clitic (one of CLITICS) to a final word form, e.g.
+       'koirissa' and 'kO' -> 'koirissako'. The archiphonemes of the clitic
+       follow the vowel harmony of the word."""
+    if not clitic:
+        return word
+    return harmonize(word.rstrip(' ') + clitic)
+
+
+# The stages of the pipeline after the lexical form, in order
+STAGES = [
+    ('gradated', gradate_word),
+    ('inflected', inflect_word),
+    ('transformed', transform_other),
+    ('final', harmonize),
+]
+
+# A function called as TRACE_HOOK(stage, word) with the result of every
+# stage of the streaming pipeline, or None. Set with set_trace_hook().
+TRACE_HOOK = None
+
+
+def set_trace_hook(hook):
+    """Set the default trace hook of the streaming pipeline (None turns
+       tracing off). Return the previous hook."""
+    global TRACE_HOOK
+    previous, TRACE_HOOK = TRACE_HOOK, hook
+    return previous
+
+
+def transform_words(wordlist, trace=None):
+    """Transform lexical forms with endings into final word forms one word
+       at a time, taking each word through all stages before the next one,
+       and yield the results.
+
+       If a trace function is given (or set with set_trace_hook), it is
+       called as trace(stage, word) with the lexical form ('lexical') and
+       the result of each stage in STAGES."""
+    trace = trace or TRACE_HOOK
+    if trace is None:
+        for word in wordlist:
+            yield transform_word(word)
+        return
+    for word in wordlist:
+        trace('lexical', word)
+        for stage, apply_stage in STAGES:
+            word = apply_stage(word)
+            trace(stage, word)
+        yield word
+
+
+def stream_word_forms(word_entries, trace=None):
+    """Yield a final word form with random number and case endings for
+       each noun entry (lexicon.Lexeme) in an iterable, one at a time."""
+    sampler = sampling.IndexSampler(len(LEXICAL_ENDINGS))
+    lexical_forms = (lexical_base(entry) + LEXICAL_ENDINGS[sampler.randbelow()]
+                     for entry in word_entries)
+    return transform_words(lexical_forms, trace)
+
+
+# Functions that can be memoized with enable_caches(), and their uncached
+# versions
+CACHEABLE = ['gradate', 'inflect', 'transform_word']
+_uncached = {name: globals()[name] for name in CACHEABLE}
+
+
+def enable_caches(maxsize=memo.DEFAULT_MAXSIZE, policy='lru',
+                  names=CACHEABLE):
+    """Put a bounded cache (see memo.BoundedCache) in front of each of the
+       named functions (by default gradate, inflect, and transform_word).
+       The module-level functions are replaced by their cached versions,
+       so the list functions also use the caches. Return a dict of names
+       and caches."""
+    disable_caches()
+    caches = {}
+    for name in names:
+        cache = memo.BoundedCache(maxsize, policy)
+        globals()[name] = cache.wrap(_uncached[name])
+        caches[name] = cache
+    return caches
+
+
+def disable_caches():
+    """Restore the uncached versions of all cached functions."""
+    globals().update(_uncached)
+
+
+def cache_info():
+    """Return the statistics of the enabled caches as a dict of names and
+       dicts."""
+    return {name: globals()[name].cache.info() for name in CACHEABLE
+            if hasattr(globals()[name], 'cache')}
+
+
+def warm_caches(wordlist):
+    """Fill the enabled caches by transforming a list of lexical forms with
+       endings, e.g. all forms of the words in the generator's word list."""
+    for word in wordlist:
+        transform_word(word)
@@ -0,0 +1,166 @@
+"""
+This module contains a parallel passphrase generation engine that splits
+the requested number of passphrases across a pool of worker processes.
+
+Every worker maps the same read-only form table file (see
+forms.MappedFormTable), so the table pages are shared between the
+processes instead of being copied. Each worker draws its random indices
+from the operating system's CSPRNG through its own sampling.IndexSampler;
+secrets keeps no random state in user space, so forked workers never
+share or repeat a random stream.
+"""
+
+from collections import defaultdict
+import concurrent.futures
+import itertools
+import os
+import time
+
+from fin_ppgen import compound
+from fin_ppgen import forms
+from fin_ppgen import generator
+from fin_ppgen import sampling
+from fin_ppgen import unique
+
+
+# Number of phrases generated by a worker per task
+CHUNK_SIZE = 1 << 14
+
+# Per-process state of a worker, set up by init_worker()
+_worker_table = None
+_worker_sampler = None
+
+
+def init_worker(table_path, unique_forms=False, modifiers=None):
+    """Map the form table in a worker process. If unique_forms is true,
+       the words are drawn from the distinct forms of the table. If a list
+       of modifiers is given, the words are compounds of the modifiers and
+       the forms of the table."""
+    global _worker_table, _worker_sampler
+    _worker_table = forms.MappedFormTable(table_path)
+    if unique_forms:
+        _worker_table = unique.UniqueForms(_worker_table)
+    if modifiers is not None:
+        _worker_table = compound.CompoundTable(modifiers, _worker_table)
+    _worker_sampler = sampling.IndexSampler(len(_worker_table))
+
+
+def generate_chunk(size, words_per_phrase, separator):
+    """Generate a chunk of passphrases in a worker process. Return the
+       process id, the phrases, and the time it took in seconds."""
+    start = time.perf_counter()
+    table = _worker_table
+    indices = _worker_sampler.sample(size * words_per_phrase)
+    phrases = [
+        table.phrase(indices[i:i + words_per_phrase], separator)
+        for i in range(0, len(indices), words_per_phrase)
+    ]
+    return os.getpid(), phrases, time.perf_counter() - start
+
+
+class WorkerStats:
+    """Collects the number of phrases and the busy time of each worker."""
+
+    def __init__(self):
+        self.phrases = defaultdict(int)
+        self.seconds = defaultdict(float)
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def record(self, pid, phrase_count, seconds):
+        self.phrases[pid] += phrase_count
+        self.seconds[pid] += seconds
+
+    @property
+    def total_phrases(self):
+        return sum(self.phrases.values())
+
+    @property
+    def elapsed(self):
+        end = self.finished or time.perf_counter()
+        return end - self.started
+
+    def report(self):
+        """Return a report of the per-worker and total generation rates
+           as a list of lines."""
+        lines = []
+        for worker, pid in enumerate(sorted(self.phrases), 1):
+            seconds = self.seconds[pid]
+            rate = self.phrases[pid] / seconds if seconds else 0.0
+            lines.append(f"worker {worker} (pid {pid}): "
+                         f"{self.phrases[pid]} phrases in {seconds:.2f} s, "
+                         f"{rate:,.0f} phrases/s")
+        elapsed = self.elapsed
+        rate = self.total_phrases / elapsed if elapsed else 0.0
+        lines.append(f"total: {self.total_phrases} phrases in "
+                     f"{elapsed:.2f} s, {rate:,.0f} phrases/s")
+        return lines
+
+
+def generate_parallel(count, words_per_phrase, jobs=None, separator=' ',
+                      ordered=True, table_path=None, stats=None,
+                      chunk_size=CHUNK_SIZE, unique_forms=False,
+                      modifiers=None):
+    """Generate passphrases in a pool of worker processes and yield them.
+
+       jobs is the number of worker processes (default: the number of CPUs).
+       If ordered is true, the chunks of phrases are yielded in the order
+       they were requested; otherwise they are yielded as soon as they are
+       ready. Only a few chunks per worker are in flight at a time, so memory
+       use stays constant. If a WorkerStats object is given, the number of
+       phrases and busy time of each worker are recorded into it. If
+       unique_forms is true, the words are drawn from the distinct forms of
+       the table. If a list of modifiers is given, the words are compounds
+       of the modifiers and the forms of the table (see the compound
+       module). If count is None, phrases are generated until the caller
+       stops."""
+    if table_path is None:
+        table = generator.load_default_form_table()
+        table_path = table.path
+        table.close()
+    jobs = jobs or os.cpu_count() or 1
+    max_in_flight = 2 * jobs
+    if count is None:
+        chunk_sizes = itertools.repeat(chunk_size)
+    else:
+        chunk_sizes = (min(chunk_size, count - start)
+                       for start in range(0, count, chunk_size))
+
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=jobs, initializer=init_worker,
+            initargs=(table_path, unique_forms, modifiers)) as executor:
+        pending = {}
+        completed = {}
+        next_chunk = 0
+        next_to_yield = 0
+
+        def submit():
+            nonlocal next_chunk
+            for size in chunk_sizes:
+                future = executor.submit(generate_chunk, size,
+                                         words_per_phrase, separator)
+                pending[future] = next_chunk
+                next_chunk += 1
+                if len(pending) + len(completed) >= max_in_flight:
+                    break
+
+        submit()
+        while pending:
+            done, _ = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                chunk = pending.pop(future)
+                pid, phrases, seconds = future.result()
+                if stats is not None:
+                    stats.record(pid, len(phrases), seconds)
+                if ordered:
+                    completed[chunk] = phrases
+                else:
+                    yield from phrases
+            while next_to_yield in completed:
+                yield from completed.pop(next_to_yield)
+                next_to_yield += 1
+            submit()
+
+    if stats is not None:
+        stats.finished = time.perf_counter()
@@ -0,0 +1,103 @@
+"""
+This module contains a report command for profiling the gradation and
+inflection rules:
+
+    python -m fin_ppgen.profiling --words 20000
+    python -m fin_ppgen.profiling --all --top 50
+
+The command runs a sample of nouns (or, with --all, every noun in every
+number and case, including the alternative plural forms) through the
+gradation and inflection stages with rule statistics enabled, and reports
+which rules are tried and matched most often, where the time goes, which
+rules never matched, and how many words matched no rule at all.
+"""
+
+import argparse
+import contextlib
+import json
+
+from fin_ppgen import lexicon
+from fin_ppgen import nlp
+from fin_ppgen import sampling
+
+
+@contextlib.contextmanager
+def rule_stats(rule_sets=None):
+    """Record per-rule statistics for the rule sets (default: all rule sets
+       of the nlp module) inside a with block. Yields a dict of names and
+       RuleStats objects."""
+    if rule_sets is None:
+        rule_sets = nlp.RULE_SETS
+    stats = {name: rule_set.enable_stats()
+             for name, rule_set in rule_sets.items()}
+    try:
+        yield stats
+    finally:
+        for rule_set in rule_sets.values():
+            rule_set.disable_stats()
+
+
+def all_lexical_forms(nouns):
+    """Return the lexical forms of the nouns in every number and case,
+       including the alternative forms of their word classes (see
+       nlp.word_class_endings)."""
+    class_endings = {}
+    lexical_forms = []
+    for noun in nouns:
+        word_class = (noun.paradigm, noun.gradation)
+        if word_class not in class_endings:
+            class_endings[word_class] = nlp.word_class_endings(*word_class)
+        base = nlp.lexical_base(noun)
+        lexical_forms.extend(base + ending
+                             for ending in class_endings[word_class])
+    return lexical_forms
+
+
+def profile_rules(lexical_forms):
+    """Run lexical forms through the gradation and inflection stages and
+       return a dict of names and RuleStats objects."""
+    with rule_stats() as stats:
+        nlp.apply_inflection_rules(nlp.apply_consonant_gradation(
+            lexical_forms))
+    return stats
+
+
+def main(argv=None):
+    """Profile the rules from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Report per-rule statistics of the gradation and "
+        "inflection rules.")
+    parser.add_argument('--words', type=int, default=10000,
+                        help="number of random nouns to profile with "
+                        "(default: 10000)")
+    parser.add_argument('--all', action='store_true',
+                        help="profile with every noun in every number and "
+                        "case")
+    parser.add_argument('--top', type=int, default=20,
+                        help="number of slowest rules to list (default: 20)")
+    parser.add_argument('--json', action='store_true',
+                        help="print the full statistics as JSON")
+    args = parser.parse_args(argv)
+
+    nouns = lexicon.load_lexicon().select(1, 15)
+    if args.all:
+        lexical_forms = all_lexical_forms(nouns)
+    else:
+        indices = sampling.randbelow_batch(len(nouns), args.words)
+        lexical_forms = nlp.generate_lexical_forms(
+            [nlp.lexical_base(nouns[i]) for i in indices])
+
+    stats = profile_rules(lexical_forms)
+    if args.json:
+        print(json.dumps({name: rule_stats.as_dict()
+                          for name, rule_stats in stats.items()}, indent=2))
+        return 0
+    for name, rule_stats in stats.items():
+        print(f"== {name} rules ==")
+        print('\n'.join(rule_stats.report(args.top)))
+        print()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
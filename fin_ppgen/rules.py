@@ -0,0 +1,474 @@
+"""
+This module contains the rule compiler for the regex rule files in
+lang_data (gradation-patterns.txt and inflection-patterns.txt).
+
+Each non-comment line of a rule file contains three whitespace-separated
+fields: a match pattern, a search pattern, and a replacement. A word is
+transformed by the first rule whose match pattern is found in the word.
+
+The rule files are compiled into RuleSet objects that hold precompiled
+pattern objects and an index of candidate rules for each kind of lexical
+form. When the files are loaded, the compiler checks for malformed lines,
+rules that can never match any lexical form, and rules that are hidden
+behind earlier rules. The compiled rule sets can be saved into a cache
+file so that later starts skip parsing and checking the files.
+
+For profiling, a RuleSet can record how often each rule is tried and
+matched and how long it takes (see RuleSet.enable_stats and the profiling
+module). The recording replaces RuleSet.apply only while it is enabled, so
+it costs nothing when it is off.
+"""
+
+import argparse
+import functools
+import hashlib
+import json
+import os.path
+import re
+import time
+import warnings
+
+
+FORMAT_VERSION = 1
+
+FPATH = os.path.dirname(__file__)
+RULES_CACHE = os.path.join(FPATH, '../lang_data/compiled-rules.json')
+
+# All paradigm tags a lexical form can have, e.g. <N>, <N12>, <N12A>
+GRADATION_LETTERS = ['', 'A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J',
+                     'K', 'L', 'M']
+LEXICAL_TAGS = ['<N>'] + [
+    f'<N{paradigm}{gradation}>' for paradigm in range(1, 100)
+    for gradation in GRADATION_LETTERS
+]
+
+# Rule patterns start with the paradigm tag of the word (e.g. \<N\d*A\>)
+# and end with its number and case (e.g. \+Sg\+(Gen|Ine)$). These parts are
+# matched separately against the tag and the endings of a lexical form to
+# find out which rules could possibly match it. The endings are anchored to
+# the end of the word, so that e.g. \+Pl\+Gen$ does not match +Pl+Gen2.
+RULE_ENDING = re.compile(
+    r'\\\+(\w+|\([\w|]+\))\\\+(\w+|\([\w|]+\))(\$)?$')
+# Group references in replacement strings, e.g. \1 or \g<1>
+GROUP_REFERENCE = re.compile(r'\\(\d+)|\\g<(\d+)>')
+# Word bodies that match any lemma (with at least one character)
+GENERIC_BODIES = {r'\w+', r'\w*', r'[\w-]+', r'[\w-]*'}
+
+
+class RuleSyntaxError(ValueError):
+    """Raised when a line of a rule file cannot be compiled."""
+
+
+class RuleWarning(UserWarning):
+    """Issued for rules that can never be applied."""
+
+
+class Rule:
+    """A single compiled match, search, and replace rule.
+
+       match(word) returns a match object if the rule applies to the word,
+       and apply(word) returns the word with the replacement made."""
+
+    __slots__ = ('pattern', 'search', 'replace', 'location', 'match',
+                 'apply', 'tag_re', 'ending_re')
+
+    def __init__(self, pattern, search, replace, location=''):
+        self.pattern = pattern
+        self.search = search
+        self.replace = replace
+        self.location = location
+
+        search_re = re.compile(search)
+        for groups in GROUP_REFERENCE.findall(replace):
+            if int(groups[0] or groups[1]) > search_re.groups:
+                raise re.error(f"invalid group reference in {replace!r}")
+        self.match = re.compile(pattern).search
+        self.apply = functools.partial(search_re.sub, replace)
+
+        self.tag_re = None
+        if pattern.startswith('\\<') and '\\>' in pattern:
+            self.tag_re = re.compile(pattern[:pattern.index('\\>') + 2])
+        self.ending_re = None
+        ending = RULE_ENDING.search(pattern)
+        if ending:
+            self.ending_re = re.compile(ending.group())
+
+    def __repr__(self):
+        return f'<Rule {self.location} {self.pattern}>'
+
+    @property
+    def tag_pattern(self):
+        return self.tag_re.pattern if self.tag_re is not None else None
+
+    @property
+    def ending_pattern(self):
+        return self.ending_re.pattern if self.ending_re is not None else None
+
+    @property
+    def body_pattern(self):
+        """The part of the match pattern between the tag and the endings."""
+        start = len(self.tag_pattern or '')
+        end = len(self.pattern) - len(self.ending_pattern or '')
+        return self.pattern[start:end]
+
+    def could_match(self, tag, endings):
+        """Check whether the rule could match a lexical form with the given
+           tag (e.g. '<N12A>') and endings (e.g. '+Pl+Ine'). Only returns
+           False for words that the rule can never match."""
+        if self.tag_re is not None and not self.tag_re.fullmatch(tag):
+            return False
+        if self.ending_re is not None and not self.ending_re.search(endings):
+            return False
+        return True
+
+
+class RuleStats:
+    """Per-rule statistics of a RuleSet: the number of times each rule was
+       tried and matched, the time spent in matching and applying it, and
+       the number of words that no rule matched."""
+
+    def __init__(self, rules):
+        self.rules = tuple(rules)
+        self.positions = {rule: i for i, rule in enumerate(self.rules)}
+        self.attempts = [0] * len(self.rules)
+        self.hits = [0] * len(self.rules)
+        self.seconds = [0.0] * len(self.rules)
+        self.words = 0
+        self.fall_through = 0
+
+    @property
+    def total_attempts(self):
+        return sum(self.attempts)
+
+    @property
+    def total_seconds(self):
+        return sum(self.seconds)
+
+    def dead_rules(self):
+        """Return the rules that were never matched."""
+        return [rule for rule, hits in zip(self.rules, self.hits) if not hits]
+
+    def as_dict(self):
+        return {
+            'words': self.words,
+            'fall_through': self.fall_through,
+            'attempts': self.total_attempts,
+            'seconds': self.total_seconds,
+            'rules': [
+                {'location': rule.location, 'pattern': rule.pattern,
+                 'attempts': attempts, 'hits': hits, 'seconds': seconds}
+                for rule, attempts, hits, seconds in zip(
+                    self.rules, self.attempts, self.hits, self.seconds)
+            ],
+        }
+
+    def report(self, top=20):
+        """Return a report of the statistics as a list of lines: a summary,
+           the top rules by time, and the rules that never matched."""
+        words = self.words or 1
+        lines = [f"{self.words} words, "
+                 f"{self.total_attempts / words:.1f} rules tried per word, "
+                 f"{self.fall_through} words matched no rule, "
+                 f"{self.total_seconds * 1000:.1f} ms"]
+        order = sorted(range(len(self.rules)),
+                       key=lambda i: self.seconds[i], reverse=True)
+        lines.append(f"{'RULE':36}{'ATTEMPTS':>10}{'HITS':>10}"
+                     f"{'TIME (ms)':>11}  PATTERN")
+        for i in order[:top]:
+            rule = self.rules[i]
+            lines.append(f"{os.path.basename(rule.location):36}"
+                         f"{self.attempts[i]:10}{self.hits[i]:10}"
+                         f"{self.seconds[i] * 1000:11.2f}  {rule.pattern}")
+        dead = self.dead_rules()
+        lines.append(f"{len(dead)} rules never matched:")
+        lines.extend(f"  {os.path.basename(rule.location)}  {rule.pattern}"
+                     for rule in dead)
+        return lines
+
+
+class RuleSet:
+    """An ordered set of rules with an index of candidate rules.
+
+       The candidate rules are looked up by the paradigm tag and endings of
+       a word (i.e. its inflection paradigm, gradation class, number and
+       case), and the candidate lists are built lazily the first time each
+       key is seen. The candidates keep the order of the rule file, so the
+       first matching candidate is always the first matching rule. Words
+       that do not look like lexical forms are checked against all rules."""
+
+    stats = None
+
+    def __init__(self, rules):
+        self.rules = tuple(rules)
+        self.index = {}
+
+    def __len__(self):
+        return len(self.rules)
+
+    def __iter__(self):
+        return iter(self.rules)
+
+    def __getitem__(self, index):
+        return self.rules[index]
+
+    def candidates(self, word):
+        """Return the rules that could match a word, in file order."""
+        tag_end = word.find('>')
+        if not word.startswith('<') or tag_end < 0:
+            return self.rules
+        endings_start = word.find('+')
+        key = (word[:tag_end + 1],
+               word[endings_start:] if endings_start >= 0 else '')
+        candidates = self.index.get(key)
+        if candidates is None:
+            candidates = tuple(rule for rule in self.rules
+                               if rule.could_match(*key))
+            self.index[key] = candidates
+        return candidates
+
+    def covers(self, tag, endings):
+        """Check whether, for each of the endings, some rule could match
+           the lexical forms with the tag and the ending."""
+        return all(any(rule.could_match(tag, ending) for rule in self.rules)
+                   for ending in endings)
+
+    def find(self, word):
+        """Return the first rule that matches a word, or None."""
+        for rule in self.candidates(word):
+            if rule.match(word):
+                return rule
+        return None
+
+    def apply(self, word):
+        """Apply the first matching rule to a word. If no rule matches,
+           return the word unchanged."""
+        for rule in self.candidates(word):
+            if rule.match(word):
+                return rule.apply(word)
+        return word
+
+    def enable_stats(self):
+        """Start recording per-rule statistics for apply() into a new
+           RuleStats object and return it."""
+        self.stats = RuleStats(self.rules)
+        # The instance attribute shadows the uninstrumented method
+        self.apply = self._apply_with_stats
+        return self.stats
+
+    def disable_stats(self):
+        """Stop recording statistics and return the recorded RuleStats."""
+        stats = self.stats
+        self.__dict__.pop('apply', None)
+        self.__dict__.pop('stats', None)
+        return stats
+
+    def _apply_with_stats(self, word):
+        stats = self.stats
+        positions, attempts, hits, seconds = (stats.positions, stats.attempts,
+                                              stats.hits, stats.seconds)
+        timer = time.perf_counter
+        stats.words += 1
+        for rule in self.candidates(word):
+            i = positions[rule]
+            attempts[i] += 1
+            start = timer()
+            if rule.match(word):
+                result = rule.apply(word)
+                seconds[i] += timer() - start
+                hits[i] += 1
+                return result
+            seconds[i] += timer() - start
+        stats.fall_through += 1
+        return word
+
+
+def parse_rule_file(pattern_file):
+    """Parse a rule file into a list of compiled rules. Raise
+       RuleSyntaxError for lines that cannot be compiled."""
+
+    rules = []
+    with open(pattern_file, encoding='utf-8') as fp:
+        for line_number, line in enumerate(fp, 1):
+            fields = line.split()
+            if not fields or fields[0].startswith('#'):
+                continue  # skip comments and empty lines
+            location = f'{pattern_file}:{line_number}'
+            if len(fields) != 3:
+                raise RuleSyntaxError(f"{location}: expected 3 fields "
+                                      f"(pattern, search, replace), "
+                                      f"got {len(fields)}")
+            try:
+                rules.append(Rule(*fields, location=location))
+            except re.error as err:
+                raise RuleSyntaxError(f"{location}: {err}") from None
+
+    return rules
+
+
+def find_rule_problems(rules, endings):
+    """Check a list of rules against all lexical tags and the given endings
+       (e.g. ['+Sg+Nom', '+Sg+Gen', ...]). Return a list of
+       (rule, message) tuples for rules that can never match any lexical
+       form and rules that are hidden behind an earlier rule."""
+
+    @functools.lru_cache(maxsize=None)
+    def tags_of(tag_pattern):
+        if tag_pattern is None:
+            return frozenset(LEXICAL_TAGS)
+        tag_re = re.compile(tag_pattern)
+        return frozenset(tag for tag in LEXICAL_TAGS if tag_re.fullmatch(tag))
+
+    @functools.lru_cache(maxsize=None)
+    def endings_of(ending_pattern):
+        if ending_pattern is None:
+            return frozenset(endings)
+        ending_re = re.compile(ending_pattern)
+        return frozenset(ending for ending in endings
+                         if ending_re.search(ending))
+
+    problems = []
+    coverage = []
+    for rule in rules:
+        tags = tags_of(rule.tag_pattern)
+        rule_endings = endings_of(rule.ending_pattern)
+        if not tags:
+            problems.append((rule, "tag pattern matches no paradigm"))
+        elif not rule_endings:
+            problems.append((rule, "matches no number and case"))
+        else:
+            for earlier, earlier_tags, earlier_endings in coverage:
+                if earlier.pattern == rule.pattern or (
+                        earlier.body_pattern in GENERIC_BODIES
+                        and rule.body_pattern not in (r'\w*', r'[\w-]*')
+                        and tags <= earlier_tags
+                        and rule_endings <= earlier_endings):
+                    problems.append(
+                        (rule, f"hidden by earlier rule {earlier.location}"))
+                    break
+        coverage.append((rule, tags, rule_endings))
+
+    return problems
+
+
+def load_rules(pattern_file, endings=None):
+    """Compile a rule file into a RuleSet. If the endings of lexical forms
+       are given, issue a RuleWarning for every rule that can never be
+       applied."""
+
+    rules = parse_rule_file(pattern_file)
+    if endings is not None:
+        for rule, message in find_rule_problems(rules, endings):
+            warnings.warn(f"{rule.location}: {message}", RuleWarning,
+                          stacklevel=2)
+    return RuleSet(rules)
+
+
+def file_digest(file_path):
+    """Return the SHA-256 digest of a file as a hex string."""
+    with open(file_path, 'rb') as fp:
+        return hashlib.sha256(fp.read()).hexdigest()
+
+
+def cache_key(rule_files, endings):
+    """Return a key identifying the contents of the rule files."""
+    return {
+        'version': FORMAT_VERSION,
+        'endings': list(endings or []),
+        'files': {name: file_digest(path)
+                  for name, path in sorted(rule_files.items())},
+    }
+
+
+def save_rule_sets(rule_sets, key, cache_path=RULES_CACHE):
+    """Save compiled rule sets into a cache file."""
+    data = dict(key)
+    data['rules'] = {
+        name: [[rule.pattern, rule.search, rule.replace, rule.location]
+               for rule in rule_set]
+        for name, rule_set in rule_sets.items()
+    }
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as fp:
+        json.dump(data, fp, ensure_ascii=False)
+    os.replace(tmp_path, cache_path)
+
+
+def read_rule_sets(key, cache_path=RULES_CACHE):
+    """Read compiled rule sets from a cache file. Return None if the cache
+       does not exist or does not match the key."""
+    try:
+        with open(cache_path, encoding='utf-8') as fp:
+            data = json.load(fp)
+    except (OSError, ValueError):
+        return None
+    if any(data.get(field) != value for field, value in key.items()):
+        return None
+    return {
+        name: RuleSet(Rule(*fields) for fields in rules)
+        for name, rules in data['rules'].items()
+    }
+
+
+def load_rule_sets(rule_files, endings=None, cache_path=RULES_CACHE):
+    """Load several rule files, given as a dict of names and paths, and
+       return a dict of names and RuleSets.
+
+       If the cache file is up to date with the rule files, the rule sets
+       are read from it and the files are not parsed or checked again."""
+    key = cache_key(rule_files, endings)
+    rule_sets = None
+    if cache_path is not None:
+        rule_sets = read_rule_sets(key, cache_path)
+    if rule_sets is None:
+        rule_sets = {name: load_rules(path, endings)
+                     for name, path in rule_files.items()}
+    return rule_sets
+
+
+# Helpers for the old closure-based interface
+
+def build_inflect_functions(pattern, search, replace):
+    """Build regex match and replace functions for a single rule."""
+    rule = Rule(pattern, search, replace)
+    return (rule.match, rule.apply)
+
+
+def initialize_rules(pattern_file):
+    """A helper function for extracting regex search and replace rules
+       from an external file."""
+    return [(rule.match, rule.apply) for rule in parse_rule_file(pattern_file)]
+
+
+def main():
+    """Check the rule files and save the compiled rules from the command
+       line."""
+    from fin_ppgen import nlp
+
+    parser = argparse.ArgumentParser(
+        description="Check the rule files and save the compiled rules.")
+    parser.add_argument('--output', default=RULES_CACHE,
+                        help="path of the compiled rule cache")
+    parser.add_argument('--check-only', action='store_true',
+                        help="only check the rule files")
+    args = parser.parse_args()
+
+    rule_sets = {}
+    problem_count = 0
+    for name, path in nlp.RULE_FILES.items():
+        rules = parse_rule_file(path)
+        for rule, message in find_rule_problems(rules, nlp.RULE_ENDINGS):
+            print(f"{rule.location}: {message}")
+            problem_count += 1
+        rule_sets[name] = RuleSet(rules)
+        print(f"{name}: {len(rules)} rules")
+
+    if not args.check_only:
+        save_rule_sets(rule_sets, cache_key(nlp.RULE_FILES,
+                                            nlp.RULE_ENDINGS),
+                       args.output)
+        print(f"Wrote compiled rules to {args.output}")
+    return 1 if problem_count else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
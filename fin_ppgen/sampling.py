@@ -0,0 +1,93 @@
+"""
+This module contains functions for drawing random indices in bulk from
+the operating system's CSPRNG.
+
+secrets.choice() and secrets.randbelow() fetch entropy separately for every
+call. For bulk generation, IndexSampler instead fetches entropy from
+secrets.token_bytes() in large blocks and turns it into indices with
+rejection sampling: a block is read as an array of unsigned integers, the
+integers that fall above the largest multiple of the bound are thrown
+away, and the rest are reduced modulo the bound. Every accepted integer is
+uniformly distributed below a multiple of the bound, so the indices are
+exactly uniform, just like with secrets.randbelow().
+"""
+
+from array import array
+import secrets
+
+
+# Number of random bytes fetched from the OS at a time
+BLOCK_SIZE = 1 << 14
+
+# Unsigned integer array typecodes by word size in bytes
+WORD_TYPECODES = {
+    array(typecode).itemsize: typecode
+    for typecode in ('Q', 'L', 'I', 'H', 'B')
+}
+
+
+def word_size_for(bound):
+    """Return the smallest supported word size in bytes (at least 4, to keep
+       the rejection rate low) that can represent all indices below the
+       bound, or None if the bound is too large."""
+    for size in (4, 8):
+        if size in WORD_TYPECODES and bound <= 1 << (8 * size):
+            return size
+    return None
+
+
+class IndexSampler:
+    """Draws uniformly distributed random integers in range(bound) using
+       block-wise entropy and rejection sampling."""
+
+    def __init__(self, bound, block_size=BLOCK_SIZE, word_size=None):
+        if bound < 1:
+            raise ValueError("bound must be positive")
+        self.bound = bound
+        self.word_size = word_size or word_size_for(bound)
+        self.typecode = WORD_TYPECODES.get(self.word_size)
+        if self.typecode is None or bound > 1 << (8 * self.word_size):
+            # Fall back to secrets.randbelow() for huge bounds
+            self.typecode = None
+            self.limit = None
+        else:
+            # Accept only words below the largest multiple of the bound
+            word_range = 1 << (8 * self.word_size)
+            self.limit = word_range - word_range % bound
+        self.block_size = max(block_size, self.word_size or 1)
+        self._buffer = []
+
+    def _refill(self):
+        words = array(self.typecode)
+        byte_count = self.block_size - self.block_size % self.word_size
+        words.frombytes(secrets.token_bytes(byte_count))
+        bound, limit = self.bound, self.limit
+        self._buffer.extend([word % bound for word in words if word < limit])
+
+    def sample(self, count):
+        """Return a list of count random integers in range(bound)."""
+        if self.typecode is None:
+            return [secrets.randbelow(self.bound) for _ in range(count)]
+        while len(self._buffer) < count:
+            self._refill()
+        indices = self._buffer[:count]
+        del self._buffer[:count]
+        return indices
+
+    def randbelow(self):
+        """Return a single random integer in range(bound)."""
+        if self.typecode is None:
+            return secrets.randbelow(self.bound)
+        if not self._buffer:
+            self._refill()
+        # Taking from the end avoids moving the rest of the buffer
+        return self._buffer.pop()
+
+
+def randbelow_batch(bound, count):
+    """Return a list of count random integers in range(bound)."""
+    if count <= 0:
+        return []
+    # Fetch only as much entropy as the batch is likely to need
+    sampler = IndexSampler(bound, block_size=min(BLOCK_SIZE, 8 * count + 8))
+    return sampler.sample(count)
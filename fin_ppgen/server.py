@@ -0,0 +1,295 @@
+"""
+A small asyncio HTTP server for generating passphrases on demand.
+
+The server loads the lexicon, rules, and precomputed form table once at
+startup, and a background task keeps a pool of pre-generated passphrases
+filled for each requested word count, so requests are answered straight
+from the pool. Endpoints:
+
+    GET /passphrase?words=4&count=N   passphrases as JSON
+    GET /metrics                      request count, p50/p99 latency and
+                                      pool fill levels as JSON
+
+Start the server with:
+
+    python -m fin_ppgen.server --port 8080
+"""
+
+import argparse
+import asyncio
+from collections import deque
+import json
+import math
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from fin_ppgen import generator
+
+
+MAX_WORDS = 20
+MAX_COUNT = 1000
+DEFAULT_WORDS = 4
+
+# Number of pre-generated phrases kept for each word count
+POOL_SIZE = 10000
+# Number of phrases generated at a time by the refill task
+REFILL_BATCH = 1000
+# Number of most recent request latencies used for the percentiles
+LATENCY_WINDOW = 10000
+# Largest request body that is read and discarded on a connection
+MAX_BODY = 65536
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 413: 'Payload Too Large',
+           431: 'Request Header Fields Too Large'}
+
+
+class RequestError(Exception):
+    """Raised for requests that cannot be served."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def percentile(values, fraction):
+    """Return the given percentile (0-1) of a list of numbers with the
+       nearest-rank method."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[rank - 1]
+
+
+class PassphraseService:
+    """Serves passphrases from pools that are refilled in the background."""
+
+    def __init__(self, table, pool_size=POOL_SIZE, separator=' '):
+        self.table = table
+        self.pool_size = pool_size
+        self.separator = separator
+        self.pools = {DEFAULT_WORDS: deque()}
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.requests = 0
+        self.pool_misses = 0
+        self._refill_needed = asyncio.Event()
+        self._refill_needed.set()
+
+    def generate(self, count, words):
+        return list(generator.generate_passphrases(
+            count, words, self.table, self.separator))
+
+    def take(self, count, words):
+        """Take phrases from the pool of a word count. Phrases missing from
+           the pool are generated on the spot."""
+        pool = self.pools.setdefault(words, deque())
+        phrases = [pool.popleft() for _ in range(min(count, len(pool)))]
+        if len(phrases) < count:
+            self.pool_misses += 1
+            phrases += self.generate(count - len(phrases), words)
+        if len(pool) < self.pool_size // 2:
+            self._refill_needed.set()
+        return phrases
+
+    def prefill(self):
+        """Fill all pools before the server starts taking requests."""
+        for words, pool in self.pools.items():
+            pool.extend(self.generate(self.pool_size - len(pool), words))
+
+    async def refill(self):
+        """Keep all pools filled. Runs until cancelled."""
+        while True:
+            await self._refill_needed.wait()
+            self._refill_needed.clear()
+            for words, pool in list(self.pools.items()):
+                while len(pool) < self.pool_size:
+                    batch = min(REFILL_BATCH, self.pool_size - len(pool))
+                    pool.extend(self.generate(batch, words))
+                    # Let requests in between batches
+                    await asyncio.sleep(0)
+
+    def metrics(self):
+        latencies = list(self.latencies)
+        milliseconds = [latency * 1000 for latency in latencies]
+        return {
+            'requests': self.requests,
+            'pool_misses': self.pool_misses,
+            'latency_ms': {
+                'p50': percentile(milliseconds, 0.50),
+                'p99': percentile(milliseconds, 0.99),
+                'samples': len(latencies),
+            },
+            'pools': {
+                str(words): {
+                    'size': len(pool),
+                    'capacity': self.pool_size,
+                    'fill': len(pool) / self.pool_size,
+                }
+                for words, pool in sorted(self.pools.items())
+            },
+        }
+
+    def handle(self, method, target):
+        """Handle a request and return the status and a JSON-serializable
+           response body."""
+        if method != 'GET':
+            raise RequestError(405, "only GET is supported")
+        url = urlsplit(target)
+        if url.path == '/passphrase':
+            query = parse_qs(url.query)
+            words = int_parameter(query, 'words', DEFAULT_WORDS, MAX_WORDS)
+            count = int_parameter(query, 'count', 1, MAX_COUNT)
+            return 200, {'passphrases': self.take(count, words)}
+        if url.path == '/metrics':
+            return 200, self.metrics()
+        raise RequestError(404, f"no such endpoint: {url.path}")
+
+    async def handle_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests on a connection until it is closed."""
+        try:
+            while True:
+                try:
+                    request_line = await read_line(
+                        reader, 400, "request line too long")
+                    if not request_line.strip():
+                        break
+                    start = time.perf_counter()
+                    headers = await read_headers(reader)
+                    await discard_body(reader, headers)
+                except RequestError as err:
+                    # Where the next request starts is unknown, so close
+                    writer.write(http_response(
+                        err.status, {'error': str(err)}, False))
+                    await writer.drain()
+                    break
+                try:
+                    method, target, version = \
+                        request_line.decode('latin-1').split()
+                    status, body = self.handle(method, target)
+                except RequestError as err:
+                    status, body = err.status, {'error': str(err)}
+                except ValueError:
+                    status, body = 400, {'error': "malformed request"}
+                    version = 'HTTP/1.0'
+
+                keep_alive = (version == 'HTTP/1.1' and
+                              headers.get('connection', '') != 'close')
+                writer.write(http_response(status, body, keep_alive))
+                await writer.drain()
+                self.requests += 1
+                self.latencies.append(time.perf_counter() - start)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def int_parameter(query, name, default, maximum):
+    """Read an integer query parameter between 1 and maximum."""
+    values = query.get(name)
+    if not values:
+        return default
+    try:
+        value = int(values[0])
+    except ValueError:
+        raise RequestError(400, f"{name} must be an integer") from None
+    if not 1 <= value <= maximum:
+        raise RequestError(400, f"{name} must be between 1 and {maximum}")
+    return value
+
+
+async def read_line(reader, status, message):
+    """Read a line, or raise a RequestError with the given status and
+       message if it is longer than the stream limit."""
+    try:
+        return await reader.readline()
+    except ValueError:
+        raise RequestError(status, message) from None
+
+
+async def read_headers(reader):
+    """Read HTTP headers into a dict with lowercase names."""
+    headers = {}
+    while True:
+        line = await read_line(reader, 431, "header line too long")
+        if not line.strip():
+            return headers
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip().lower()
+
+
+async def discard_body(reader, headers):
+    """Read and discard the body of a request, so that the next request
+       on the connection is read from its request line. Bodies without a
+       valid Content-Length, or longer than MAX_BODY, are rejected."""
+    if 'transfer-encoding' in headers:
+        raise RequestError(400, "chunked request bodies are not supported")
+    try:
+        length = int(headers.get('content-length', '0'))
+    except ValueError:
+        raise RequestError(400, "invalid Content-Length") from None
+    if length < 0:
+        raise RequestError(400, "invalid Content-Length")
+    if length > MAX_BODY:
+        raise RequestError(413, f"request body is larger than {MAX_BODY} "
+                           f"bytes")
+    await reader.readexactly(length)
+
+
+def http_response(status, body, keep_alive):
+    """Encode an HTTP response with a JSON body."""
+    content = json.dumps(body, ensure_ascii=False).encode('utf-8')
+    head = (f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(content)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode('latin-1') + content
+
+
+async def start_server(service, host='127.0.0.1', port=8080):
+    """Start the HTTP server and the pool refill task. Return the server
+       and the task."""
+    server = await asyncio.start_server(service.handle_connection, host,
+                                        port)
+    refill_task = asyncio.create_task(service.refill())
+    return server, refill_task
+
+
+async def serve(host, port, pool_size):
+    service = PassphraseService(generator.load_default_form_table(),
+                                pool_size)
+    service.prefill()
+    server, refill_task = await start_server(service, host, port)
+    address = server.sockets[0].getsockname()
+    print(f"Serving passphrases on http://{address[0]}:{address[1]}/")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        refill_task.cancel()
+
+
+def main(argv=None):
+    """Start the passphrase server from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Serve Finnish passphrases over HTTP.")
+    parser.add_argument('--host', default='127.0.0.1',
+                        help="address to listen on (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8080,
+                        help="port to listen on (default: 8080)")
+    parser.add_argument('--pool-size', type=int, default=POOL_SIZE,
+                        help="number of pre-generated phrases per word count")
+    args = parser.parse_args(argv)
+    if args.pool_size < 1:
+        parser.error("--pool-size must be at least 1")
+    try:
+        asyncio.run(serve(args.host, args.port, args.pool_size))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
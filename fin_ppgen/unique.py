@@ -0,0 +1,93 @@
+"""
+This module contains an index of the distinct surface forms of a form
+table.
+
+Different lexical forms often end up as the same string: for example, the
+singular genitive and the plural nominative of many words differ only in
+their last letter, and some words have identical forms in several cases.
+Sampling uniformly from the rows of a form table therefore draws the
+duplicated strings more often than the others, and the entropy of a word
+is less than log2 of the size of the table. UniqueForms keeps one row for
+every distinct form, so sampling from it is uniform over the distinct
+forms, and it reports the exact entropy of both ways of sampling.
+
+UniqueForms behaves like a form table (it has a length, returns forms by
+index, and assembles phrases), so it can be used wherever a table is
+expected, e.g. by generator.generate_passphrases() or budget.LengthIndex.
+"""
+
+from array import array
+import math
+
+from fin_ppgen import sampling
+
+
+class UniqueForms:
+    """The distinct forms of a form table. Each distinct form is represented
+       by the first row of the table that has it."""
+
+    def __init__(self, table):
+        first_rows = {}
+        multiplicities = {}
+        for i in range(len(table)):
+            form = table[i]
+            if form in first_rows:
+                multiplicities[form] += 1
+            else:
+                first_rows[form] = i
+                multiplicities[form] = 1
+        self.table = table
+        self.rows = array('I', first_rows.values())
+        self.multiplicities = array('I', multiplicities.values())
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        return self.table[self.rows[index]]
+
+    @property
+    def duplicates(self):
+        """The number of rows of the table that repeat an earlier form."""
+        return len(self.table) - len(self.rows)
+
+    def phrase(self, indices, separator=' '):
+        """Assemble a passphrase from the distinct forms at the given
+           indices."""
+        rows = self.rows
+        return self.table.phrase([rows[i] for i in indices], separator)
+
+    def passphrase(self, length, separator=' '):
+        """Return a passphrase of random distinct forms."""
+        return self.phrase(sampling.randbelow_batch(len(self), length),
+                           separator)
+
+    def table_bits_per_word(self):
+        """The Shannon entropy in bits of a form drawn uniformly from the
+           rows of the table, where duplicated forms are more likely."""
+        rows = len(self.table)
+        return math.log2(rows) - sum(
+            count * math.log2(count) for count in self.multiplicities
+            if count > 1) / rows
+
+    def entropy_report(self, words_per_phrase, unique=True):
+        """Return the entropy of phrases as a dict. If unique is true, the
+           words are drawn uniformly from the distinct forms; otherwise they
+           are drawn uniformly from the rows of the table, and the entropy
+           is the Shannon entropy of the forms. nominal_bits_per_phrase is
+           log2 of the number of phrases of rows, an upper bound that counts
+           duplicated forms as distinct."""
+        if unique:
+            bits_per_word = math.log2(len(self))
+        else:
+            bits_per_word = self.table_bits_per_word()
+        return {
+            'words': words_per_phrase,
+            'phrases': len(self) ** words_per_phrase,
+            'bits_per_phrase': words_per_phrase * bits_per_word,
+            'bits_per_word': bits_per_word,
+            'table_forms': len(self.table),
+            'unique_forms': len(self),
+            'nominal_bits_per_phrase':
+                words_per_phrase * math.log2(len(self.table)),
+        }
@@ -0,0 +1,17 @@
+"""Shared test fixtures"""
+
+import pytest
+import fin_ppgen.forms as forms
+from fin_ppgen.lexicon import Lexeme, Lexicon
+
+
+# A back-vowel noun and a front-vowel noun with consonant gradation
+@pytest.fixture(scope='session')
+def nouns():
+    return Lexicon.from_entries([Lexeme('kulkija', 12, ''),
+                                 Lexeme('pöytä', 10, 'F')])
+
+
+@pytest.fixture(scope='session')
+def noun_table(nouns):
+    return forms.build_form_table(nouns)
@@ -0,0 +1,85 @@
+"""Reverse analyzer tests"""
+
+import pytest
+import fin_ppgen.analyzer as analyzer
+import fin_ppgen.forms as forms
+from fin_ppgen.lexicon import Lexeme, Lexicon
+
+
+LEXICON = Lexicon.from_entries([Lexeme('kulkija', 12, ''),
+                                Lexeme('pöytä', 10, 'F'),
+                                Lexeme('koira', 10, ''),
+                                Lexeme('kala', 9, '')])
+TABLE = forms.build_form_table(LEXICON)
+ANALYZER = analyzer.Analyzer(TABLE, LEXICON)
+
+
+def test_every_form_is_found():
+    trie = ANALYZER.trie
+    assert len(trie) == len(set(TABLE.forms))
+    for row, form in enumerate(TABLE.forms):
+        assert row in trie.lookup(form)
+        assert TABLE.forms[trie.rows[trie.starts[trie.find(form)]]] == form
+
+
+@pytest.mark.parametrize("word, expected", [
+    ('kulkijoissa', ['<N12>kulkija+Pl+Ine']),
+    ('pöydän', ['<N10F>pöytä+Sg+Gen']),
+    ('kalat', ['<N9>kala+Pl+Nom']),
+    ('koira', ['<N10>koira+Sg+Nom']),
+    ('koir', []),
+    ('koiraxyz', []),
+    ('', []),
+])
+def test_analyze(word, expected):
+    assert ANALYZER.analyze(word) == expected
+    assert (word in ANALYZER) == bool(expected)
+
+
+def test_analyze_phrases():
+    assert ANALYZER.analyze_phrase('kalat-koira', '-') == [
+        ('kalat', ['<N9>kala+Pl+Nom']), ('koira', ['<N10>koira+Sg+Nom'])]
+    results = list(ANALYZER.analyze_phrases(['kalat koira', 'koira talo']))
+    assert results[1] == [('koira', ['<N10>koira+Sg+Nom']), ('talo', [])]
+
+
+def test_every_row_is_analyzed():
+    for row, form in enumerate(TABLE.forms):
+        analyses = ANALYZER.analyze(form)
+        assert ANALYZER.lexical_form(row) in analyses
+        assert len(analyses) == TABLE.forms.count(form)
+
+
+def test_lexeme_id():
+    assert TABLE.lexeme_id(0) == 0
+    assert TABLE.lexeme_id(len(TABLE) - 1) == len(LEXICON) - 1
+    assert ANALYZER.lexical_form(len(TABLE.endings) + 1) == \
+        '<N10F>pöytä' + TABLE.endings[1]
+
+
+def test_trie_file_round_trip(tmp_path):
+    path = str(tmp_path / 'words.trie')
+    analyzer.write_trie(ANALYZER.trie, path, b'\x02' * 32)
+    digest, trie = analyzer.read_trie(path)
+    assert digest == b'\x02' * 32
+    for name in ('first', 'labels', 'form_ids', 'starts', 'rows'):
+        assert getattr(trie, name) == getattr(ANALYZER.trie, name)
+
+
+def test_read_trie_rejects_other_files(tmp_path):
+    path = tmp_path / 'words.trie'
+    path.write_bytes(b'not a trie' * 10)
+    with pytest.raises(analyzer.TrieFormatError):
+        analyzer.read_trie(str(path))
+
+
+def test_load_analyzer(tmp_path):
+    table_path = str(tmp_path / 'words.forms')
+    trie_path = str(tmp_path / 'words.trie')
+    forms.write_form_table(TABLE, table_path, b'\x03' * 32)
+    with forms.MappedFormTable(table_path) as table:
+        loaded = analyzer.load_analyzer(table, LEXICON, trie_path)
+        assert loaded.analyze('pöydän') == ['<N10F>pöytä+Sg+Gen']
+        assert analyzer.read_trie(trie_path)[0] == b'\x03' * 32
+        reloaded = analyzer.load_analyzer(table, LEXICON, trie_path)
+        assert reloaded.analyze('kulkijoissa') == ['<N12>kulkija+Pl+Ine']
@@ -0,0 +1,37 @@
+"""Benchmark script tests"""
+
+import pytest
+
+from benchmarks import bench_pipeline
+
+
+def result(median):
+    return {'median_s': median, 'best_s': median, 'items': 1,
+            'items_per_s': 1 / median}
+
+
+@pytest.mark.parametrize('before, after, regressed', [
+    (1.0, 1.0, False),
+    (1.0, 1.2, False),
+    (1.0, 1.3, True),
+    (1.0, 0.5, False),
+])
+def test_compare_results(before, after, regressed):
+    regressions = bench_pipeline.compare_results(
+        {'gradation': result(after)}, {'gradation': result(before)}, 0.25)
+    assert bool(regressions) == regressed
+    if regressed:
+        stage, old, new, change = regressions[0]
+        assert (stage, old, new) == ('gradation', before, after)
+        assert change == pytest.approx(after / before - 1)
+
+
+def test_compare_results_ignores_new_stages():
+    assert bench_pipeline.compare_results({'new': result(1.0)}, {}) == []
+
+
+def test_stage_result():
+    stats = bench_pipeline.stage_result([0.3, 0.1, 0.2], 100)
+    assert stats['median_s'] == 0.2
+    assert stats['best_s'] == 0.1
+    assert stats['items_per_s'] == pytest.approx(500)
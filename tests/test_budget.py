@@ -0,0 +1,84 @@
+"""Character budget tests: phrases must fit the budget and be drawn
+uniformly from all phrases that fit it"""
+
+from collections import Counter
+import itertools
+import math
+
+import pytest
+import fin_ppgen.budget as budget
+
+
+class Table(list):
+    def phrase(self, indices, separator=' '):
+        return separator.join(self[i] for i in indices)
+
+
+TABLE = Table(['a', 'bb', 'cc', 'ddd', 'eeee', 'ff', 'g'])
+INDEX = budget.LengthIndex(TABLE)
+
+
+def valid_phrases(words, min_chars, max_chars, separator=' '):
+    return [phrase for phrase in (
+        separator.join(forms)
+        for forms in itertools.product(TABLE, repeat=words))
+        if min_chars <= len(phrase) <= max_chars]
+
+
+def test_length_index():
+    assert INDEX.counts() == {1: 2, 2: 3, 3: 1, 4: 1}
+    assert list(INDEX.buckets[2]) == [1, 2, 5]
+    assert len(INDEX) == len(TABLE)
+
+
+def test_duplicate_forms_are_indexed_once():
+    table = Table(TABLE + ['bb', 'a', 'bb'])
+    index = budget.LengthIndex(table)
+    assert index.counts() == INDEX.counts()
+    assert list(index.buckets[2]) == [1, 2, 5]
+    assert len(budget.LengthIndex(table, distinct=False)) == len(table)
+    sampler = budget.BudgetSampler(index, 2, 4, 5)
+    assert sampler.total == len(valid_phrases(2, 4, 5))
+
+
+@pytest.mark.parametrize("words, min_chars, max_chars, separator", [
+    (1, 1, 4, ' '),
+    (2, 4, 5, ' '),
+    (3, 7, 9, ' '),
+    (3, 1, 100, ''),
+    (4, 10, 10, '--'),
+])
+def test_phrase_count(words, min_chars, max_chars, separator):
+    sampler = budget.BudgetSampler(INDEX, words, min_chars, max_chars,
+                                   len(separator))
+    assert sampler.total == len(valid_phrases(words, min_chars, max_chars,
+                                              separator))
+    assert sampler.bits == pytest.approx(math.log2(sampler.total))
+
+
+def test_phrases_are_uniform():
+    expected = valid_phrases(2, 4, 5)
+    samples = 200 * len(expected)
+    phrases = list(budget.generate_budget_passphrases(
+        samples, 2, TABLE, 4, 5, index=INDEX))
+    counts = Counter(phrases)
+    assert set(counts) == set(expected)
+    # Chi-square test with a very low false failure rate
+    chi_square = sum((count - 200) ** 2 / 200 for count in counts.values())
+    assert chi_square < len(expected) + 6 * math.sqrt(2 * len(expected))
+
+
+def test_impossible_budget():
+    with pytest.raises(ValueError):
+        budget.BudgetSampler(INDEX, 3, 1, 4)
+    with pytest.raises(ValueError):
+        budget.BudgetSampler(INDEX, 1, 5, 10)
+
+
+def test_entropy_report():
+    sampler = budget.BudgetSampler(INDEX, 2, 4, 5)
+    report = sampler.entropy_report(len(TABLE))
+    assert report['phrases'] == len(valid_phrases(2, 4, 5))
+    assert report['bits_per_word'] == pytest.approx(report['bits_per_phrase']
+                                                    / 2)
+    assert report['bits_without_budget'] == pytest.approx(2 * math.log2(7))
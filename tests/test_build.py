@@ -0,0 +1,124 @@
+"""Incremental build tests"""
+
+import os
+
+import pytest
+import fin_ppgen.build as build
+import fin_ppgen.forms as forms
+import fin_ppgen.rules as rules
+from fin_ppgen.lexicon import Lexeme, Lexicon
+
+
+WORDS = [Lexeme('koira', 10, ''), Lexeme('kulkija', 12, ''),
+         Lexeme('pöytä', 10, 'F'), Lexeme('aakkosto', 2, '')]
+
+
+def actions(steps):
+    return {step.paradigm: (step.action, step.reason) for step in steps}
+
+
+@pytest.fixture
+def build_dir(tmp_path):
+    return str(tmp_path / 'build')
+
+
+def test_build_matches_full_build(build_dir):
+    words = Lexicon.from_entries(WORDS)
+    table, steps = build.build_forms(words, build_dir=build_dir)
+    assert table.forms == forms.build_form_table(words).forms
+    assert actions(steps) == {2: ('rebuilt', "no previous build"),
+                              10: ('rebuilt', "no previous build"),
+                              12: ('rebuilt', "no previous build")}
+
+    table, steps = build.build_forms(words, build_dir=build_dir)
+    assert table.forms == forms.build_form_table(words).forms
+    assert {action for action, _ in actions(steps).values()} == {'reused'}
+
+
+def test_only_changed_paradigms_are_rebuilt(build_dir):
+    build.build_forms(Lexicon.from_entries(WORDS), build_dir=build_dir)
+    words = Lexicon.from_entries(WORDS[:2] + [Lexeme('kaappi', 5, 'B')] +
+                                 WORDS[2:3])
+    table, steps = build.build_forms(words, build_dir=build_dir)
+    assert actions(steps) == {2: ('removed', "no entries left"),
+                              5: ('rebuilt', "new paradigm"),
+                              10: ('reused', ''),
+                              12: ('reused', '')}
+    assert table.forms == forms.build_form_table(words).forms
+
+    words = Lexicon.from_entries(WORDS[:3] + [Lexeme('koira', 10, '')])
+    _, steps = build.build_forms(words, build_dir=build_dir)
+    assert actions(steps)[10] == ('rebuilt', "entries changed")
+    assert actions(steps)[12] == ('reused', '')
+
+
+def test_forced_build_removes_stale_forms(build_dir):
+    build.build_forms(Lexicon.from_entries(WORDS), build_dir=build_dir)
+    words = Lexicon.from_entries(WORDS[:3])
+    _, steps = build.build_forms(words, build_dir=build_dir, force=True)
+    assert actions(steps)[2] == ('removed', "no entries left")
+    assert not os.path.exists(build.artifact_path(build_dir, 2))
+    assert os.path.exists(build.artifact_path(build_dir, 10))
+
+
+def test_rule_changes_rebuild_their_paradigms(build_dir, monkeypatch):
+    words = Lexicon.from_entries(WORDS)
+    build.build_forms(words, build_dir=build_dir)
+    digest = build.rule_block_digest
+    monkeypatch.setattr(build, 'rule_block_digest', lambda rule_sets, p:
+                        digest(rule_sets, p) + ('x' if p == 12 else ''))
+    _, steps = build.build_forms(words, build_dir=build_dir)
+    assert actions(steps) == {2: ('reused', ''), 10: ('reused', ''),
+                              12: ('rebuilt', "rules changed")}
+
+
+def test_rule_block_digest():
+    first = rules.RuleSet([rules.Rule(r'\<N1\>\w+\+Sg\+Nom', 'x', 'y'),
+                           rules.Rule(r'\<N2[A-M]?\>\w+\+Sg\+Nom', 'x', 'y')])
+    second = rules.RuleSet([rules.Rule(r'\<N1\>\w+\+Sg\+Nom', 'x', 'z'),
+                            rules.Rule(r'\<N2[A-M]?\>\w+\+Sg\+Nom', 'x', 'y')])
+    assert build.rule_block_digest({'inflection': first}, 1) != \
+        build.rule_block_digest({'inflection': second}, 1)
+    assert build.rule_block_digest({'inflection': first}, 2) == \
+        build.rule_block_digest({'inflection': second}, 2)
+
+
+def test_load_form_table(tmp_path, build_dir):
+    words = Lexicon.from_entries(WORDS)
+    path = str(tmp_path / 'words.forms')
+    steps = []
+    with build.load_form_table(words, path, build_dir=build_dir,
+                               steps=steps) as table:
+        assert [table[i] for i in range(len(table))] == \
+            forms.build_form_table(words).forms
+    assert len(steps) == 3
+    steps = []
+    build.load_form_table(words, path, build_dir=build_dir,
+                          steps=steps).close()
+    assert steps == []
+    with build.load_form_table(Lexicon.from_entries(WORDS[:2]), path,
+                               build_dir=build_dir) as table:
+        assert len(table) == 2 * 22
+
+
+def test_pipeline_changes_rebuild_the_table_file(tmp_path, build_dir,
+                                                 monkeypatch):
+    source = tmp_path / 'pipeline.py'
+    source.write_text('x = 1\n')
+    monkeypatch.setattr(build, 'PIPELINE_SOURCES',
+                        build.PIPELINE_SOURCES + [str(source)])
+    words = Lexicon.from_entries(WORDS)
+    path = str(tmp_path / 'words.forms')
+    build.load_form_table(words, path, build_dir=build_dir).close()
+    steps = []
+    build.load_form_table(words, path, build_dir=build_dir,
+                          steps=steps).close()
+    assert steps == []
+    source.write_text('x = 2\n')
+    build.load_form_table(words, path, build_dir=build_dir,
+                          steps=steps).close()
+    assert {step.reason for step in steps} == {
+        "endings or pipeline code changed"}
+    assert build.format_steps(
+        [build.BuildStep(10, 2, 'rebuilt', "rules changed")])[0] == \
+        'N10        2 lexemes  rebuilt (rules changed)'
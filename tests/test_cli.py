@@ -0,0 +1,161 @@
+"""Command line interface tests"""
+
+import csv
+import io
+import json
+import math
+import pytest
+import fin_ppgen.cli as cli
+import fin_ppgen.compound as compound
+import fin_ppgen.formspace as formspace
+import fin_ppgen.generator as generator
+
+
+PHRASES = ['talo kala', 'koira, "kissa"', 'pöydän kulkijoissa']
+
+
+@pytest.mark.parametrize("output_format, parse", [
+    ('text', lambda text: text.splitlines()),
+    ('jsonl', lambda text: [json.loads(line)['passphrase']
+                            for line in text.splitlines()]),
+    ('csv', lambda text: [row[0] for row in
+                          csv.reader(io.StringIO(text))][1:]),
+])
+def test_write_passphrases(output_format, parse):
+    fp = io.StringIO()
+    assert cli.write_passphrases(iter(PHRASES), fp, output_format) == 3
+    assert parse(fp.getvalue()) == PHRASES
+
+
+@pytest.fixture
+def small_table(noun_table, monkeypatch):
+    monkeypatch.setattr(generator, 'load_default_form_table',
+                        lambda: noun_table)
+    monkeypatch.setattr(generator, 'PHRASE_BATCH_SIZE', 10)
+    return noun_table
+
+
+def test_main_writes_output_file(small_table, tmp_path):
+    output = tmp_path / 'phrases.jsonl'
+    assert cli.main(['--count', '25', '--words', '3', '--separator', '.',
+                     '--format', 'jsonl', '--output', str(output)]) == 0
+    lines = output.read_text(encoding='utf-8').splitlines()
+    assert len(lines) == 25
+    for line in lines:
+        words = json.loads(line)['passphrase'].split('.')
+        assert len(words) == 3
+        assert all(word in small_table.forms for word in words)
+
+
+def test_main_writes_to_stdout(small_table, capsys):
+    assert cli.main(['-n', '5', '-w', '2']) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 5
+    assert all(len(line.split(' ')) == 2 for line in lines)
+
+
+@pytest.mark.parametrize("argv", [['--count', '0'], ['--words', '-1'],
+                                  ['--format', 'xml']])
+def test_invalid_arguments(argv):
+    with pytest.raises(SystemExit):
+        cli.parse_args(argv)
+
+
+def test_main_character_budget(small_table, capsys):
+    assert cli.main(['--count', '20', '--words', '2', '--min-chars', '15',
+                     '--max-chars', '18', '--entropy']) == 0
+    out, err = capsys.readouterr()
+    phrases = out.splitlines()
+    assert len(phrases) == 20
+    assert all(15 <= len(phrase) <= 18 for phrase in phrases)
+    assert 'bits per phrase' in err and 'without the character budget' in err
+
+
+def test_main_impossible_budget(small_table, capsys):
+    assert cli.main(['--words', '4', '--max-chars', '10']) == 2
+    assert 'no phrases of 4 words' in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("jobs", ['-1', 'x'])
+def test_invalid_jobs(jobs, capsys):
+    with pytest.raises(SystemExit) as exc_info:
+        cli.main(['--count', '2', '--jobs', jobs])
+    assert exc_info.value.code == 2
+    assert '--jobs' in capsys.readouterr().err
+
+
+def test_budget_cannot_be_used_with_jobs():
+    with pytest.raises(SystemExit):
+        cli.parse_args(['--max-chars', '30', '--jobs', '2'])
+
+
+def test_main_unique_forms(small_table, capsys):
+    assert cli.main(['--count', '5', '--unique', '--entropy']) == 0
+    out, err = capsys.readouterr()
+    assert len(out.splitlines()) == 5
+    distinct = len(set(small_table.forms))
+    assert f"{distinct} distinct forms in {len(small_table)} rows" in err
+
+
+def test_main_entropy_of_table_rows(small_table, capsys):
+    assert cli.main(['--count', '1', '--words', '2', '--entropy']) == 0
+    err = capsys.readouterr().err
+    bits = 2 * math.log2(len(small_table))
+    assert f"counting the rows gives an upper bound of {bits:.1f} bits" in err
+
+
+def test_main_ledger(small_table, tmp_path, capsys):
+    path = str(tmp_path / 'issued.ledger')
+    argv = ['--count', '20', '--words', '1', '--ledger', path,
+            '--ledger-capacity', '1000']
+    assert cli.main(argv) == 0
+    first = capsys.readouterr().out.splitlines()
+    assert cli.main(argv + ['--stats']) == 0
+    out, err = capsys.readouterr()
+    second = out.splitlines()
+    assert len(set(first + second)) == 40
+    assert '40 phrases added' in err
+    # Fewer than 20 distinct words are left in the table
+    assert cli.main(argv) == 2
+    assert 'error:' in capsys.readouterr().err
+
+
+def test_main_compound(small_table, monkeypatch, capsys):
+    monkeypatch.setattr(compound, 'load_modifiers', lambda: ['vesi', 'kala'])
+    assert cli.main(['--count', '10', '--words', '2', '--compound',
+                     '--entropy']) == 0
+    out, err = capsys.readouterr()
+    phrases = out.splitlines()
+    assert len(phrases) == 10
+    for word in ' '.join(phrases).split(' '):
+        assert word.startswith(('vesi', 'kala'))
+        assert word[4:].lstrip('-') in small_table.forms
+    assert '2 compound modifiers' in err and '+2.0 bits' in err
+
+
+def test_compound_cannot_be_used_with_budget():
+    with pytest.raises(SystemExit):
+        cli.parse_args(['--max-chars', '30', '--compound'])
+
+
+def test_main_expanded_forms(nouns, monkeypatch, capsys):
+    space = formspace.FormSpace(nouns)
+    monkeypatch.setattr(formspace, 'load_form_space', lambda: space)
+    assert cli.main(['--count', '5', '--words', '3', '--expanded',
+                     '--entropy']) == 0
+    out, err = capsys.readouterr()
+    words = {space[i] for i in range(len(space))}
+    phrases = out.splitlines()
+    assert len(phrases) == 5
+    assert all(word in words for phrase in phrases
+               for word in phrase.split(' '))
+    assert f"{len(space):,} forms with clitics" in err
+    assert "bits per phrase are an upper bound" in err
+
+
+@pytest.mark.parametrize("argv", [['--expanded', '--jobs', '2'],
+                                  ['--expanded', '--unique'],
+                                  ['--expanded', '--max-chars', '30']])
+def test_expanded_option_conflicts(argv):
+    with pytest.raises(SystemExit):
+        cli.parse_args(argv)
@@ -0,0 +1,146 @@
+"""Compound mode tests"""
+
+import math
+
+import pytest
+import fin_ppgen.compound as compound
+import fin_ppgen.forms as forms
+import fin_ppgen.lexicon as lexicon
+from fin_ppgen.lexicon import Lexeme, Lexicon
+
+
+SPLIT_LEXICON = Lexicon.from_entries([
+    Lexeme('pohja', 10, ''), Lexeme('ohja', 10, ''), Lexeme('rahti', 5, 'C'),
+    Lexeme('auto', 1, ''), Lexeme('ala', 9, ''), Lexeme('syrjä', 10, ''),
+    Lexeme('sotilas', 41, ''), Lexeme('avustus', 39, ''),
+    Lexeme('savustus', 39, ''), Lexeme('hyvä', 10, ''),
+    Lexeme('tahto', 1, 'F'), Lexeme('toinen', 38, ''),
+    Lexeme('isyys', 40, ''), Lexeme('ihminen', 38, ''),
+    Lexeme('kirppu', 1, 'B'), Lexeme('käsi', 27, ''),
+    Lexeme('juosta', 73, ''), Lexeme('järvi', 7, ''), Lexeme('laiva', 10, ''),
+    Lexeme('kala', 9, ''), Lexeme('linja', 10, ''), Lexeme('laivarahti'),
+    Lexeme('pikajuoksu'),
+])
+HEADS = compound.compound_heads(SPLIT_LEXICON)
+ATTESTED = compound.compounding_forms(SPLIT_LEXICON)
+
+
+def test_compound_heads_and_forms():
+    # -nen words and (U)Us derivations are not heads
+    assert 'toinen' not in HEADS and 'isyys' not in HEADS
+    assert {'pohja', 'avustus', 'sotilas', 'laivarahti'} <= HEADS
+    # A compound that does not end with a noun is not a head
+    assert 'pikajuoksu' not in HEADS
+    assert {'hyvä', 'hyvän', 'tahdon', 'ihmis', 'ihmisen', 'toinen',
+            'sotilas'} <= ATTESTED
+    assert 'juosta' not in ATTESTED
+
+
+@pytest.mark.parametrize("lemma, split", [
+    ('järvenpohja', ('järven', 'pohja')),
+    ('laivarahti', ('laiva', 'rahti')),
+    ('linja-auto', ('linja', 'auto')),
+    ('käsiala', ('käsi', 'ala')),
+    ('kisala', None),
+    ('ihmiskirppu', ('ihmis', 'kirppu')),
+    # An attested modifier is preferred to a longer head
+    ('sotilasavustus', ('sotilas', 'avustus')),
+    ('hyvänpohja', ('hyvän', 'pohja')),
+    ('kalapohja', ('kala', 'pohja')),
+    # A compound can be the head, and a modifier can be a sequence of
+    # attested forms
+    ('kalalaivarahti', ('kala', 'laivarahti')),
+    ('järvenkalapohja', ('järvenkala', 'pohja')),
+    # Modifiers that are not attested are not guessed
+    ('pikapohja', None),
+    ('kalapikapohja', None),
+    ('pika-auto', None),
+    ('hyväntahtoinen', None),
+    ('avomielisyys', None),
+    ('pohja', None),
+    ('ala', None),
+    ('auto-oppi', None),
+    ('xala', None),
+])
+def test_split_compound(lemma, split):
+    assert compound.split_compound(lemma, HEADS, ATTESTED) == split
+
+
+@pytest.mark.parametrize("modifier, head, word", [
+    ('vesi', 'pöydän', 'vesipöydän'),
+    ('linja', 'autoissa', 'linja-autoissa'),
+    ('kala', 'allas', 'kala-allas'),
+    ('kala', 'pöydät', 'kalapöydät'),
+    ('työ', 'öiden', 'työ-öiden'),
+    ('kirjoitus', 'taito', 'kirjoitustaito'),
+])
+def test_join_compound(modifier, head, word):
+    assert compound.join_compound(modifier, head) == word
+
+
+LEXICON = Lexicon.from_entries([
+    Lexeme('pöytä', 10, 'F'), Lexeme('kala', 9, ''), Lexeme('auto', 1, ''),
+    Lexeme('vesi', 27, ''), Lexeme('linja', 10, ''), Lexeme('suuri', 26, ''),
+    Lexeme('vesipöytä'), Lexeme('linja-auto'), Lexeme('käden kala'),
+    Lexeme('CDauto'), Lexeme('xauto'), Lexeme('kalakala'),
+    Lexeme('suurikala'), Lexeme('vesikala'),
+])
+
+
+def test_compound_modifiers():
+    assert compound.compound_modifiers(LEXICON) == ['kala', 'linja', 'suuri',
+                                                   'vesi']
+
+
+def test_modifiers_of_the_word_list_are_attested():
+    words = lexicon.load_lexicon()
+    heads = compound.compound_heads(words)
+    attested = compound.compounding_forms(words)
+    splits = [compound.split_compound(words.lemmas[i], heads, attested)
+              for i in words.index.query([0])[::10]]
+    modifiers = {split[0] for split in splits if split is not None}
+    assert len(modifiers) > 1000
+    # Every modifier is an attested form or a sequence of them
+    for modifier in modifiers:
+        ends = {0}
+        for end in range(1, len(modifier) + 1):
+            if any(modifier[start:end] in attested for start in ends):
+                ends.add(end)
+        assert len(modifier) in ends, modifier
+
+
+def test_compound_table():
+    heads = forms.build_form_table(
+        Lexicon.from_entries([Lexeme('auto', 1, ''), Lexeme('kala', 9, '')]))
+    modifiers = ['linja', 'vesi']
+    table = compound.CompoundTable(modifiers, heads)
+    assert len(table) == 2 * len(heads)
+    assert table[0] == 'linja-' + heads[0]
+    assert table[len(heads) + 1] == 'vesi' + heads[1]
+    assert table[-1] == 'vesi' + heads[len(heads) - 1]
+    with pytest.raises(IndexError):
+        table[len(table)]
+    assert table.phrase([0, len(heads)], '.') == \
+        f'linja-{heads[0]}.vesi{heads[0]}'
+    words = table.passphrase(5).split(' ')
+    assert len(words) == 5
+    assert all(word in {table[i] for i in range(len(table))}
+               for word in words)
+
+
+def test_compound_table_needs_modifiers():
+    with pytest.raises(ValueError):
+        compound.CompoundTable([], ['kala'])
+
+
+def test_entropy_report():
+    table = compound.CompoundTable(['linja', 'vesi', 'kala', 'käsi'],
+                                   ['auto'] * 8)
+    report = table.entropy_report(3)
+    assert report['phrases'] == 32 ** 3
+    assert report['bits_per_word'] == 5
+    assert report['bits_per_phrase'] == 15
+    assert report['single_bits_per_phrase'] == 9
+    assert table.entropy_report(2, head_bits=1.5)['bits_per_phrase'] == 7
+    report = compound.CompoundTable(['a'] * 3, ['b']).entropy_report(1)
+    assert math.isclose(report['bits_per_word'], math.log2(3))
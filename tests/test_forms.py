@@ -0,0 +1,84 @@
+"""Form table tests"""
+
+import pytest
+import fin_ppgen.forms as forms
+import fin_ppgen.nlp as nlp
+from fin_ppgen.lexicon import Lexeme, Lexicon
+
+
+LEXICON = Lexicon.from_entries([Lexeme('baarimikko', 1, 'A'),
+                                Lexeme('kulkija', 12, ''),
+                                Lexeme('pöytä', 10, 'F'),
+                                Lexeme('aasian flamingo', 9, '')])
+
+
+@pytest.fixture(scope='module')
+def table():
+    return forms.build_form_table(LEXICON)
+
+
+def test_form_table_layout(table):
+    assert len(table) == len(LEXICON) * 22
+    assert table.lexical_form(0) == '<N1A>baarimikko+Sg+Nom'
+    assert table.lexical_form(22 + 14) == '<N12>kulkija+Pl+Ine'
+    assert table[22 + 14] == 'kulkijoissa'
+    assert table[2 * 22 + 1] == 'pöydän'
+    assert table.lexeme(3 * 22) == Lexeme('aasian flamingo', 9, '')
+    assert table[3 * 22] == 'aasianflamingo'
+
+
+def test_form_table_matches_pipeline(table):
+    for index in range(len(table)):
+        lexical = [table.lexical_form(index)]
+        final = nlp.apply_vowel_harmony(
+            nlp.apply_other_transformations(
+                nlp.apply_inflection_rules(
+                    nlp.apply_consonant_gradation(lexical))))
+        assert table[index] == final[0].replace(' ', '')
+
+
+def test_passphrase(table):
+    words = table.passphrase(5, separator='-').split('-')
+    assert len(words) == 5
+    assert all(word in table.forms for word in words)
+
+
+def test_form_table_must_match_lexicon():
+    with pytest.raises(ValueError):
+        forms.FormTable(LEXICON, ['talo'])
+
+
+def test_mapped_form_table(table, tmp_path):
+    file_path = str(tmp_path / 'words.forms')
+    forms.write_form_table(table, file_path, b'\x02' * 32)
+    with forms.MappedFormTable(file_path) as mapped:
+        assert len(mapped) == len(table)
+        assert mapped.digest == b'\x02' * 32
+        assert [mapped[i] for i in range(len(mapped))] == table.forms
+        assert bytes(mapped.form_bytes(22 + 14)) == 'kulkijoissa'.encode()
+        assert mapped.lexeme_id(2 * 22 + 1) == 2
+        assert mapped.ending(2 * 22 + 1) == '+Sg+Gen'
+        assert mapped.phrase([22 + 14, 2 * 22 + 1], '-') == \
+            'kulkijoissa-pöydän'
+        assert len(mapped.passphrase(4).split(' ')) == 4
+        with pytest.raises(IndexError):
+            mapped.form_bytes(len(mapped))
+
+
+@pytest.mark.parametrize('damage', [
+    lambda data: data[:10],
+    lambda data: b'XXXX' + data[4:],
+    lambda data: data + b'x',
+])
+def test_invalid_table_file_is_closed(table, tmp_path, monkeypatch, damage):
+    path = tmp_path / 'words.forms'
+    forms.write_form_table(table, str(path))
+    path.write_bytes(damage(path.read_bytes()))
+    mappings = []
+    mmap = forms.mmap.mmap
+    monkeypatch.setattr(forms.mmap, 'mmap', lambda *args, **kwargs:
+                        mappings.append(mmap(*args, **kwargs)) or
+                        mappings[-1])
+    with pytest.raises(forms.FormTableFormatError):
+        forms.MappedFormTable(str(path))
+    assert mappings[0].closed
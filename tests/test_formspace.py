@@ -0,0 +1,66 @@
+"""Form space tests"""
+
+import math
+
+import pytest
+import fin_ppgen.formspace as formspace
+import fin_ppgen.nlp as nlp
+from fin_ppgen.lexicon import Lexeme, Lexicon
+
+
+LEXICON = Lexicon.from_entries([Lexeme('koira', 10, ''),
+                                Lexeme('talo', 1, ''),
+                                Lexeme('kulkija', 12, ''),
+                                Lexeme('pöytä', 10, 'F'),
+                                Lexeme('kissa', 10, '')])
+SPACE = formspace.FormSpace(LEXICON)
+
+
+def test_size():
+    # koira, kissa: 1 alternative; talo: none; kulkija: 2; pöytä: 1
+    clitics = len(nlp.CLITICS)
+    assert len(SPACE) == clitics * (5 * 22 + 2 + 0 + 2 + 1)
+    assert SPACE.base_forms() == 5 * 22
+    assert len(formspace.FormSpace(LEXICON, clitics=[''],
+                                   alternatives=False)) == 5 * 22
+
+
+def test_every_form_is_decoded_once():
+    decoded = [SPACE.decode(i) for i in range(len(SPACE))]
+    assert len(set(decoded)) == len(SPACE)
+    for lexeme_id in range(len(LEXICON)):
+        lexeme = LEXICON[lexeme_id]
+        endings = nlp.word_class_endings(lexeme.paradigm, lexeme.gradation)
+        assert {(ending, clitic) for i, ending, clitic in decoded
+                if i == lexeme_id} == {(ending, clitic) for ending in endings
+                                       for clitic in nlp.CLITICS}
+    assert SPACE.decode(-1) == decoded[-1]
+    with pytest.raises(IndexError):
+        SPACE.decode(len(SPACE))
+
+
+def test_forms():
+    words = {SPACE[i] for i in range(len(SPACE))}
+    for word in ['koira', 'koirissako', 'koirainkin', 'pöydilläpä',
+                 'kulkijoittenhan', 'kulkijainpas', 'talojenko']:
+        assert word in words
+    assert not any('+' in word or ' ' in word for word in words)
+    assert SPACE.lexical_form(0)[1] == ''
+
+
+def test_phrases():
+    assert SPACE.phrase([0, 1], '-') == f'{SPACE[0]}-{SPACE[1]}'
+    assert len(SPACE.passphrase(4).split(' ')) == 4
+
+
+def test_needs_clitics():
+    with pytest.raises(ValueError):
+        formspace.FormSpace(LEXICON, clitics=[])
+
+
+def test_entropy_report():
+    report = SPACE.entropy_report(3)
+    assert report['phrases'] == len(SPACE) ** 3
+    assert math.isclose(report['bits_per_word'], math.log2(len(SPACE)))
+    assert report['space_forms'] == len(SPACE)
+    assert report['table_forms'] == 110
@@ -0,0 +1,51 @@
+"""Generator tests"""
+
+import itertools
+
+import fin_ppgen.forms as forms
+import fin_ppgen.generator as generator
+from fin_ppgen.lexicon import Lexeme, Lexicon
+
+
+LEXICON = Lexicon.from_entries([Lexeme('kulkija', 12, ''),
+                                Lexeme('pöytä', 10, 'F')])
+TABLE = forms.build_form_table(LEXICON)
+
+
+def test_generate_passphrases():
+    phrases = list(generator.generate_passphrases(10, 3, TABLE, '-'))
+    assert len(phrases) == 10
+    for phrase in phrases:
+        words = phrase.split('-')
+        assert len(words) == 3
+        assert all(word in TABLE.forms for word in words)
+
+
+def test_generate_passphrases_across_batches(monkeypatch):
+    monkeypatch.setattr(generator, 'PHRASE_BATCH_SIZE', 7)
+    assert len(list(generator.generate_passphrases(20, 2, TABLE))) == 20
+    assert list(generator.generate_passphrases(0, 2, TABLE)) == []
+
+
+def test_generate_passphrases_without_count(monkeypatch):
+    monkeypatch.setattr(generator, 'PHRASE_BATCH_SIZE', 7)
+    phrases = generator.generate_passphrases(None, 2, TABLE)
+    assert len(list(itertools.islice(phrases, 30))) == 30
+
+
+def test_random_set():
+    words = generator.random_set(LEXICON, 50)
+    assert len(words) == 50
+    assert set(words) <= set(LEXICON)
+
+
+def test_select_supported_words():
+    words = Lexicon.from_entries([Lexeme('koira', 10, ''),
+                                  Lexeme('aallonharja', 0, ''),
+                                  Lexeme('häive', 48, 'E'),
+                                  Lexeme('pöytä', 10, 'F')])
+    assert [lexeme.lemma for lexeme in
+            generator.select_supported_words(words)] == ['koira', 'pöytä']
+    assert [lexeme.lemma for lexeme in generator.select_word_classes(
+        words, paradigms={10, 48}, gradations={'', 'E'})] == \
+        ['koira', 'häive']
@@ -0,0 +1,135 @@
+"""Golden corpus tests"""
+
+import gzip
+
+import pytest
+import fin_ppgen.golden as golden
+import fin_ppgen.nlp as nlp
+from fin_ppgen.lexicon import Lexeme, Lexicon
+
+
+LEXICON = Lexicon.from_entries([Lexeme('koira', 10, ''),
+                                Lexeme('kulkija', 12, ''),
+                                Lexeme('pöytä', 10, 'F'),
+                                Lexeme('aivot', 1, ''),
+                                Lexeme('aakkosto', 2, '')])
+CORPUS = golden.expand_corpus(LEXICON, jobs=1)
+
+
+def changed(corpus, lexical_form, **fields):
+    corpus = dict(corpus)
+    corpus[lexical_form] = corpus[lexical_form]._replace(**fields)
+    return corpus
+
+
+def test_forms_match_pipeline():
+    assert len(CORPUS) == sum(
+        len(nlp.word_class_endings(lexeme.paradigm, lexeme.gradation))
+        for lexeme in LEXICON)
+    assert '<N12>kulkija+Pl+Gen3' in CORPUS
+    for lexical_form, form in CORPUS.items():
+        assert form.word == nlp.transform_word(lexical_form)
+        assert form.inflection.startswith('inflection-patterns.txt:')
+
+
+@pytest.mark.parametrize('lexical_form, gradated, gradation', [
+    ('<N10F>pöytä+Sg+Ine', '<N10F>pöydä+Sg+Ine',
+     'gradation-patterns.txt:'),
+    ('<N10>koira+Pl+Ine', '<N10>koira+Pl+Ine', '-'),
+    ('<N1>aivot+Sg+Nom', '<N1>aivo+Pl+Nom', '-'),
+])
+def test_expand_form(lexical_form, gradated, gradation):
+    form = golden.expand_form(lexical_form)
+    assert form.gradated == gradated
+    assert form.gradation.startswith(gradation)
+
+
+def test_parallel_expansion():
+    assert golden.expand_corpus(LEXICON, jobs=2, chunk_size=2) == CORPUS
+
+
+def test_expand_with_endings():
+    corpus = golden.expand_corpus(LEXICON, nlp.LEXICAL_ENDINGS, jobs=1)
+    assert len(corpus) == len(LEXICON) * len(nlp.LEXICAL_ENDINGS)
+    assert corpus.items() <= CORPUS.items()
+
+
+def test_corpus_file_round_trip(tmp_path):
+    first, second = str(tmp_path / 'first.gz'), str(tmp_path / 'second.gz')
+    golden.write_corpus(CORPUS, first)
+    golden.write_corpus(dict(reversed(CORPUS.items())), second)
+    assert golden.read_corpus(first) == CORPUS
+    with open(first, 'rb') as fp, open(second, 'rb') as fp2:
+        assert fp.read() == fp2.read()
+    with gzip.open(first, 'rt', encoding='utf-8') as fp:
+        lines = fp.read().splitlines()[1:]
+    assert lines == sorted(lines)
+
+
+@pytest.mark.parametrize('data', [
+    b'not a corpus',
+    gzip.compress(b'# another file\n'),
+    gzip.compress(golden.CORPUS_HEADER.encode() + b'\n<N1>talo\ttalo\n'),
+])
+def test_read_invalid_corpus(tmp_path, data):
+    path = tmp_path / 'corpus.gz'
+    path.write_bytes(data)
+    with pytest.raises(golden.CorpusFormatError):
+        golden.read_corpus(str(path))
+
+
+def test_unchanged_corpus():
+    moved = changed(CORPUS, '<N10>koira+Pl+Ine',
+                    inflection='inflection-patterns.txt:1')
+    assert golden.diff_corpora(CORPUS, moved) == []
+
+
+def test_diff_corpora():
+    new = changed(CORPUS, '<N10>koira+Pl+Ine', word='koiroissa')
+    new = changed(new, '<N10F>pöytä+Sg+Ine', word='pöytässä',
+                  gradated='<N10F>pöytä+Sg+Ine', gradation='-')
+    new['<N10>kissa+Sg+Nom'] = CORPUS['<N10>koira+Sg+Nom']
+    del new['<N12>kulkija+Sg+Gen']
+    changes = golden.diff_corpora(CORPUS, new)
+    assert [change.lexical_form for change in changes] == [
+        '<N10>kissa+Sg+Nom', '<N10>koira+Pl+Ine', '<N10F>pöytä+Sg+Ine',
+        '<N12>kulkija+Sg+Gen']
+
+    groups = golden.group_changes(changes)
+    assert sorted(groups) == [10, 12]
+    inflection = CORPUS['<N10>koira+Pl+Ine'].inflection
+    gradation = CORPUS['<N10F>pöytä+Sg+Ine'].gradation
+    assert sorted(groups[10]) == sorted(
+        [f"- (was {gradation})", inflection,
+         CORPUS['<N10>koira+Sg+Nom'].inflection])
+    assert groups[10][inflection][0].old.word == 'koirissa'
+
+    lines = golden.format_changes(changes, len(new), examples=None)
+    assert "    <N10>koira+Pl+Ine: 'koirissa' -> 'koiroissa'" in lines
+    assert "    <N10>kissa+Sg+Nom: (new) -> 'koira '" in lines
+    assert "    <N12>kulkija+Sg+Gen: 'kulkijan' -> (removed)" in lines
+    assert lines[-1] == f"2 changed, 1 added, 1 removed of {len(new)} forms"
+    lines = golden.format_changes(changes, len(new), examples=0)
+    assert "    ... and 1 more" in lines
+
+
+@pytest.fixture
+def small_lexicon(monkeypatch):
+    monkeypatch.setattr(golden.lexicon_module, 'load_lexicon',
+                        lambda: LEXICON)
+
+
+def test_main(tmp_path, small_lexicon, capsys):
+    path = str(tmp_path / 'corpus.gz')
+    assert golden.main(['--corpus', path, '--jobs', '1']) == 2
+    assert golden.main(['--update', '--corpus', path, '--jobs', '1']) == 0
+    assert golden.main(['--corpus', path, '--jobs', '1']) == 0
+    assert f"0 changed, 0 added, 0 removed of {len(CORPUS)} forms" in \
+        capsys.readouterr().out
+
+    golden.write_corpus(changed(CORPUS, '<N2>aakkosto+Sg+Gen', word='x'),
+                        path)
+    assert golden.main(['--corpus', path, '--jobs', '1']) == 1
+    out = capsys.readouterr().out
+    assert "N2: 1 forms" in out
+    assert "<N2>aakkosto+Sg+Gen: 'x' -> 'aakkoston'" in out
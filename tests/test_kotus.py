@@ -0,0 +1,51 @@
+"""Kotus XML reader tests"""
+
+import io
+import pytest
+import fin_ppgen.kotus as kotus
+from fin_ppgen.kotus import KotusEntry
+
+
+KOTUS_XML = '''﻿<?xml version="1.0" encoding="utf-8"?>
+<!DOCTYPE kotus-sanalista SYSTEM "kotus-sanalista.dtd">
+<kotus-sanalista>
+<st><s>aakkosto</s><t><tn>2</tn></t></st>
+<st><s>aallokko</s><t><tn>4</tn><av>A</av></t></st>
+<st><s>aallonharja</s></st>
+<st><s>huti</s><t><tn>5</tn><av astevaihtelu="valinnainen">F</av></t></st>
+<st><s>aneurysma</s><t><tn>9</tn></t><t><tn>10</tn></t></st>
+<st><s>kuusi</s><hn>1</hn><t><tn>24</tn></t></st>
+</kotus-sanalista>
+'''.encode('utf-8')
+
+ENTRIES = [KotusEntry('aakkosto', 2, ''),
+           KotusEntry('aallokko', 4, 'A'),
+           KotusEntry('aallonharja', 0, ''),
+           KotusEntry('huti', 5, 'F'),
+           KotusEntry('aneurysma', 9, ''),
+           KotusEntry('kuusi', 24, '')]
+
+
+@pytest.fixture
+def xml_path(tmp_path):
+    path = tmp_path / 'words.xml'
+    path.write_bytes(KOTUS_XML)
+    return str(path)
+
+
+def test_read_entries(xml_path):
+    assert kotus.read_entries(xml_path) == ENTRIES
+
+
+def test_iter_entries_from_file_object():
+    assert list(kotus.iter_entries(io.BytesIO(KOTUS_XML))) == ENTRIES
+
+
+@pytest.mark.parametrize("paradigms, expected", [
+    (range(1, 16), [ENTRIES[0], ENTRIES[1], ENTRIES[3], ENTRIES[4]]),
+    ({0}, [ENTRIES[2]]),
+    ({24, 4}, [ENTRIES[1], ENTRIES[5]]),
+    (set(), []),
+])
+def test_iter_entries_with_paradigm_filter(xml_path, paradigms, expected):
+    assert list(kotus.iter_entries(xml_path, paradigms)) == expected
@@ -0,0 +1,126 @@
+"""Issued passphrase ledger tests"""
+
+import itertools
+import math
+
+import pytest
+import fin_ppgen.ledger as ledger
+
+
+@pytest.mark.parametrize("capacity, fp_rate, bits, hashes", [
+    (1000, 0.01, 9592, 7),
+    (1000, 1e-9, 43136, 30),
+    (1, 0.5, 8, 6),
+])
+def test_filter_parameters(capacity, fp_rate, bits, hashes):
+    assert ledger.filter_parameters(capacity, fp_rate) == (bits, hashes)
+
+
+@pytest.mark.parametrize("capacity, fp_rate", [(0, 0.01), (10, 0), (10, 1)])
+def test_invalid_filter_parameters(capacity, fp_rate):
+    with pytest.raises(ValueError):
+        ledger.filter_parameters(capacity, fp_rate)
+
+
+def test_add_and_contains(tmp_path):
+    path = str(tmp_path / 'issued.ledger')
+    phrases = [f'talo kala {i}' for i in range(500)]
+    with ledger.BloomLedger.create(path, 1000, 1e-6) as issued:
+        assert all(issued.add(phrase) for phrase in phrases)
+        assert not any(issued.add(phrase) for phrase in phrases)
+        assert all(phrase in issued for phrase in phrases)
+        assert issued.added == 500
+    with ledger.BloomLedger.open(path) as issued:
+        assert issued.added == 500
+        assert all(phrase in issued for phrase in phrases)
+        assert sum(f'koira {i}' in issued for i in range(10000)) <= 1
+
+
+def test_report(tmp_path):
+    with ledger.BloomLedger.create(str(tmp_path / 'issued.ledger'),
+                                   1000, 0.01) as issued:
+        assert issued.report()['fill'] == 0
+        for i in range(1000):
+            issued.add(f'talo {i}')
+        report = issued.report()
+    assert report['bits_set'] <= 1000 * report['hashes']
+    assert 0.4 < report['fill'] < 0.6
+    assert math.isclose(report['estimated_phrases'], 1000, rel_tol=0.05)
+    assert math.isclose(report['fp_rate'], 0.01, rel_tol=0.3)
+    lines = ledger.format_report(report)
+    assert f"{report['added']:,} phrases added" in lines[0]
+
+
+def test_merge(tmp_path):
+    paths = [str(tmp_path / f'worker-{i}.ledger') for i in range(3)]
+    ledgers = [ledger.BloomLedger.create(path, 1000, 1e-6)
+               for path in paths]
+    for i in range(300):
+        ledgers[i % 3].add(f'talo {i}')
+    ledgers[0].merge(ledgers[1])
+    ledgers[0].merge(ledgers[2])
+    assert all(f'talo {i}' in ledgers[0] for i in range(300))
+    assert ledgers[0].added == 300
+    for issued in ledgers:
+        issued.close()
+
+
+def test_merge_requires_same_parameters(tmp_path):
+    with ledger.BloomLedger.create(str(tmp_path / 'a'), 1000, 0.01) as a, \
+            ledger.BloomLedger.create(str(tmp_path / 'b'), 2000, 0.01) as b:
+        with pytest.raises(ValueError):
+            a.merge(b)
+
+
+def test_issue_skips_issued_phrases(tmp_path):
+    with ledger.BloomLedger.create(str(tmp_path / 'issued.ledger'),
+                                   1000, 1e-6) as issued:
+        issued.add('talo 1')
+        issued.add('talo 3')
+        phrases = (f'talo {i}' for i in itertools.count())
+        assert list(ledger.issue(phrases, 3, issued)) == \
+            ['talo 0', 'talo 2', 'talo 4']
+        assert 'talo 4' in issued
+
+
+def test_issue_gives_up_when_full(tmp_path):
+    with ledger.BloomLedger.create(str(tmp_path / 'issued.ledger'),
+                                   1000, 1e-6) as issued:
+        issued.add('talo')
+        with pytest.raises(ledger.LedgerFullError):
+            list(ledger.issue(itertools.repeat('talo'), 1, issued,
+                              max_retries=10))
+        with pytest.raises(ledger.LedgerFullError):
+            list(ledger.issue(iter(['talo', 'kala']), 2, issued))
+
+
+def test_read_ledger_rejects_other_files(tmp_path):
+    path = tmp_path / 'issued.ledger'
+    path.write_bytes(b'not a ledger' * 10)
+    with pytest.raises(ledger.LedgerFormatError):
+        ledger.BloomLedger(str(path))
+
+
+def test_ledger_is_locked_while_open(tmp_path):
+    path = str(tmp_path / 'issued.ledger')
+    with ledger.BloomLedger.create(path, 1000, 1e-6) as issued:
+        issued.add('talo')
+        with pytest.raises(ledger.LedgerLockedError):
+            ledger.BloomLedger(path)
+        with pytest.raises(ledger.LedgerLockedError):
+            ledger.BloomLedger.open(path)
+    with ledger.BloomLedger(path) as issued:
+        assert 'talo' in issued
+
+
+def test_main(tmp_path, capsys):
+    paths = [str(tmp_path / f'{i}.ledger') for i in range(2)]
+    for i, path in enumerate(paths):
+        with ledger.BloomLedger.create(path, 100, 0.01) as issued:
+            issued.add(f'talo {i}')
+    assert ledger.main(['merge'] + paths) == 0
+    assert ledger.main(['info', paths[0]]) == 0
+    assert '2 phrases added' in capsys.readouterr().out
+    assert ledger.main(['info', str(tmp_path / 'missing')]) == 2
+    assert ledger.main(['merge', paths[0], paths[0]]) == 2
+    assert 'in use' in capsys.readouterr().err
@@ -0,0 +1,119 @@
+"""Binary lexicon tests"""
+
+import pytest
+import fin_ppgen.lexicon as lexicon
+from fin_ppgen.kotus import KotusEntry
+from fin_ppgen.lexicon import Lexeme, Lexicon
+
+
+ENTRIES = [KotusEntry('aakkonen', 38, ''),
+           KotusEntry('aallokko', 4, 'A'),
+           KotusEntry('aallonharja', 0, ''),
+           KotusEntry('häive', 48, 'E'),
+           KotusEntry('aasian flamingo', 9, '')]
+LEXICON = Lexicon.from_entries(ENTRIES)
+
+
+@pytest.fixture
+def xml_path(tmp_path):
+    path = tmp_path / 'words.xml'
+    path.write_text('<kotus-sanalista></kotus-sanalista>', encoding='utf-8')
+    return str(path)
+
+
+def test_lexicon_round_trip(tmp_path):
+    cache_path = str(tmp_path / 'words.lex')
+    lexicon.write_lexicon(ENTRIES, cache_path, b'\x01' * 32)
+    digest, entries = lexicon.read_lexicon(cache_path)
+    assert digest == b'\x01' * 32
+    assert entries == LEXICON
+
+
+def test_empty_lexicon_round_trip(tmp_path):
+    cache_path = str(tmp_path / 'words.lex')
+    lexicon.write_lexicon([], cache_path, b'\x00' * 32)
+    assert lexicon.read_lexicon(cache_path) == (b'\x00' * 32, Lexicon())
+
+
+def test_read_lexicon_rejects_other_files(tmp_path):
+    cache_path = tmp_path / 'words.lex'
+    cache_path.write_bytes(b'not a lexicon' * 10)
+    with pytest.raises(lexicon.LexiconFormatError):
+        lexicon.read_lexicon(str(cache_path))
+
+
+def test_load_lexicon_uses_cache(xml_path, monkeypatch):
+    calls = []
+
+    def iter_entries(file_path):
+        calls.append(file_path)
+        return iter(ENTRIES)
+
+    monkeypatch.setattr(lexicon.kotus, 'iter_entries', iter_entries)
+    assert lexicon.load_lexicon(xml_path) == LEXICON
+    assert lexicon.load_lexicon(xml_path) == LEXICON
+    assert len(calls) == 1
+
+
+def test_load_lexicon_rebuilds_stale_cache(xml_path, monkeypatch):
+    monkeypatch.setattr(lexicon.kotus, 'iter_entries',
+                        lambda file_path: iter(ENTRIES))
+    lexicon.load_lexicon(xml_path)
+
+    with open(xml_path, 'a', encoding='utf-8') as fp:
+        fp.write('\n')
+    monkeypatch.setattr(lexicon.kotus, 'iter_entries',
+                        lambda file_path: iter(ENTRIES[:2]))
+    assert lexicon.load_lexicon(xml_path) == LEXICON[:2]
+
+
+def test_lexicon_indexing():
+    assert len(LEXICON) == 5
+    assert LEXICON[1] == Lexeme('aallokko', 4, 'A')
+    assert LEXICON[-1] == Lexeme('aasian flamingo', 9, '')
+    assert list(LEXICON[1:3]) == [Lexeme('aallokko', 4, 'A'),
+                                  Lexeme('aallonharja', 0, '')]
+    assert [lexeme.lemma for lexeme in LEXICON] == \
+        [entry.lemma for entry in ENTRIES]
+
+
+def test_lexicon_select():
+    assert list(LEXICON.select(1, 15)) == [Lexeme('aallokko', 4, 'A'),
+                                           Lexeme('aasian flamingo', 9, '')]
+    assert list(LEXICON.take([3, 0])) == [Lexeme('häive', 48, 'E'),
+                                          Lexeme('aakkonen', 38, '')]
+
+
+@pytest.mark.parametrize("paradigms, gradations, expected", [
+    (None, None, [0, 1, 2, 3, 4]),
+    ({38, 4, 9}, None, [0, 1, 4]),
+    ({38, 4, 9}, {''}, [0, 4]),
+    (None, {'A', 'E'}, [1, 3]),
+    ([0], None, [2]),
+    ({1, 2, 3}, None, []),
+    (range(1, 16), {'A', 'B'}, [1]),
+])
+def test_lexicon_index_query(paradigms, gradations, expected):
+    assert LEXICON.index.query(paradigms, gradations) == expected
+    assert list(LEXICON.where(paradigms, gradations)) == \
+        [LEXICON[i] for i in expected]
+
+
+def test_lexicon_index_set_operations():
+    index = LEXICON.index
+    assert index.paradigm(38, 48) | index.gradation('A') == {0, 1, 3}
+    assert index.paradigm(38, 48) & index.gradation('E') == {3}
+    assert index.paradigm(38, 4, 9) - index.gradation('') == {1}
+    assert index.word_classes() == [(0, ''), (4, 'A'), (9, ''), (38, ''),
+                                     (48, 'E')]
+    assert len(index) == len(LEXICON)
+    with pytest.raises(ValueError):
+        index.query(gradations={'Z'})
+
+
+def test_prepend_lexical_info_with_lexemes():
+    from fin_ppgen import nlp
+    assert nlp.prepend_lexical_info(LEXICON) == [
+        '<N38>aakkonen', '<N4A>aallokko', '<N>aallonharja', '<N48E>häive',
+        '<N9>aasian_flamingo'
+    ]
@@ -0,0 +1,60 @@
+"""Bounded cache tests"""
+
+import pytest
+import fin_ppgen.memo as memo
+import fin_ppgen.nlp as nlp
+
+
+@pytest.mark.parametrize("policy, kept", [
+    ('lru', {'a', 'c'}),
+    ('fifo', {'b', 'c'}),
+])
+def test_eviction_policy(policy, kept):
+    calls = []
+    cache = memo.BoundedCache(2, policy)
+    upper = cache.wrap(lambda key: calls.append(key) or key.upper())
+    assert [upper(key) for key in 'aba'] == ['A', 'B', 'A']
+    upper('c')
+    assert set(cache.data) == kept
+    assert calls == ['a', 'b', 'c']
+    assert (cache.hits, cache.misses, cache.evictions) == (1, 3, 1)
+    assert cache.hit_rate == pytest.approx(0.25)
+
+
+def test_invalid_cache_parameters():
+    with pytest.raises(ValueError):
+        memo.BoundedCache(0)
+    with pytest.raises(ValueError):
+        memo.BoundedCache(10, 'random')
+
+
+@pytest.mark.parametrize("word, expected", [
+    ('<N10>koira+Pl+Ine', 'koirissa'),
+    ('<N10F>pöytä+Sg+Ade', 'pöydällä'),
+    ('<N9>aasian_flamingo+Sg+Gen', 'aasian flamingon'),
+])
+def test_transform_word(word, expected):
+    assert nlp.transform_word(word) == expected
+    assert nlp.apply_vowel_harmony(nlp.apply_other_transformations(
+        nlp.apply_inflection_rules(nlp.apply_consonant_gradation([word])))) \
+        == [expected]
+
+
+def test_enable_caches():
+    words = ['<N10>koira+Pl+Ine', '<N10F>pöytä+Sg+Ade']
+    uncached = [nlp.transform_word(word) for word in words]
+    caches = nlp.enable_caches(maxsize=100, policy='fifo')
+    try:
+        assert set(caches) == set(nlp.CACHEABLE)
+        nlp.warm_caches(words)
+        assert caches['transform_word'].misses == 2
+        assert caches['gradate'].misses == 2
+        assert [nlp.transform_word(word) for word in words] == uncached
+        assert nlp.cache_info()['transform_word']['hits'] == 2
+        # The list functions go through the caches too
+        nlp.apply_consonant_gradation(words)
+        assert caches['gradate'].hits == 2
+    finally:
+        nlp.disable_caches()
+    assert nlp.cache_info() == {}
+    assert not hasattr(nlp.gradate, 'cache')
@@ -200,6 +200,38 @@ INFL_15 = [
     ('<N15>ilkeä+Pl+Tra', '<N15>ilkeiksi'),
 ]
 
+INFL_ALTERNATIVE = [
+    ('<N2>palvelu+Pl+Gen2', '<N2>palveluiden'),
+    ('<N2>palvelu+Pl+Gen3', '<N2>palveluitten'),
+    ('<N2>palvelu+Pl+Par2', '<N2>palveluitA'),
+    ('<N3>valtio+Pl+Gen2', '<N3>valtioitten'),
+    ('<N4A>laatikko+Pl+Gen2', '<N4A>laatikoiden'),
+    ('<N4A>laatikko+Pl+Gen3', '<N4A>laatikoitten'),
+    ('<N4A>laatikko+Pl+Par2', '<N4A>laatikoitA'),
+    ('<N6>paperi+Pl+Gen2', '<N6>papereiden'),
+    ('<N6>paperi+Pl+Par2', '<N6>papereitA'),
+    ('<N6>agar+Pl+Gen3', '<N6>agareitten'),
+    ('<N10>koira+Pl+Gen2', '<N10>koirain'),
+    ('<N11>omena+Pl+Gen2', '<N11>omenOitten'),
+    ('<N11>omena+Pl+Gen3', '<N11>omenien'),
+    ('<N11>omena+Pl+Gen4', '<N11>omenOjen'),
+    ('<N11>omena+Pl+Par2', '<N11>omeniA'),
+    ('<N11>omena+Pl+Par3', '<N11>omenOjA'),
+    ('<N12>kulkija+Pl+Gen2', '<N12>kulkijOitten'),
+    ('<N12>kulkija+Pl+Gen3', '<N12>kulkijain'),
+    ('<N13>katiska+Pl+Gen3', '<N13>katiskOjen'),
+    ('<N13>katiska+Pl+Gen4', '<N13>katiskain'),
+    ('<N13>katiska+Pl+Par2', '<N13>katiskOjA'),
+    ('<N14A>solakka+Pl+Gen2', '<N14A>solakOitten'),
+    ('<N14A>solakka+Pl+Gen3', '<N14A>solakkOjen'),
+    ('<N14A>solakka+Pl+Par2', '<N14A>solakkOjA'),
+    ('<N15>ilkeä+Pl+Gen2', '<N15>ilkeitten'),
+    ('<N15>ilkeä+Pl+Gen3', '<N15>ilkeäin'),
+    ('<N15>ilkeä+Pl+Par2', '<N15>ilkeiA'),
+    # No alternative forms in paradigm 1
+    ('<N1A>baarimikko+Pl+Gen2', '<N1A>baarimikko+Pl+Gen2'),
+]
+
 
 @pytest.mark.parametrize("test_input, expected", INFL_01)
 def test_inflection_pattern_01(test_input, expected):
@@ -237,4 +269,10 @@ def test_test_inflection_pattern_14(test_input, expected):
 @pytest.mark.parametrize("test_input, expected", INFL_15)
 def test_test_inflection_pattern_15(test_input, expected):
     """Test inflection pattern 15"""
-    assert nlp.inflect(test_input) == expected
\ No newline at end of file
+    assert nlp.inflect(test_input) == expected
+
+
+@pytest.mark.parametrize("test_input, expected", INFL_ALTERNATIVE)
+def test_alternative_plural_forms(test_input, expected):
+    """Test the alternative plural genitive and partitive forms"""
+    assert nlp.inflect(test_input) == expected
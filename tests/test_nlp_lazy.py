@@ -0,0 +1,31 @@
+"""Lazy loading tests: the rule files must not be read when nlp is
+imported"""
+
+import os.path
+import subprocess
+import sys
+
+import pytest
+import fin_ppgen.nlp as nlp
+
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+
+def test_import_does_not_load_rules():
+    code = ('import fin_ppgen.nlp as nlp, fin_ppgen.cli; '
+            'assert nlp._rule_sets is None; '
+            'assert "RULE_SETS" not in vars(nlp); '
+            'assert nlp.inflect("<N10>koira+Pl+Ine") == "<N10>koirissA"; '
+            'assert nlp._rule_sets is not None')
+    subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True)
+
+
+def test_lazy_attributes():
+    rule_sets = nlp.preload()
+    assert nlp.preload() is rule_sets
+    assert nlp.RULE_SETS is rule_sets
+    assert nlp.GRADATION_RULES is rule_sets['gradation']
+    assert nlp.INFLECTION_RULES is rule_sets['inflection']
+    with pytest.raises(AttributeError):
+        nlp.NO_SUCH_RULES
@@ -0,0 +1,94 @@
+"""Streaming pipeline tests: the fused per-word pipeline must give the same
+results as the list-based stages"""
+
+import pytest
+import fin_ppgen.nlp as nlp
+from fin_ppgen.lexicon import Lexeme
+
+
+LEXEMES = [Lexeme('koira', 10, ''), Lexeme('pöytä', 10, 'F'),
+           Lexeme('aivot', 1, ''), Lexeme('papukaija', 10, ''),
+           Lexeme('aasian flamingo', 9, ''), Lexeme('kulkija', 12, '')]
+
+
+def lexical_forms():
+    return [nlp.lexical_base(lexeme) + ending for lexeme in LEXEMES
+            for ending in nlp.LEXICAL_ENDINGS]
+
+
+def test_transform_words_matches_list_stages():
+    words = lexical_forms()
+    expected = nlp.apply_vowel_harmony(nlp.apply_other_transformations(
+        nlp.apply_inflection_rules(nlp.apply_consonant_gradation(words))))
+    assert list(nlp.transform_words(words)) == expected
+
+
+def test_trace():
+    calls = []
+    result = list(nlp.transform_words(
+        ['<N10F>pöytä+Sg+Ade'], trace=lambda *call: calls.append(call)))
+    assert result == ['pöydällä']
+    assert calls == [('lexical', '<N10F>pöytä+Sg+Ade'),
+                     ('gradated', '<N10F>pöydä+Sg+Ade'),
+                     ('inflected', 'pöydällA'),
+                     ('transformed', 'pöydällA'),
+                     ('final', 'pöydällä')]
+
+
+def test_set_trace_hook():
+    calls = []
+    previous = nlp.set_trace_hook(lambda *call: calls.append(call))
+    try:
+        list(nlp.transform_words(['<N10>koira+Pl+Ine']))
+    finally:
+        assert nlp.set_trace_hook(previous) is not None
+    assert len(calls) == 1 + len(nlp.STAGES)
+    list(nlp.transform_words(['<N10>koira+Pl+Ine']))
+    assert len(calls) == 1 + len(nlp.STAGES)
+
+
+def test_stream_word_forms():
+    stages = {}
+    words = list(nlp.stream_word_forms(
+        LEXEMES, trace=lambda stage, word: stages.setdefault(
+            stage, []).append(word)))
+    assert len(words) == len(LEXEMES)
+    for lexical, word in zip(stages['lexical'], words):
+        assert lexical[lexical.index('+'):] in nlp.LEXICAL_ENDINGS
+        assert nlp.transform_word(lexical) == word
+
+
+@pytest.mark.parametrize("word, expected", [
+    ('papukaian', 'papukajan'),
+    ('taiat', 'taiat'),
+])
+def test_transform_other(word, expected):
+    assert nlp.transform_other(word) == expected
+
+
+@pytest.mark.parametrize("word, clitic, expected", [
+    ('koirissa', 'kO', 'koirissako'),
+    ('pöydässä', 'kO', 'pöydässäkö'),
+    ('pöytä ', 'pAs', 'pöytäpäs'),
+    ('kulkijoiden', 'hAn', 'kulkijoidenhan'),
+    ('talo ', '', 'talo '),
+])
+def test_attach_clitic(word, clitic, expected):
+    assert nlp.attach_clitic(word, clitic) == expected
+
+
+@pytest.mark.parametrize("paradigm, gradation, alternatives", [
+    (1, '', []),
+    (3, '', ['+Pl+Gen2']),
+    (4, 'A', ['+Pl+Gen2', '+Pl+Gen3', '+Pl+Par2']),
+    (11, '', ['+Pl+Gen2', '+Pl+Gen3', '+Pl+Gen4', '+Pl+Par2', '+Pl+Par3']),
+])
+def test_word_class_endings(paradigm, gradation, alternatives):
+    endings = nlp.word_class_endings(paradigm, gradation)
+    assert [ending for ending in endings
+            if ending not in nlp.LEXICAL_ENDINGS] == alternatives
+    assert [ending for ending in endings
+            if ending in nlp.LEXICAL_ENDINGS] == nlp.LEXICAL_ENDINGS
+    if alternatives:
+        position = endings.index('+Pl+Gen')
+        assert endings[position + 1] == alternatives[0]
@@ -0,0 +1,48 @@
+"""Rule index tests: indexed rule dispatch must give the same results as
+trying every rule in order"""
+
+import pytest
+import fin_ppgen.nlp as nlp
+
+
+LEMMAS = [('baarimikko', 1, 'A'), ('aakkosto', 2, ''), ('aaloe', 3, ''),
+          ('aallokko', 4, 'A'), ('kaappi', 5, 'B'), ('huti', 5, 'F'),
+          ('sakset', 7, ''), ('beagle', 8, ''), ('vika', 9, 'D'),
+          ('koira', 10, ''), ('pöytä', 10, 'F'), ('omena', 11, ''),
+          ('kulkija', 12, ''), ('katiska', 13, ''), ('solakka', 14, 'A'),
+          ('hopea', 15, ''), ('hake', 48, 'A'), ('rae', 48, 'D'),
+          ('hento', 1, 'J'), ('sopu', 1, 'E'), ('keidas', 41, 'F'),
+          ('aasian_flamingo', 9, ''), ('pop-musiikki', 5, 'A')]
+
+
+def lexical_forms():
+    for lemma, paradigm, gradation in LEMMAS:
+        for tag in (f'<N{paradigm}{gradation}>', f'<N{paradigm}>', '<N>',
+                    f'<N5{gradation}>', f'<N14{gradation}>'):
+            for ending in nlp.RULE_ENDINGS:
+                yield tag + lemma + ending
+    yield 'baarimikko+Sg+Gen'
+    yield '<N1A>baarimikko'
+
+
+def apply_first_matching_rule(rules, word):
+    for rule in rules:
+        if rule.match(word):
+            return rule.apply(word)
+    return word
+
+
+@pytest.mark.parametrize("rules, apply_rules", [
+    (nlp.GRADATION_RULES, nlp.gradate),
+    (nlp.INFLECTION_RULES, nlp.inflect),
+])
+def test_indexed_rules_match_linear_scan(rules, apply_rules):
+    for word in lexical_forms():
+        assert apply_rules(word) == apply_first_matching_rule(rules, word)
+
+
+def test_rule_index_narrows_candidates():
+    candidates = nlp.INFLECTION_RULES.candidates('<N12>kulkija+Pl+Ine')
+    assert 0 < len(candidates) < 5
+    assert len(nlp.INFLECTION_RULES.candidates('kulkija')) == \
+        len(nlp.INFLECTION_RULES)
@@ -0,0 +1,58 @@
+"""Parallel generation tests"""
+
+import itertools
+
+import pytest
+import fin_ppgen.forms as forms
+import fin_ppgen.parallel as parallel
+
+
+@pytest.fixture(scope='module')
+def table_path(tmp_path_factory, noun_table):
+    path = str(tmp_path_factory.mktemp('forms') / 'words.forms')
+    forms.write_form_table(noun_table, path)
+    return path
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_generate_parallel(table_path, ordered):
+    stats = parallel.WorkerStats()
+    phrases = list(parallel.generate_parallel(
+        1000, 3, jobs=2, separator='-', ordered=ordered,
+        table_path=table_path, stats=stats, chunk_size=64))
+    assert len(phrases) == 1000
+    with forms.MappedFormTable(table_path) as table:
+        all_forms = {table[i] for i in range(len(table))}
+    for phrase in phrases:
+        words = phrase.split('-')
+        assert len(words) == 3
+        assert set(words) <= all_forms
+    assert stats.total_phrases == 1000
+    assert 1 <= len(stats.phrases) <= 2
+    assert stats.report()[-1].startswith('total: 1000 phrases')
+
+
+def test_generate_parallel_without_phrases(table_path):
+    assert list(parallel.generate_parallel(0, 3, jobs=1,
+                                           table_path=table_path)) == []
+
+
+def test_generate_parallel_without_count(table_path):
+    phrases = parallel.generate_parallel(None, 2, jobs=1,
+                                         table_path=table_path, chunk_size=8)
+    assert len(list(itertools.islice(phrases, 30))) == 30
+    phrases.close()
+
+
+def test_generate_parallel_unique_forms(table_path):
+    phrases = list(parallel.generate_parallel(
+        100, 2, jobs=1, table_path=table_path, unique_forms=True))
+    assert len(phrases) == 100
+
+
+def test_generate_parallel_compounds(table_path):
+    phrases = list(parallel.generate_parallel(
+        20, 2, jobs=1, table_path=table_path, modifiers=['vesi']))
+    assert len(phrases) == 20
+    assert all(word.startswith('vesi')
+               for phrase in phrases for word in phrase.split(' '))
@@ -0,0 +1,41 @@
+"""Rule profiling tests"""
+
+from fin_ppgen.lexicon import Lexeme
+import fin_ppgen.nlp as nlp
+import fin_ppgen.profiling as profiling
+
+
+def test_profile_rules_restores_rule_sets():
+    words = ['<N9D>vika+Sg+Gen', '<N10>koira+Pl+Ine', 'ei_sääntöä']
+    stats = profiling.profile_rules(words)
+    assert stats['gradation'].words == 3
+    assert stats['inflection'].words == 3
+    assert sum(stats['gradation'].hits) == 1
+    assert sum(stats['inflection'].hits) == 2
+    assert stats['inflection'].fall_through == 1
+    for rule_set in nlp.RULE_SETS.values():
+        assert 'apply' not in vars(rule_set)
+    assert nlp.inflect('<N10>koira+Pl+Ine') == '<N10>koirissA'
+
+
+def test_all_lexical_forms():
+    forms = profiling.all_lexical_forms([Lexeme('koira', 10, ''),
+                                         Lexeme('talo', 1, '')])
+    assert len(forms) == 2 * len(nlp.LEXICAL_ENDINGS) + 1
+    assert forms[0] == '<N10>koira+Sg+Nom'
+    assert '<N10>koira+Pl+Gen2' in forms
+
+
+def test_alternative_ending_rules_are_matched():
+    nouns = [Lexeme('aakkosto', 2, ''), Lexeme('valtio', 3, ''),
+             Lexeme('laatikko', 4, 'A'), Lexeme('paperi', 6, ''),
+             Lexeme('agar', 6, ''), Lexeme('koira', 10, ''),
+             Lexeme('omena', 11, ''), Lexeme('kulkija', 12, ''),
+             Lexeme('katiska', 13, ''), Lexeme('solakka', 14, 'A'),
+             Lexeme('korkea', 15, '')]
+    stats = profiling.profile_rules(profiling.all_lexical_forms(nouns))
+    alternatives = [ending for ending in nlp.RULE_ENDINGS
+                    if ending not in nlp.LEXICAL_ENDINGS]
+    dead = [rule for rule in stats['inflection'].dead_rules()
+            if any(rule.ending_re.search(ending) for ending in alternatives)]
+    assert dead == []
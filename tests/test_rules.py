@@ -0,0 +1,135 @@
+"""Rule compiler tests"""
+
+import pytest
+import fin_ppgen.rules as rules
+
+
+ENDINGS = ['+Sg+Nom', '+Sg+Gen', '+Pl+Nom', '+Pl+Gen']
+
+RULE_FILE = r'''# Test rules
+\<N1[A-M]?\>\w+\+Sg\+Nom    \+Sg\+Nom    _
+\<N1[A-M]?\>\w+\+Sg\+Gen    \+Sg\+Gen    n
+
+\<N1[A-M]?\>\w+\+Pl\+(Nom|Gen)    ([aeiou])\+Pl\+(Nom|Gen)    \1t
+'''
+
+
+def write_rules(tmp_path, text, name='rules.txt'):
+    path = tmp_path / name
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+def test_parse_rule_file(tmp_path):
+    parsed = rules.parse_rule_file(write_rules(tmp_path, RULE_FILE))
+    assert [rule.location.rsplit(':', 1)[1] for rule in parsed] == \
+        ['2', '3', '5']
+    assert parsed[2].apply('<N1>talo+Pl+Gen') == '<N1>talot'
+    assert parsed[0].match('<N1>talo+Sg+Nom')
+    assert not parsed[0].match('<N1>talo+Sg+Gen')
+
+
+@pytest.mark.parametrize("line, message", [
+    (r'\<N1\>\w+\+Sg\+Nom    \+Sg\+Nom', 'expected 3 fields'),
+    (r'\<N1\>\w+\+Sg\+Nom    \+Sg\+Nom    _    extra', 'expected 3 fields'),
+    (r'\<N1\>(\w+\+Sg\+Nom    \+Sg\+Nom    _', 'missing'),
+    (r'\<N1\>\w+\+Sg\+Nom    \+Sg\+Nom    \1', 'invalid group reference'),
+])
+def test_malformed_lines(tmp_path, line, message):
+    path = write_rules(tmp_path, RULE_FILE + line + '\n')
+    with pytest.raises(rules.RuleSyntaxError, match=message) as err:
+        rules.parse_rule_file(path)
+    assert ':6:' in str(err.value)
+
+
+def test_valid_rules_have_no_problems(tmp_path):
+    parsed = rules.parse_rule_file(write_rules(tmp_path, RULE_FILE))
+    assert rules.find_rule_problems(parsed, ENDINGS) == []
+
+
+@pytest.mark.parametrize("line, message", [
+    (r'\<N1A\>\w+\+Sg\+Ine    \+Sg\+Ine    ssA', 'no number and case'),
+    (r'\<NX\>\w+\+Sg\+Nom    \+Sg\+Nom    _', 'no paradigm'),
+    (r'\<N1A\>\w+\+Sg\+Gen    \+Sg\+Gen    n', 'hidden by earlier rule'),
+    (r'\<N1[A-M]?\>\w+\+Pl\+Nom    \+Pl\+Nom    t', 'hidden by earlier rule'),
+])
+def test_rules_that_never_apply(tmp_path, line, message):
+    path = write_rules(tmp_path, RULE_FILE + line + '\n')
+    with pytest.warns(rules.RuleWarning, match=message):
+        rules.load_rules(path, ENDINGS)
+
+
+def test_specific_rules_before_generic_rules_are_not_hidden(tmp_path):
+    text = (r'\<N1\>\w+kk\w+\+Sg\+Gen    kk    k' + '\n'
+            r'\<N1\>\w+\+Sg\+Gen    \+Sg\+Gen    n' + '\n')
+    parsed = rules.parse_rule_file(write_rules(tmp_path, text))
+    assert rules.find_rule_problems(parsed, ENDINGS) == []
+
+
+def test_rule_cache(tmp_path):
+    rule_files = {'test': write_rules(tmp_path, RULE_FILE)}
+    cache_path = str(tmp_path / 'rules.json')
+    rule_sets = rules.load_rule_sets(rule_files, ENDINGS, cache_path)
+    key = rules.cache_key(rule_files, ENDINGS)
+    assert rules.read_rule_sets(key, cache_path) is None
+
+    rules.save_rule_sets(rule_sets, key, cache_path)
+    cached = rules.read_rule_sets(key, cache_path)
+    assert [rule.pattern for rule in cached['test']] == \
+        [rule.pattern for rule in rule_sets['test']]
+    assert cached['test'].apply('<N1>talo+Sg+Gen') == '<N1>talon'
+
+    # Editing a rule file invalidates the cache
+    write_rules(tmp_path, RULE_FILE + '# comment\n')
+    assert rules.read_rule_sets(rules.cache_key(rule_files, ENDINGS),
+                                cache_path) is None
+
+
+def test_rule_stats(tmp_path):
+    rule_set = rules.load_rules(write_rules(tmp_path, RULE_FILE))
+    assert 'apply' not in vars(rule_set)
+    stats = rule_set.enable_stats()
+    assert 'apply' in vars(rule_set)
+    for word in ['<N1>talo+Sg+Nom', '<N1>talo+Sg+Gen', '<N1>talo+Pl+Gen',
+                 '<N1>talo+Pl+Gen', '<N2>talo+Pl+Gen']:
+        rule_set.apply(word)
+    assert rule_set.apply('<N1>talo+Pl+Gen') == '<N1>talot'
+    assert rule_set.disable_stats() is stats
+    assert 'apply' not in vars(rule_set) and rule_set.stats is None
+
+    assert stats.words == 6
+    assert stats.fall_through == 1
+    assert stats.hits == [1, 1, 3]
+    assert stats.attempts == [1, 1, 3]
+    assert stats.dead_rules() == []
+    assert all(seconds >= 0 for seconds in stats.seconds)
+    # Statistics are not recorded after disabling
+    rule_set.apply('<N1>talo+Sg+Nom')
+    assert stats.words == 6
+
+
+def test_rule_stats_report(tmp_path):
+    rule_set = rules.load_rules(write_rules(tmp_path, RULE_FILE))
+    stats = rule_set.enable_stats()
+    rule_set.apply('<N1>talo+Sg+Gen')
+    rule_set.disable_stats()
+    report = stats.report()
+    assert report[0].startswith('1 words, 1.0 rules tried per word')
+    assert report[-3] == '2 rules never matched:'
+    assert report[-2].startswith('  rules.txt:2  ')
+    assert stats.as_dict()['rules'][1]['hits'] == 1
+
+
+def test_rule_set_covers(tmp_path):
+    rule_set = rules.load_rules(write_rules(tmp_path, RULE_FILE))
+    assert rule_set.covers('<N1A>', ENDINGS)
+    assert not rule_set.covers('<N2>', ENDINGS)
+    assert rule_set.covers('<N1>', ['+Sg+Nom', '+Pl+Gen'])
+    assert not rule_set.covers('<N1>', ['+Sg+Ine'])
+    # Like the match pattern, an ending only matches longer endings of a
+    # word if it is not anchored to the end of the word
+    assert rule_set.covers('<N1>', ['+Pl+Gen2'])
+    anchored = RULE_FILE.replace(r'(Nom|Gen)    ', r'(Nom|Gen)$    ', 1)
+    anchored = rules.load_rules(write_rules(tmp_path, anchored))
+    assert not anchored.covers('<N1>', ['+Pl+Gen2'])
+    assert anchored.candidates('<N1>talo+Pl+Gen2') == ()
@@ -0,0 +1,98 @@
+"""Batched CSPRNG sampling tests"""
+
+from array import array
+from collections import Counter
+import math
+import pytest
+import fin_ppgen.sampling as sampling
+
+
+def chi_square(counts, bound, total):
+    expected = total / bound
+    return sum((counts[i] - expected) ** 2 / expected for i in range(bound))
+
+
+def chi_square_critical(degrees):
+    # Wilson-Hilferty approximation of the chi-square quantile for
+    # p = 1e-6 (z = 4.753), so that the tests fail by chance only once in
+    # a million runs
+    z = 4.753
+    return degrees * (1 - 2 / (9 * degrees)
+                      + z * math.sqrt(2 / (9 * degrees))) ** 3
+
+
+@pytest.mark.parametrize("bound", [1, 2, 3, 10, 255, 256, 257, 1000,
+                                   362054, 2 ** 32, 2 ** 32 + 1, 2 ** 70])
+def test_indices_are_in_range(bound):
+    indices = sampling.IndexSampler(bound).sample(1000)
+    assert len(indices) == 1000
+    assert all(0 <= i < bound for i in indices)
+
+
+@pytest.mark.parametrize("bound", [3, 7, 10, 100, 255])
+def test_accepted_range_is_a_multiple_of_the_bound(bound):
+    sampler = sampling.IndexSampler(bound)
+    assert sampler.limit % bound == 0
+    assert 2 ** 32 - sampler.limit < bound
+
+
+@pytest.mark.parametrize("bound", [2, 3, 5, 6, 7, 10, 100, 129, 200, 255])
+def test_every_word_maps_to_each_index_equally_often(bound, monkeypatch):
+    # Feed every possible one-byte word to the sampler once: each index
+    # must come out exactly the same number of times, which means that the
+    # rejection step removes all modulo bias.
+    monkeypatch.setattr(sampling.secrets, 'token_bytes',
+                        lambda n: bytes(range(256)))
+    sampler = sampling.IndexSampler(bound, block_size=256, word_size=1)
+    accepted = sampler.limit
+    counts = Counter(sampler.sample(accepted))
+    assert sorted(counts) == list(range(bound))
+    assert set(counts.values()) == {accepted // bound}
+
+
+def test_words_above_the_limit_are_rejected(monkeypatch):
+    blocks = [array('I', [2 ** 32 - 1, 5, 2 ** 32 - 2, 7]).tobytes()]
+    monkeypatch.setattr(sampling.secrets, 'token_bytes',
+                        lambda n: blocks.pop())
+    sampler = sampling.IndexSampler(3 * 2 ** 30, block_size=16)
+    assert sampler.sample(2) == [5, 7]
+
+
+def test_samples_continue_across_blocks(monkeypatch):
+    blocks = [bytes([4, 5, 6, 7]), bytes([0, 1, 2, 3])]
+    monkeypatch.setattr(sampling.secrets, 'token_bytes',
+                        lambda n: blocks.pop())
+    sampler = sampling.IndexSampler(256, block_size=4, word_size=1)
+    assert sampler.sample(3) == [0, 1, 2]
+    assert sampler.sample(3) == [3, 4, 5]
+
+
+@pytest.mark.parametrize("bound", [2, 10, 22, 97])
+def test_chi_square_uniformity(bound):
+    total = 2000 * bound
+    counts = Counter(sampling.IndexSampler(bound).sample(total))
+    assert chi_square(counts, bound, total) < chi_square_critical(bound - 1)
+
+
+def test_no_bias_for_bounds_close_to_the_word_range():
+    # With plain modulo reduction of 32-bit words, indices below 2 ** 30
+    # would come out with probability 1/2 instead of 1/3.
+    bound = 3 * 2 ** 30
+    total = 30000
+    low = sum(1 for i in sampling.IndexSampler(bound).sample(total)
+              if i < 2 ** 30)
+    assert abs(low / total - 1 / 3) < 0.02
+
+
+def test_randbelow_batch():
+    assert sampling.randbelow_batch(10, 0) == []
+    assert len(sampling.randbelow_batch(10, 5000)) == 5000
+    with pytest.raises(ValueError):
+        sampling.randbelow_batch(0, 1)
+
+
+def test_randbelow():
+    sampler = sampling.IndexSampler(22, block_size=16)
+    values = [sampler.randbelow() for _ in range(1000)]
+    assert all(0 <= value < 22 for value in values)
+    assert len(set(values)) == 22
@@ -0,0 +1,138 @@
+"""Passphrase server tests"""
+
+import asyncio
+import json
+import pytest
+import fin_ppgen.server as server
+
+
+async def request(port, target, connection='close'):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\n"
+                 f"Connection: {connection}\r\n\r\n".encode())
+    await writer.drain()
+    status_line = await reader.readline()
+    headers = await server.read_headers(reader)
+    body = await reader.readexactly(int(headers['content-length']))
+    writer.close()
+    return int(status_line.split()[1]), json.loads(body)
+
+
+def run_with_server(client, table, pool_size=50):
+    async def main():
+        service = server.PassphraseService(table, pool_size)
+        http_server, refill_task = await server.start_server(service, port=0)
+        port = http_server.sockets[0].getsockname()[1]
+        try:
+            return await client(service, port)
+        finally:
+            refill_task.cancel()
+            http_server.close()
+            await http_server.wait_closed()
+
+    return asyncio.run(main())
+
+
+def test_passphrases_are_served_from_the_pool(noun_table):
+    async def client(service, port):
+        # Give the refill task a chance to fill the pool first
+        await asyncio.sleep(0.05)
+        assert len(service.pools[4]) == 50
+        status, body = await request(port, '/passphrase?count=10')
+        assert status == 200
+        assert len(body['passphrases']) == 10
+        assert all(len(phrase.split(' ')) == 4
+                   for phrase in body['passphrases'])
+        assert service.pool_misses == 0
+        status, body = await request(port, '/passphrase?words=2&count=3')
+        assert status == 200
+        assert all(len(phrase.split(' ')) == 2
+                   for phrase in body['passphrases'])
+        await asyncio.sleep(0.05)
+        return await request(port, '/metrics')
+
+    status, metrics = run_with_server(client, noun_table)
+    assert status == 200
+    assert metrics['requests'] == 2
+    assert metrics['latency_ms']['samples'] == 2
+    assert metrics['latency_ms']['p50'] <= metrics['latency_ms']['p99']
+    assert metrics['pools']['4']['fill'] == 1.0
+    assert metrics['pools']['2']['size'] == 50
+
+
+def test_keep_alive_connection(noun_table):
+    async def client(service, port):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        statuses = []
+        for _ in range(3):
+            writer.write(b"GET /passphrase HTTP/1.1\r\nHost: x\r\n\r\n")
+            await writer.drain()
+            statuses.append(int((await reader.readline()).split()[1]))
+            headers = await server.read_headers(reader)
+            await reader.readexactly(int(headers['content-length']))
+        writer.close()
+        return statuses
+
+    assert run_with_server(client, noun_table) == [200, 200, 200]
+
+
+@pytest.mark.parametrize("target, status", [
+    ('/passphrase?words=0', 400),
+    ('/passphrase?count=abc', 400),
+    (f'/passphrase?count={server.MAX_COUNT + 1}', 400),
+    ('/nothing', 404),
+])
+def test_bad_requests(noun_table, target, status):
+    async def client(service, port):
+        return await request(port, target)
+
+    response_status, body = run_with_server(client, noun_table)
+    assert response_status == status
+    assert 'error' in body
+
+
+async def raw_request(port, data):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(data)
+    await writer.drain()
+    statuses = []
+    while True:
+        status_line = await reader.readline()
+        if not status_line:
+            break
+        statuses.append(int(status_line.split()[1]))
+        headers = await server.read_headers(reader)
+        await reader.readexactly(int(headers['content-length']))
+    writer.close()
+    return statuses
+
+
+@pytest.mark.parametrize("data, statuses", [
+    (b"GET /" + b"a" * 100000 + b" HTTP/1.1\r\n\r\n", [400]),
+    (b"GET / HTTP/1.1\r\nX: " + b"a" * 100000 + b"\r\n\r\n", [431]),
+    (b"POST /passphrase HTTP/1.1\r\nContent-Length: 5\r\n\r\nwords"
+     b"GET /passphrase HTTP/1.1\r\nConnection: close\r\n\r\n", [405, 200]),
+    (b"POST / HTTP/1.1\r\nContent-Length: x\r\n\r\n", [400]),
+    (b"POST / HTTP/1.1\r\nContent-Length: %d\r\n\r\n"
+     % (server.MAX_BODY + 1), [413]),
+    (b"POST / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n", [400]),
+])
+def test_request_framing(noun_table, data, statuses):
+    async def client(service, port):
+        return await raw_request(port, data)
+
+    assert run_with_server(client, noun_table) == statuses
+
+
+@pytest.mark.parametrize("pool_size", ['0', '-5'])
+def test_main_rejects_empty_pools(pool_size, capsys):
+    with pytest.raises(SystemExit) as exc_info:
+        server.main(['--pool-size', pool_size])
+    assert exc_info.value.code == 2
+    assert '--pool-size' in capsys.readouterr().err
+
+
+def test_percentile():
+    assert server.percentile([], 0.5) is None
+    assert server.percentile([3, 1, 2], 0.5) == 2
+    assert server.percentile(list(range(1, 101)), 0.99) == 99
@@ -0,0 +1,54 @@
+"""Distinct form index tests"""
+
+from collections import Counter
+import math
+
+import pytest
+import fin_ppgen.unique as unique
+
+
+class Table(list):
+    def phrase(self, indices, separator=' '):
+        return separator.join(self[i] for i in indices)
+
+
+TABLE = Table(['talo', 'talon', 'talo', 'talot', 'talon', 'talo'])
+
+
+def test_unique_forms():
+    unique_forms = unique.UniqueForms(TABLE)
+    assert list(unique_forms.rows) == [0, 1, 3]
+    assert list(unique_forms.multiplicities) == [3, 2, 1]
+    assert [unique_forms[i] for i in range(len(unique_forms))] == \
+        ['talo', 'talon', 'talot']
+    assert unique_forms.duplicates == 3
+    assert unique_forms.phrase([2, 0], '-') == 'talot-talo'
+
+
+def test_sampling_is_uniform_over_distinct_forms():
+    unique_forms = unique.UniqueForms(TABLE)
+    counts = Counter(unique_forms.passphrase(3000).split())
+    assert set(counts) == {'talo', 'talon', 'talot'}
+    assert all(800 < count < 1200 for count in counts.values())
+
+
+@pytest.mark.parametrize("unique_words, bits_per_word", [
+    (True, math.log2(3)),
+    (False, -(3 / 6 * math.log2(3 / 6) + 2 / 6 * math.log2(2 / 6)
+              + 1 / 6 * math.log2(1 / 6))),
+])
+def test_entropy_report(unique_words, bits_per_word):
+    report = unique.UniqueForms(TABLE).entropy_report(4, unique_words)
+    assert report['phrases'] == 3 ** 4
+    assert report['bits_per_word'] == pytest.approx(bits_per_word)
+    assert report['bits_per_phrase'] == pytest.approx(4 * bits_per_word)
+    assert report['nominal_bits_per_phrase'] == pytest.approx(
+        4 * math.log2(6))
+    assert (report['table_forms'], report['unique_forms']) == (6, 3)
+
+
+def test_unique_forms_of_a_form_table(noun_table):
+    unique_forms = unique.UniqueForms(noun_table)
+    assert len(unique_forms) == len(set(noun_table.forms))
+    assert {unique_forms[i] for i in range(len(unique_forms))} == \
+        set(noun_table.forms)